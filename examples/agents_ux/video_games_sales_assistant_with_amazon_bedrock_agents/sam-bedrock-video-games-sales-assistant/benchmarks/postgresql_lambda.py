@@ -0,0 +1,91 @@
+"""
+Latency of the SQL action group Lambda against a local PostgreSQL.
+
+Runs get_query_results from functions/assistant-api-postgresql-haiku-35/app.py
+with credentials given on the command line instead of Secrets Manager, once
+with a new connection pool per query (a cold container) and once reusing the
+pool (a warm container).
+
+    python benchmarks/postgresql_lambda.py --user postgres --password postgres \
+        --query "SELECT * FROM video_games_sales_units"
+"""
+
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import time
+
+FUNCTION_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "functions",
+    "assistant-api-postgresql-haiku-35",
+)
+
+
+def load_app(args):
+    os.environ.update(
+        {
+            "SECRET_NAME": "local",
+            "POSTGRESQL_HOST": args.host,
+            "DATABASE_NAME": args.database,
+            "QUESTION_ANSWERS_TABLE": "local",
+            "AWS_REGION": os.environ.get("AWS_REGION", "us-east-1"),
+        }
+    )
+    sys.path.insert(0, FUNCTION_DIR)
+    app = importlib.import_module("app")
+    secret = {"username": args.user, "password": args.password}
+    app.get_secret = lambda secret_name, region_name: secret
+    return app
+
+
+def reset(app):
+    app.close_pool()
+    app._secret_cache.update(value=None, expires=0.0)
+
+
+def measure(app, query, iterations, cold):
+    timings = list()
+    for _ in range(iterations):
+        if cold:
+            reset(app)
+        start = time.perf_counter()
+        result = app.get_query_results(query)
+        timings.append(time.perf_counter() - start)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+    return timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<6} median {statistics.median(timings) * 1000:8.2f} ms"
+        f"  min {min(timings) * 1000:8.2f} ms  max {max(timings) * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--database", default="postgres")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="postgres")
+    parser.add_argument("--query", default="SELECT * FROM generate_series(1, 5000)")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    app = load_app(args)
+    result = app.get_query_results(args.query)
+    print(f"{len(result.get('result', []))} rows, {result.get('message', '')}")
+
+    report("cold", measure(app, args.query, args.iterations, cold=True))
+    reset(app)
+    report("warm", measure(app, args.query, args.iterations, cold=False))
+    app.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
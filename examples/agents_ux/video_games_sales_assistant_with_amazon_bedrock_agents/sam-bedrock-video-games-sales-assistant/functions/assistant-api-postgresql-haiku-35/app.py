@@ -2,6 +2,8 @@ import boto3
 import json
 import os
 import psycopg2
+import psycopg2.pool
+import time
 import uuid
 from botocore.exceptions import ClientError
 from decimal import Decimal
@@ -13,6 +15,20 @@ DATABASE_NAME = os.environ["DATABASE_NAME"]
 QUESTION_ANSWERS_TABLE = os.environ["QUESTION_ANSWERS_TABLE"]
 AWS_REGION = os.environ["AWS_REGION"]
 
+# The secret is read again after this many seconds, so rotations are picked up
+SECRET_TTL_SECONDS = int(os.environ.get("SECRET_TTL_SECONDS", "300"))
+# Queries running longer than this are cancelled by PostgreSQL
+STATEMENT_TIMEOUT_MS = int(os.environ.get("STATEMENT_TIMEOUT_MS", "30000"))
+CONNECT_TIMEOUT_SECONDS = int(os.environ.get("CONNECT_TIMEOUT_SECONDS", "10"))
+FETCH_BATCH_SIZE = int(os.environ.get("FETCH_BATCH_SIZE", "500"))
+MAX_RESULT_BYTES = int(os.environ.get("MAX_RESULT_BYTES", "24000"))
+# A Lambda container handles one request at a time, so a small pool suffices
+POOL_MAX_CONNECTIONS = int(os.environ.get("POOL_MAX_CONNECTIONS", "2"))
+
+# Kept across warm invocations of the same container
+_secret_cache = {"value": None, "expires": 0.0}
+_pool = None
+
 
 def get_secret(secret_name, region_name):
     # Create a Secrets Manager client
@@ -25,30 +41,100 @@ def get_secret(secret_name, region_name):
         # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
         raise e
     secret = json.loads(get_secret_value_response["SecretString"])
-    print(secret)
     return secret
 
 
+def get_cached_secret(force_refresh=False):
+    now = time.monotonic()
+    if (
+        force_refresh
+        or _secret_cache["value"] is None
+        or now >= _secret_cache["expires"]
+    ):
+        _secret_cache["value"] = get_secret(SECRET_NAME, AWS_REGION)
+        _secret_cache["expires"] = now + SECRET_TTL_SECONDS
+    return _secret_cache["value"]
+
+
+def create_pool(secret):
+    return psycopg2.pool.SimpleConnectionPool(
+        1,
+        POOL_MAX_CONNECTIONS,
+        host=POSTGRESQL_HOST,
+        database=DATABASE_NAME,
+        user=secret["username"],
+        password=secret["password"],
+        connect_timeout=CONNECT_TIMEOUT_SECONDS,
+    )
+
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+
+
+def get_pool():
+    global _pool
+    secret = get_cached_secret()
+    if _pool is None or getattr(_pool, "secret", None) != secret:
+        # First invocation of the container, or the secret was rotated
+        close_pool()
+        try:
+            _pool = create_pool(secret)
+        except psycopg2.OperationalError:
+            # The cached password may be outdated, read the secret again once
+            secret = get_cached_secret(force_refresh=True)
+            _pool = create_pool(secret)
+        _pool.secret = secret
+        print("Connected to the PostgreSQL database!")
+    return _pool
+
+
 def get_postgresql_connection():
-    secret = get_secret(SECRET_NAME, AWS_REGION)
     try:
-        conn = psycopg2.connect(
-            host=POSTGRESQL_HOST,
-            database=DATABASE_NAME,
-            user=secret["username"],
-            password=secret["password"],
-        )
-        print("Connected to the PostgreSQL database!")
+        pool = get_pool()
+        connection = pool.getconn()
+        if connection.closed:
+            # Dropped by the server or proxy while the container was idle
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
     except (Exception, psycopg2.Error) as error:
         print("Error connecting to the PostgreSQL database:", error)
+        close_pool()
         return False
-    return conn
+    return connection
+
+
+def release_postgresql_connection(connection):
+    if _pool is None:
+        connection.close()
+        return
+    try:
+        # Ends the transaction, which also closes its server-side cursor
+        connection.rollback()
+        _pool.putconn(connection)
+    except psycopg2.Error:
+        _pool.putconn(connection, close=True)
 
 
 def get_size(string):
     return len(string.encode("utf-8"))
 
 
+def to_record(column_names, row):
+    record = {}
+    for x, value in enumerate(row):
+        if type(value) is Decimal:
+            record[column_names[x]] = float(value)
+        elif isinstance(value, date):
+            record[column_names[x]] = str(value)
+        else:
+            record[column_names[x]] = value
+    return record
+
+
 def get_query_results(sql_query):
     connection = get_postgresql_connection()
     if connection == False:
@@ -57,43 +143,51 @@ def get_query_results(sql_query):
         }
 
     message = ""
-    cur = connection.cursor()
-    records = []
     records_to_return = []
-    # Execute a SQL query
+    # Size of json.dumps(records_to_return), kept up to date row by row
+    size = get_size("[]")
     try:
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (STATEMENT_TIMEOUT_MS,))
+        # A server-side cursor sends rows in batches, so rows past the size
+        # limit are never transferred
+        cur = connection.cursor(name=f"query_{uuid.uuid4().hex}")
+        cur.itersize = FETCH_BATCH_SIZE
         cur.execute(sql_query)
-        rows = cur.fetchall()
-        column_names = [desc[0] for desc in cur.description]
-        for item in rows:
-            record = {}
-            for x, value in enumerate(item):
-                if type(value) is Decimal:
-                    record[column_names[x]] = float(value)
-                elif isinstance(value, date):
-                    record[column_names[x]] = str(value)
-                else:
-                    record[column_names[x]] = value
-            records.append(record)
-        if get_size(json.dumps(records)) > 24000:
-
-            for item in records:
-                if get_size(json.dumps(records_to_return)) <= 24000:
-                    records_to_return.append(item)
+        column_names = None
+        truncated = False
+        while not truncated:
+            rows = cur.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            if column_names is None:
+                column_names = [desc[0] for desc in cur.description]
+            for row in rows:
+                record = to_record(column_names, row)
+                # Each further record also adds a ", " separator
+                record_size = get_size(json.dumps(record)) + (
+                    2 if records_to_return else 0
+                )
+                if size + record_size > MAX_RESULT_BYTES:
+                    truncated = True
+                    break
+                records_to_return.append(record)
+                size += record_size
+        cur.close()
+
+        if truncated:
             message = (
-                "The data is too large, it has been truncated from "
-                + str(len(records))
-                + " to "
+                "The data is too large, it has been truncated to "
                 + str(len(records_to_return))
                 + " rows."
             )
-        else:
-            records_to_return = records
 
     except (Exception, psycopg2.Error) as error:
         print("Error executing SQL query:", error)
-        connection.rollback()  # Rollback the transaction if there's an error
-        return {"error": error.pgerror}
+        return {"error": getattr(error, "pgerror", None) or str(error)}
+    finally:
+        # Rolls back the transaction, also after an error
+        release_postgresql_connection(connection)
 
     if message != "":
         return {"result": records_to_return, "message": message}
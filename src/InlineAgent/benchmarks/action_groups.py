@@ -0,0 +1,89 @@
+"""
+Benchmark of building the action groups of an agent with many tools.
+
+Every "agent" builds an ActionGroups from the same tools and reads
+``tool_map``, ``tool_config_map`` and ``actionGroups``, as InlineAgent does
+when it is constructed. The cold run clears the function schema cache before
+every agent, which is what each construction cost before schemas were
+memoized; the warm run reuses it.
+
+    python benchmarks/action_groups.py --agents 200 --tools 40
+"""
+
+import argparse
+import sys
+import time
+
+import InlineAgent.action_group.action_group as action_group
+from InlineAgent.action_group import ActionGroup, ActionGroups
+
+TOOL_SOURCE = '''
+def tool_{index}(city: str, days: int, unit: str = "celsius", detailed: bool = False):
+    """Get the weather forecast for a city, number {index} of many similar tools.
+
+    Parameters:
+        city: The city, e.g. Seattle
+        days: Number of days to forecast,
+            between 1 and 14
+        unit: The unit to use, celsius or fahrenheit
+        detailed: Include hourly values
+
+    Returns:
+        The forecast as text.
+    """
+    return city
+'''
+
+
+def create_tools(count: int):
+    namespace = dict()
+    for index in range(count):
+        exec(TOOL_SOURCE.format(index=index), namespace)
+    return [namespace[f"tool_{index}"] for index in range(count)]
+
+
+def construct(tools, groups: int):
+    size = len(tools) // groups
+    action_groups = ActionGroups(
+        action_groups=[
+            ActionGroup(
+                name=f"Group{group}", tools=tools[group * size : (group + 1) * size]
+            )
+            for group in range(groups)
+        ]
+    )
+    action_groups.tool_map
+    action_groups.tool_config_map
+    return action_groups.actionGroups
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--tools", type=int, default=40)
+    parser.add_argument("--groups", type=int, default=4)
+    args = parser.parse_args()
+
+    tools = create_tools(args.tools)
+
+    results = dict()
+    for mode in ("cold", "warm"):
+        action_group._function_schemas.clear()
+        start = time.perf_counter()
+        for _ in range(args.agents):
+            if mode == "cold":
+                action_group._function_schemas.clear()
+            construct(tools, args.groups)
+        results[mode] = time.perf_counter() - start
+        print(
+            f"{mode:>8}: {results[mode]:.2f}s "
+            f"({results[mode] / args.agents * 1e3:.2f}ms per agent "
+            f"with {args.tools} tools)"
+        )
+
+    print(f" speedup: {results['cold'] / results['warm']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
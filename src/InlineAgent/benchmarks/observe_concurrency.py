@@ -0,0 +1,126 @@
+"""
+Stress benchmark for the ``observe`` decorator.
+
+Runs N mocked ``invoke_agent`` event streams in parallel threads with OTEL
+tracing enabled, reports throughput and checks that every invocation produced
+its own, correctly parented span tree.
+
+    python benchmarks/observe_concurrency.py --invocations 1000 --workers 64
+"""
+
+import argparse
+import builtins
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from opentelemetry import trace as otel_trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+import InlineAgent.observability.agent_instrument as agent_instrument
+from InlineAgent.observability import observe
+
+AGENT_ID = "BENCHAGENT"
+AGENT_ALIAS_ID = "BENCHALIAS"
+CALLER_CHAIN = [
+    {
+        "agentAliasArn": f"arn:aws:bedrock:us-east-1:123456789012:agent-alias/{AGENT_ID}/{AGENT_ALIAS_ID}"
+    }
+]
+
+
+def event_stream(session_id: str, intervene: bool, chunks: int, delay: float):
+    def guardrail(action: str, key: str):
+        return {
+            "trace": {
+                "sessionId": session_id,
+                "callerChain": CALLER_CHAIN,
+                "trace": {"guardrailTrace": {"action": action, key: [{}]}},
+            }
+        }
+
+    yield guardrail("NONE", "inputAssessments")
+    time.sleep(delay)
+    if intervene:
+        yield guardrail("INTERVENED", "outputAssessments")
+        time.sleep(delay)
+    for idx in range(chunks):
+        yield {"chunk": {"bytes": f"{session_id}-{idx} ".encode()}}
+        time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invocations", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--chunks", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=0.001)
+    args = parser.parse_args()
+
+    exporter = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+    otel_trace.set_tracer_provider(tracer_provider)
+    agent_instrument.config.PRODUCE_BEDROCK_OTEL_TRACES = True
+
+    @observe(show_traces=False, save_traces=False)
+    def invoke_agent(inputText: str, sessionId: str, **kwargs):
+        return {
+            "completion": event_stream(
+                sessionId, kwargs.pop("intervene"), args.chunks, args.delay
+            )
+        }
+
+    def run(idx: int):
+        return invoke_agent(
+            inputText="Hello",
+            sessionId=f"session-{idx}",
+            agentId=AGENT_ID,
+            agentAliasId=AGENT_ALIAS_ID,
+            streamingConfigurations={"streamFinalResponse": True},
+            intervene=idx % 2 == 1,
+        )
+
+    print_ = builtins.print
+    builtins.print = lambda *a, **k: None
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(run, range(args.invocations)))
+    finally:
+        builtins.print = print_
+    elapsed = time.perf_counter() - start
+
+    spans = exporter.get_finished_spans()
+    roots = {span.context.trace_id: span for span in spans if span.parent is None}
+    children = defaultdict(list)
+    for span in spans:
+        if span.parent is not None:
+            children[span.context.trace_id].append(span)
+
+    errors = 0
+    if len(roots) != args.invocations:
+        print(f"expected {args.invocations} root spans, got {len(roots)}")
+        errors += 1
+    for trace_id, root in roots.items():
+        guardrails = children[trace_id]
+        if len(guardrails) != 2 or any(
+            span.parent.span_id != root.context.span_id for span in guardrails
+        ):
+            errors += 1
+
+    print(
+        f"{args.invocations} invocations on {args.workers} threads in {elapsed:.2f}s "
+        f"({args.invocations / elapsed:,.0f} invocations/s), {len(spans)} spans, "
+        f"{errors} broken span trees"
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
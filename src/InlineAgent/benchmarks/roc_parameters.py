@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of return of control parameter decoding.
+
+Decodes the parameters of realistic ROC payloads (strings, numbers,
+booleans, JSON arrays and Bedrock's ``[{key=value}]`` arrays) with the
+compiled decoder, against the string rewriting ProcessROC used before, and
+prints what each of them decodes.
+
+    python benchmarks/roc_parameters.py --iterations 100000
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List
+
+from InlineAgent.agent.roc_parameters import get_parameter_decoder
+
+
+def search_flights(
+    origin: str,
+    destination: str,
+    passengers: int,
+    max_price: float,
+    direct_only: bool,
+    airlines: List[str],
+    filters: list,
+):
+    pass
+
+
+PAYLOAD = [
+    {"name": "origin", "type": "string", "value": "SEA"},
+    {"name": "destination", "type": "string", "value": "JFK"},
+    {"name": "passengers", "type": "integer", "value": "2"},
+    {"name": "max_price", "type": "number", "value": "450.75"},
+    {"name": "direct_only", "type": "boolean", "value": "false"},
+    {"name": "airlines", "type": "array", "value": '["AS", "DL", "B6"]'},
+    {
+        "name": "filters",
+        "type": "array",
+        "value": "[{name=cabin, value=economy}, {name=bags, value=1}]",
+    },
+]
+
+
+def legacy_decode(parameters):
+    """The conversion ProcessROC.process_roc did inline before."""
+    decoded = dict()
+    for param in parameters:
+        if param["type"] == "array":
+            result = None
+            try:
+                result = json.loads(param["value"])
+            except Exception:
+                json_str = (
+                    param["value"]
+                    .replace("=", ":")
+                    .replace("[{", '[{"')
+                    .replace("}]", '"}]')
+                )
+                json_str = json_str.replace(", ", '", "').replace(":", '":"')
+                result = json.loads(json_str)
+            finally:
+                decoded[param["name"]] = result
+        elif param["type"] == "string":
+            decoded[param["name"]] = param["value"]
+        elif param["type"] == "number":
+            decoded[param["name"]] = int(param["value"])
+        elif param["type"] == "boolean":
+            decoded[param["name"]] = bool(param["value"])
+        elif param["type"] == "integer":
+            decoded[param["name"]] = int(param["value"])
+    return decoded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    # int("450.75") fails, the legacy path only handles whole numbers
+    legacy_payload = [
+        dict(param, value="450") if param["name"] == "max_price" else param
+        for param in PAYLOAD
+    ]
+
+    def compiled():
+        get_parameter_decoder(search_flights).decode("search_flights", PAYLOAD)
+
+    def legacy():
+        legacy_decode(legacy_payload)
+
+    print(f"legacy:   {legacy_decode(legacy_payload)}")
+    print(
+        f"compiled: {get_parameter_decoder(search_flights).decode('search_flights', PAYLOAD)}"
+    )
+    results = dict()
+    for name, decode in (("legacy", legacy), ("compiled", compiled)):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            decode()
+        results[name] = time.perf_counter() - start
+        print(
+            f"{name:>8}: {results[name]:.2f}s "
+            f"({results[name] / args.iterations * 1e6:.1f}us per invocation)"
+        )
+
+    print(f" speedup: {results['legacy'] / results['compiled']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark of the pydantic and the fast span manager.
+
+Replays the span bookkeeping of an agent turn (agent span, L2/L3 spans per
+trace step, collaborator spans) against a no-op tracer, so only the manager
+overhead is measured.
+
+    python benchmarks/span_manager.py --turns 2000 --steps 20
+"""
+
+import argparse
+import sys
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import StatusCode
+
+import InlineAgent.observability.span_manager as span_manager
+
+FAMILY = "3f1c2a4e-9b7d-4c1e-8f2a-6d5b4c3a2e1f"
+CALLER_CHAIN = [
+    {
+        "agentAliasArn": "arn:aws:bedrock:us-east-1:123456789012:agent-alias/BENCHAGENT/BENCHALIAS"
+    }
+]
+
+
+def turn(manager, steps: int):
+    manager.create_agent_span_return(
+        agent_session_id="session",
+        caller_chain=CALLER_CHAIN,
+        attributes={"input": "Hello"},
+        name="agent",
+    )
+    for step in range(steps):
+        trace_id = f"{FAMILY}-{step}"
+        manager.assign_new_l2_return(
+            agent_session_id="session",
+            caller_chain=CALLER_CHAIN,
+            trace_id=trace_id,
+            l2_attributes={"step": step},
+            l3_attributes={"step": step},
+            l2_name="orchestration",
+            l3_name="llm",
+        )
+        manager.assign_new_l3_return(
+            agent_session_id="session",
+            collab_agent_trace_id="COLLAB:ALIAS",
+            trace_id=trace_id,
+            attributes={"step": step},
+            name="tool",
+        )
+        manager.delete_l3_span(
+            agent_session_id="session",
+            collab_agent_trace_id="COLLAB:ALIAS",
+            trace_id=trace_id,
+        )
+    manager.end_all_spans(status_code=StatusCode.OK)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    # A provider without processors records spans but exports nothing
+    span_manager.tracer = TracerProvider().get_tracer("benchmark")
+
+    results = dict()
+    for implementation in ("pydantic", "fast"):
+        start = time.perf_counter()
+        for _ in range(args.turns):
+            turn(span_manager.create_span_manager(implementation), args.steps)
+        results[implementation] = time.perf_counter() - start
+        calls = args.turns * (args.steps * 3 + 2)
+        print(
+            f"{implementation:>8}: {results[implementation]:.2f}s "
+            f"({results[implementation] / calls * 1e6:.1f}us per call)"
+        )
+
+    print(f" speedup: {results['pydantic'] / results['fast']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
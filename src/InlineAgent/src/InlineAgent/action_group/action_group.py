@@ -1,6 +1,9 @@
+import copy
 import json
+import weakref
 from functools import cached_property
 import re
+from threading import Lock
 from typing import (
     Annotated,
     List,
@@ -15,10 +18,26 @@ from typing import (
 )
 from inspect import Parameter, signature
 import boto3
-from pydantic import BaseModel, computed_field, model_validator, validate_call, Field
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    computed_field,
+    model_validator,
+    validate_call,
+)
 
+from InlineAgent.clients import get_account_id, get_session
 from InlineAgent.tools import MCPServer
-from InlineAgent.types import APISchema, Executor, FunctionDefination
+from InlineAgent.types import APISchema, Executor, FunctionDefination, ToolConfig
+
+_SPACES = re.compile(" +")
+
+# Function schemas per tool, dropped together with the function
+_function_schemas: "weakref.WeakKeyDictionary[Callable, Dict[Tuple, Dict]]" = (
+    weakref.WeakKeyDictionary()
+)
+_function_schemas_lock = Lock()
 
 
 class ActionGroup(BaseModel):
@@ -36,12 +55,36 @@ class ActionGroup(BaseModel):
     ] = Field(default_factory=dict)
     argument_key: str = "Parameters:"
     return_key: str = "Returns:"
+    tool_config: ToolConfig = Field(default_factory=ToolConfig)
+    tool_overrides: Dict[str, ToolConfig] = Field(default_factory=dict)
     test: bool = False
+    _tool_schemas: List[Dict] = PrivateAttr(default_factory=list)
+    _schema_tools: Tuple = PrivateAttr(default=())
 
     class Config:
         arbitrary_types_allowed = True
         extra = "forbid"
 
+    @model_validator(mode="after")
+    def build_tool_schemas(self) -> Self:
+        self.tool_schemas()
+        return self
+
+    def tool_schemas(self) -> List[Dict]:
+        """Function schemas of ``tools``, rebuilt only when the tools change."""
+        tools = tuple(self.tools)
+        if tools != self._schema_tools:
+            self._tool_schemas = [
+                ActionGroupBuilder.create_function_schema(
+                    func=func,
+                    argument_key=self.argument_key,
+                    return_key=self.return_key,
+                )
+                for func in tools
+            ]
+            self._schema_tools = tools
+        return self._tool_schemas
+
     @computed_field
     @property
     def executor(self) -> Executor:
@@ -67,7 +110,7 @@ class ActionGroup(BaseModel):
         print(
             f"Using `{self.profile}` [profile](https://docs.aws.amazon.com/cli/v1/userguide/cli-configure-files.html)."
         )
-        return boto3.Session(profile_name=self.profile)
+        return get_session(profile=self.profile)
 
     @computed_field
     @cached_property
@@ -77,9 +120,7 @@ class ActionGroup(BaseModel):
         try:
             if self.test:
                 return "Mock-Account", "Mock-Region"
-            sts_client = self.session.client("sts")
-            identity = sts_client.get_caller_identity()
-            return identity["Account"], self.session.region_name
+            return get_account_id(profile=self.profile), self.session.region_name
         except Exception as e:
             return "Mock-Account", "Mock-Region"
 
@@ -242,7 +283,7 @@ class ActionGroups(BaseModel):
     action_groups: List[ActionGroup]
 
     @computed_field
-    @property
+    @cached_property
     def tool_map(self) -> Dict[str, Callable]:
         tool_map = dict()
 
@@ -261,7 +302,25 @@ class ActionGroups(BaseModel):
         return tool_map
 
     @computed_field
-    @property
+    @cached_property
+    def tool_config_map(self) -> Dict[str, ToolConfig]:
+        tool_config_map = dict()
+
+        for action_group in self.action_groups:
+            if action_group.executor == Executor.RETURN_CONTROL:
+                tool_names = [tool.__name__ for tool in action_group.tools]
+                for current_client in action_group.mcp_clients or []:
+                    tool_names.extend(current_client.callable_tools)
+
+                for tool_name in tool_names:
+                    tool_config_map[tool_name] = action_group.tool_overrides.get(
+                        tool_name, action_group.tool_config
+                    )
+
+        return tool_config_map
+
+    @computed_field
+    @cached_property
     def actionGroups(self) -> List:
         actionGroups = list()
 
@@ -286,14 +345,7 @@ class ActionGroups(BaseModel):
                     actionGroup["functionSchema"] = function_schema
                 else:
                     actionGroup["functionSchema"] = {
-                        "functions": [
-                            ActionGroupBuilder.create_function_schema(
-                                func=func,
-                                argument_key=action_group.argument_key,
-                                return_key=action_group.return_key,
-                            )
-                            for func in action_group.tools
-                        ],
+                        "functions": action_group.tool_schemas(),
                     }
             elif action_group.executor == Executor.LAMBDA:
                 actionGroup["actionGroupExecutor"] = {"lambda": action_group.lamnda_arn}
@@ -360,19 +412,8 @@ class ActionGroupBuilder:
     @staticmethod
     @validate_call
     def clean_string(line: str) -> str:
-        clean_line = str()
-        prev_char: str = None
-        for character in line:
-
-            if character == " ":
-                prev_char = " "
-            else:
-                if prev_char == " ":
-                    clean_line += " " + character
-                else:
-                    clean_line += character
-                prev_char = character
-        return clean_line
+        """Collapse runs of spaces into one and drop trailing spaces."""
+        return _SPACES.sub(" ", line.rstrip(" "))
 
     @staticmethod
     @validate_call
@@ -490,7 +531,42 @@ class ActionGroupBuilder:
     def create_function_schema(
         func: Callable, argument_key: str = "Parameters:", return_key: str = "Returns:"
     ) -> FunctionDefination:
+        """
+        Function schema of a tool, memoized per function object.
+
+        The cache entry is keyed by everything the schema is built from, so
+        replacing the function's code, docstring or confirmation flag builds
+        it again. Callers get their own copy of the cached schema.
+        """
+        key = (
+            getattr(func, "__code__", None),
+            func.__doc__,
+            getattr(func, "__is_confirmation_required__", False),
+            argument_key,
+            return_key,
+        )
+        try:
+            schemas = _function_schemas.get(func)
+        except TypeError:
+            # Not weak referenceable or not hashable, e.g. some callable objects
+            return ActionGroupBuilder.build_function_schema(
+                func=func, argument_key=argument_key, return_key=return_key
+            )
+        if schemas is None or key not in schemas:
+            schema = ActionGroupBuilder.build_function_schema(
+                func=func, argument_key=argument_key, return_key=return_key
+            )
+            with _function_schemas_lock:
+                _function_schemas.setdefault(func, dict())[key] = schema
+        else:
+            schema = schemas[key]
+        return copy.deepcopy(schema)
 
+    @staticmethod
+    def build_function_schema(
+        func: Callable, argument_key: str = "Parameters:", return_key: str = "Returns:"
+    ) -> Dict:
+        """Build the function schema of a tool from its docstring and signature."""
         if func.__doc__ is None:
             raise ValueError("Docstring is empty or None")
 
@@ -11,8 +11,21 @@ Amazon Bedrock.
 from .inline_agent import (
     InlineAgent,
 )
-from .confirmation import require_confirmation
+from .confirmation import (
+    AutoApproveConfirmationProvider,
+    ConfirmationProvider,
+    ConfirmationRequest,
+    ConsoleConfirmationProvider,
+    QueueConfirmationProvider,
+    WebhookConfirmationProvider,
+    get_confirmation_provider,
+    require_confirmation,
+    set_confirmation_provider,
+)
 from .process_roc import ProcessROC
+from .event_stream import AsyncEventStream
+from .answer_buffer import AnswerBuffer
+from .batch import BatchRequest, BatchResult, run_batch, stream_batch
 from .collaborator_agent_instance import (
     CollaboratorAgent,
 )
@@ -20,6 +33,20 @@ from .collaborator_agent_instance import (
 __all__ = [
     "InlineAgent",
     "require_confirmation",
+    "ConfirmationProvider",
+    "ConfirmationRequest",
+    "ConsoleConfirmationProvider",
+    "QueueConfirmationProvider",
+    "WebhookConfirmationProvider",
+    "AutoApproveConfirmationProvider",
+    "get_confirmation_provider",
+    "set_confirmation_provider",
     "ProcessROC",
+    "AsyncEventStream",
+    "AnswerBuffer",
+    "BatchRequest",
+    "BatchResult",
+    "run_batch",
+    "stream_batch",
     "CollaboratorAgent",
 ]
@@ -0,0 +1,61 @@
+import asyncio
+import codecs
+from typing import AsyncIterator, Dict, List, Optional
+
+_CLOSED = object()
+
+
+class AnswerBuffer:
+    """
+    Incremental assembly of an agent's streamed final answer.
+
+    Chunk bytes go through a UTF-8 incremental decoder, so a multi-byte
+    character split across chunks is decoded once, when complete. Decoded
+    deltas are kept in a list and joined only when ``text`` is read. Iterating
+    the buffer with ``async for`` yields every delta as it arrives until the
+    buffer is closed; a buffer has a single consumer.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._parts: List[str] = list()
+        self._text: Optional[str] = ""
+        self._deltas: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        # LLM calls, token counts and duration of the invocation, once it ends
+        self.usage: Dict = dict()
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._parts)
+            self._parts = [self._text]
+        return self._text
+
+    def write(self, data: bytes) -> str:
+        """Decode a chunk of bytes and return the text it completes."""
+        delta = self._decoder.decode(data)
+        self.write_text(delta)
+        return delta
+
+    def write_text(self, delta: str):
+        if not delta:
+            return
+        self._parts.append(delta)
+        self._text = None
+        self._deltas.put_nowait(delta)
+
+    def close(self):
+        """Flush the decoder and end iteration; safe to call more than once."""
+        if self.closed:
+            return
+        self.write_text(self._decoder.decode(b"", final=True))
+        self.closed = True
+        self._deltas.put_nowait(_CLOSED)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            delta = await self._deltas.get()
+            if delta is _CLOSED:
+                return
+            yield delta
@@ -0,0 +1,310 @@
+"""
+Run an InlineAgent over many prompts with bounded concurrency.
+
+Requests are pulled lazily from the input iterable by ``concurrency`` workers,
+optionally paced by a token bucket. A throttled request is retried after an
+adaptive delay shared by every batch calling the same foundation model, and
+each result is appended to a JSON Lines file as soon as it completes.
+"""
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from threading import Lock
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from botocore.exceptions import ClientError
+
+from InlineAgent.agent.answer_buffer import AnswerBuffer
+from InlineAgent.observability.event_sink import EventSink, NoopEventSink
+
+THROTTLING_ERROR_CODES = frozenset(
+    {
+        "ThrottlingException",
+        "TooManyRequestsException",
+        "ServiceQuotaExceededException",
+        "throttlingException",
+    }
+)
+
+
+@dataclass
+class BatchRequest:
+    input_text: str
+    session_id: Optional[str] = None
+    # Extra keyword arguments for InlineAgent.invoke, e.g. session_state
+    invoke_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    index: int
+    session_id: str
+    input_text: str
+    output: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    latency: float = 0.0
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+BatchInput = Union[str, Tuple[str, str], BatchRequest]
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """True if an error, or any error it wraps, is a Bedrock throttling error."""
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, ClientError):
+            if current.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+                return True
+        if type(current).__name__ in THROTTLING_ERROR_CODES:
+            return True
+        # InlineAgent.invoke re-raises stream errors wrapped in a plain Exception
+        pending.extend(
+            arg
+            for arg in getattr(current, "args", ())
+            if isinstance(arg, BaseException)
+        )
+        pending.extend([current.__cause__, current.__context__])
+    return False
+
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` acquisitions per second, bursting to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AdaptiveBackoff:
+    """
+    Delay before each request to a model, grown on throttling and decayed on success.
+
+    The delay doubles (from ``initial``, up to ``maximum``) every time a
+    request is throttled and halves after every successful one, so a batch
+    settles near the highest rate the model's quota allows.
+    """
+
+    def __init__(
+        self,
+        initial: float = 1.0,
+        maximum: float = 60.0,
+        multiplier: float = 2.0,
+        decay: float = 0.5,
+    ):
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.decay = decay
+        self.delay = 0.0
+        self._lock = Lock()
+
+    def on_throttle(self):
+        with self._lock:
+            self.delay = min(
+                max(self.delay * self.multiplier, self.initial), self.maximum
+            )
+
+    def on_success(self):
+        with self._lock:
+            self.delay *= self.decay
+            if self.delay < self.initial / 10:
+                self.delay = 0.0
+
+    async def wait(self):
+        delay = self.delay
+        if delay:
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+
+
+_backoffs: Dict[str, AdaptiveBackoff] = dict()
+_backoffs_lock = Lock()
+
+
+def get_model_backoff(foundation_model: str) -> AdaptiveBackoff:
+    """Return the backoff shared by every batch calling a foundation model."""
+    with _backoffs_lock:
+        backoff = _backoffs.get(foundation_model)
+        if backoff is None:
+            backoff = AdaptiveBackoff()
+            _backoffs[foundation_model] = backoff
+    return backoff
+
+
+def _as_request(item: BatchInput) -> BatchRequest:
+    if isinstance(item, BatchRequest):
+        return item
+    if isinstance(item, str):
+        return BatchRequest(input_text=item)
+    input_text, session_id = item
+    return BatchRequest(input_text=input_text, session_id=session_id)
+
+
+async def _run_request(
+    agent,
+    index: int,
+    request: BatchRequest,
+    backoff: AdaptiveBackoff,
+    rate_limiter: Optional[TokenBucket],
+    max_retries: int,
+    event_sink: EventSink,
+    invoke_kwargs: Dict[str, Any],
+) -> BatchResult:
+    result = BatchResult(
+        index=index,
+        session_id=request.session_id or str(uuid.uuid4()),
+        input_text=request.input_text,
+    )
+    start = time.perf_counter()
+
+    while True:
+        await backoff.wait()
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+
+        result.attempts += 1
+        answer = AnswerBuffer()
+        try:
+            result.output = await agent.invoke(
+                input_text=request.input_text,
+                session_id=result.session_id,
+                answer_buffer=answer,
+                event_sink=event_sink,
+                **{**invoke_kwargs, **request.invoke_kwargs},
+            )
+        except Exception as e:
+            if is_throttling_error(e) and result.attempts <= max_retries:
+                backoff.on_throttle()
+                continue
+            result.error = f"{type(e).__name__}: {e}"
+            break
+
+        backoff.on_success()
+        result.llm_calls = answer.usage.get("llmCalls", 0)
+        result.input_tokens = answer.usage.get("inputTokens", 0)
+        result.output_tokens = answer.usage.get("outputTokens", 0)
+        break
+
+    result.latency = time.perf_counter() - start
+    return result
+
+
+async def stream_batch(
+    agent,
+    requests: Iterable[BatchInput],
+    concurrency: int = 8,
+    requests_per_second: Optional[float] = None,
+    burst: Optional[float] = None,
+    max_retries: int = 5,
+    output_path: Optional[str] = None,
+    event_sink: Optional[EventSink] = None,
+    **invoke_kwargs,
+) -> AsyncIterator[BatchResult]:
+    """
+    Invoke ``agent`` for every request and yield results as they complete.
+
+    A request is a prompt, a ``(prompt, session_id)`` tuple or a
+    ``BatchRequest``; prompts without a session id get a fresh one. At most
+    ``concurrency`` invocations run at once, started at no more than
+    ``requests_per_second`` (bursting to ``burst``) when set. Throttled
+    requests are retried up to ``max_retries`` times; any other error is
+    reported in ``BatchResult.error``. With ``output_path``, every result is
+    appended to that file as one JSON line. Agent output goes to
+    ``event_sink``, which is silent by default.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    backoff = get_model_backoff(agent.foundation_model)
+    rate_limiter = (
+        TokenBucket(rate=requests_per_second, capacity=burst)
+        if requests_per_second
+        else None
+    )
+    event_sink = event_sink or NoopEventSink()
+    pending = iter(enumerate(requests))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        for index, item in pending:
+            results.put_nowait(
+                await _run_request(
+                    agent=agent,
+                    index=index,
+                    request=_as_request(item),
+                    backoff=backoff,
+                    rate_limiter=rate_limiter,
+                    max_retries=max_retries,
+                    event_sink=event_sink,
+                    invoke_kwargs=invoke_kwargs,
+                )
+            )
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    done = asyncio.ensure_future(asyncio.gather(*workers))
+    done.add_done_callback(lambda _: results.put_nowait(None))
+
+    output = open(output_path, "a", encoding="utf-8") if output_path else None
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            if output is not None:
+                output.write(json.dumps(asdict(result), default=str) + "\n")
+                output.flush()
+            yield result
+        # Surface errors raised outside of invoke, e.g. by the input iterable
+        await done
+    finally:
+        if output is not None:
+            output.close()
+        for task in workers:
+            task.cancel()
+
+
+async def run_batch(
+    agent, requests: Iterable[BatchInput], **kwargs
+) -> List[BatchResult]:
+    """Run ``stream_batch`` to completion and return the results in input order."""
+    results = [result async for result in stream_batch(agent, requests, **kwargs)]
+    return sorted(results, key=lambda result: result.index)
@@ -16,6 +16,7 @@ from InlineAgent.constants import (
     TraceColor,
 )
 from InlineAgent.agent.process_roc import ProcessROC
+from InlineAgent.clients import get_account_id, get_region, get_session
 from InlineAgent.observability import Trace
 
 
@@ -30,17 +31,15 @@ class CollaboratorAgent:
     @property
     def session(self) -> boto3.Session:
         """Lazy loading of AWS session"""
-        return boto3.Session(profile_name=self.profile)
+        return get_session(profile=self.profile)
 
     @property
     def account_id(self) -> str:
-        sts_client = self.session.client("sts")
-        identity = sts_client.get_caller_identity()
-        return identity["Account"]
+        return get_account_id(profile=self.profile)
 
     @property
     def region(self) -> str:
-        return self.session.region_name
+        return get_region(profile=self.profile)
 
     def __post_init__(self):
 
@@ -1,5 +1,20 @@
+import asyncio
+import inspect
+import json
+import queue
+import urllib.request
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
 from functools import wraps
-from typing import Callable
+from threading import Condition, Lock, Thread
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from InlineAgent.agent.event_stream import run_blocking
+
+# Seconds to wait for a webhook to accept a confirmation request
+WEBHOOK_TIMEOUT = 10
 
 
 def require_confirmation(message: str = None):
@@ -23,3 +38,231 @@ def require_confirmation(message: str = None):
         message = None
         return decorator(func)
     return decorator
+
+
+@dataclass
+class ConfirmationRequest:
+    """A tool invocation waiting for a human to approve it."""
+
+    function: str
+    action_group: str
+    parameters: Dict[str, Any]
+    session_id: Optional[str] = None
+    message: str = ""
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    def __post_init__(self):
+        if not self.message:
+            self.message = f"Do you want to proceed with {self.function} with parameters : {json.dumps(self.parameters, default=str)}?"
+
+
+class ConfirmationProvider(ABC):
+    """
+    Decides whether a tool invocation that requires confirmation may run.
+
+    ``confirm`` is awaited by the session that needs the answer only, so
+    other sessions keep running while it waits. Requests not answered within
+    ``timeout`` seconds are denied.
+    """
+
+    timeout: Optional[float] = None
+
+    @abstractmethod
+    async def confirm(self, request: ConfirmationRequest) -> bool:
+        pass
+
+
+class ConsoleConfirmationProvider(ConfirmationProvider):
+    """
+    Asks on stdin, one question at a time, without blocking the event loop.
+
+    A single daemon thread owns stdin and asks the oldest waiting request. A
+    line typed for a request that timed out in the meantime is dropped
+    instead of answering the next one, which is then asked in turn.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._waiting: (
+            "OrderedDict[str, Tuple[ConfirmationRequest, asyncio.Future]]"
+        ) = OrderedDict()
+        self._condition = Condition()
+        self._reader: Optional[Thread] = None
+
+    @staticmethod
+    def _set_result(future: asyncio.Future, approved: bool) -> None:
+        def set_result():
+            if not future.done():
+                future.set_result(approved)
+
+        try:
+            future.get_loop().call_soon_threadsafe(set_result)
+        except RuntimeError:
+            # The loop of the request closed while its prompt was shown
+            pass
+
+    def _read_answers(self) -> None:
+        while True:
+            with self._condition:
+                while not self._waiting:
+                    self._condition.wait()
+                request, future = next(iter(self._waiting.values()))
+
+            # stdin is read without holding the lock, new requests keep queueing
+            try:
+                response = input(f"{request.message} (y/n): ").lower()
+            except EOFError:
+                with self._condition:
+                    waiting = list(self._waiting.values())
+                    self._waiting.clear()
+                    self._reader = None
+                for _, pending_future in waiting:
+                    self._set_result(pending_future, False)
+                return
+
+            if response in ["y", "yes", "n", "no"]:
+                with self._condition:
+                    answered = self._waiting.pop(request.id, None)
+                if answered is None:
+                    print("That confirmation request has expired, answer ignored.")
+                else:
+                    self._set_result(future, response in ["y", "yes"])
+            else:
+                print("Please enter 'y' for yes or 'n' for no.")
+
+    async def confirm(self, request: ConfirmationRequest) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        with self._condition:
+            self._waiting[request.id] = (request, future)
+            if self._reader is None:
+                self._reader = Thread(
+                    target=self._read_answers,
+                    name="InlineAgent-confirmation",
+                    daemon=True,
+                )
+                self._reader.start()
+            self._condition.notify()
+        try:
+            return await future
+        finally:
+            # Cancelled on timeout: a later answer to its prompt is dropped
+            with self._condition:
+                self._waiting.pop(request.id, None)
+
+
+class QueueConfirmationProvider(ConfirmationProvider):
+    """
+    Puts requests on ``requests`` for another component, e.g. a web UI, which
+    answers them with ``resolve``. ``resolve`` may be called from any thread.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.requests: "queue.Queue[ConfirmationRequest]" = queue.Queue()
+        self._pending: Dict[str, asyncio.Future] = dict()
+        self._pending_lock = Lock()
+
+    async def publish(self, request: ConfirmationRequest) -> None:
+        self.requests.put_nowait(request)
+
+    async def confirm(self, request: ConfirmationRequest) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        with self._pending_lock:
+            self._pending[request.id] = future
+        try:
+            await self.publish(request)
+            return await future
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request.id, None)
+
+    def resolve(self, request_id: str, approved: bool) -> bool:
+        """Answer a pending request; False if it is unknown or already answered."""
+        with self._pending_lock:
+            future = self._pending.get(request_id)
+        if future is None:
+            return False
+
+        def set_result():
+            if not future.done():
+                future.set_result(bool(approved))
+
+        future.get_loop().call_soon_threadsafe(set_result)
+        return True
+
+    @property
+    def pending(self) -> List[str]:
+        with self._pending_lock:
+            return list(self._pending)
+
+
+class WebhookConfirmationProvider(QueueConfirmationProvider):
+    """
+    POSTs every request as JSON to ``url``; the receiving service answers
+    later by having the application call ``resolve``, e.g. from its own
+    callback endpoint.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ):
+        super().__init__(timeout=timeout)
+        self.url = url
+        self.headers = headers or dict()
+
+    def _post(self, request: ConfirmationRequest) -> None:
+        http_request = urllib.request.Request(
+            self.url,
+            data=json.dumps(asdict(request), default=str).encode(),
+            headers={"Content-Type": "application/json", **self.headers},
+            method="POST",
+        )
+        with urllib.request.urlopen(http_request, timeout=WEBHOOK_TIMEOUT):
+            pass
+
+    async def publish(self, request: ConfirmationRequest) -> None:
+        await run_blocking(self._post, request)
+
+
+class AutoApproveConfirmationProvider(ConfirmationProvider):
+    """
+    Answers with ``policy``, a plain or async callable taking the request.
+    Without a policy every request is approved.
+    """
+
+    def __init__(
+        self,
+        policy: Optional[
+            Callable[[ConfirmationRequest], Union[bool, Awaitable[bool]]]
+        ] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.policy = policy
+        self.timeout = timeout
+
+    async def confirm(self, request: ConfirmationRequest) -> bool:
+        if self.policy is None:
+            return True
+        approved = self.policy(request)
+        if inspect.isawaitable(approved):
+            approved = await approved
+        return bool(approved)
+
+
+_confirmation_provider: ConfirmationProvider = ConsoleConfirmationProvider()
+_confirmation_provider_lock = Lock()
+
+
+def get_confirmation_provider() -> ConfirmationProvider:
+    """Return the process wide provider, a ConsoleConfirmationProvider unless replaced."""
+    return _confirmation_provider
+
+
+def set_confirmation_provider(provider: ConfirmationProvider) -> None:
+    """Replace the process wide confirmation provider."""
+    global _confirmation_provider
+    with _confirmation_provider_lock:
+        _confirmation_provider = provider
@@ -0,0 +1,75 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+# Blocking reads on an EventStream hold a worker thread for the whole time the
+# agent is thinking, so the pool is sized for many concurrent sessions rather
+# than for CPU work.
+STREAM_EXECUTOR_MAX_WORKERS = 256
+
+_SENTINEL = object()
+_executor: Optional[Executor] = None
+_executor_lock = Lock()
+
+
+def get_stream_executor() -> Executor:
+    """Return the process wide executor used to drive blocking botocore calls."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=STREAM_EXECUTOR_MAX_WORKERS,
+                    thread_name_prefix="InlineAgentStream",
+                )
+    return _executor
+
+
+def set_stream_executor(executor: Executor) -> None:
+    """Replace the process wide stream executor, e.g. to tune its size."""
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+async def run_blocking(
+    func: Callable, *args, executor: Optional[Executor] = None, **kwargs
+) -> Any:
+    """Run a blocking callable off the event loop and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor or get_stream_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+class AsyncEventStream:
+    """
+    Async iterator over a blocking botocore EventStream.
+
+    Every read from the underlying stream happens on a worker thread, so a slow
+    agent turn only parks its own coroutine instead of the whole event loop.
+    """
+
+    def __init__(self, event_stream: Iterable, executor: Optional[Executor] = None):
+        self._event_stream = event_stream
+        self._iterator = iter(event_stream)
+        self._executor = executor
+
+    def __aiter__(self) -> AsyncIterator[Dict]:
+        return self
+
+    async def __anext__(self) -> Dict:
+        event = await run_blocking(
+            next, self._iterator, _SENTINEL, executor=self._executor
+        )
+        if event is _SENTINEL:
+            raise StopAsyncIteration
+        return event
+
+    def close(self):
+        """Release the underlying HTTP connection if the stream supports it."""
+        close = getattr(self._event_stream, "close", None)
+        if callable(close):
+            close()
@@ -1,32 +1,72 @@
+import asyncio
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
 from datetime import datetime, UTC
 
 import json
 import uuid
 import copy
-import os
 import boto3
-from typing import Callable, Dict, List, Literal, Optional, Tuple, Union
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
 from pydantic import Field
-from termcolor import colored
-from rich.console import Console
-from rich.markdown import Markdown
 
 
 from InlineAgent.action_group import ActionGroups
 from InlineAgent.action_group.action_group import ActionGroup
 from InlineAgent.agent.collaborator_agent_instance import CollaboratorAgent
+from InlineAgent.clients import get_account_id, get_client, get_region, get_session
+from InlineAgent.file_sink import FileSink, get_file_sink
 from InlineAgent.constants import (
     USER_INPUT_ACTION_GROUP_NAME,
     TraceColor,
 )
+from InlineAgent.agent.answer_buffer import AnswerBuffer
+from InlineAgent.agent.confirmation import ConfirmationProvider
+from InlineAgent.agent.batch import BatchInput, BatchResult, run_batch
+from InlineAgent.agent.event_stream import AsyncEventStream, run_blocking
 from InlineAgent.agent.process_roc import ProcessROC
 from InlineAgent.observability import Trace
+from InlineAgent.observability.event_sink import (
+    AgentEvent,
+    AgentEventType,
+    EventSink,
+    get_event_sink,
+)
 from InlineAgent.knowledge_base import KnowledgeBasePlugin
 from InlineAgent.tools.mcp import MCPServer
 from InlineAgent.types import (
     InlineCollaboratorAgentConfig,
     InlineCollaboratorConfigurations,
+    ToolConfig,
+)
+
+# Fields that end up in the invokeInlineAgent request. Assigning any of them
+# invalidates the cached request parameters.
+INVOKE_PARAM_FIELDS = frozenset(
+    {
+        "foundation_model",
+        "agent_name",
+        "instruction",
+        "action_groups",
+        "agent_collaboration",
+        "collaborator_configuration",
+        "collaborators",
+        "customer_encryption_key_arn",
+        "guardrail_configuration",
+        "idle_session_ttl_in_seconds",
+        "knowledge_bases",
+        "prompt_override_configuration",
+    }
 )
 
 
@@ -50,21 +90,49 @@ class InlineAgent:
     profile: str = field(default="default")
     user_input: bool = False
     tool_map: Dict[str, Callable] = None
+    tool_config_map: Dict[str, ToolConfig] = None
+    stream_executor: Optional[Executor] = None
+    # Receives answer, trace and stats events; the process default is the console
+    event_sink: Optional[EventSink] = None
+    # Writes code interpreter output files; the process default is ./output
+    file_sink: Optional[FileSink] = None
+    # Approves tools that require confirmation; the process default asks on stdin
+    confirmation_provider: Optional[ConfirmationProvider] = None
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in INVOKE_PARAM_FIELDS:
+            self.invalidate_invoke_params()
+
+    def invalidate_invoke_params(self):
+        """
+        Drop the cached request parameters.
+
+        Assigning a configuration field does this automatically; call it after
+        mutating a field in place, e.g. appending to ``action_groups``.
+        """
+        self.__dict__["_config_version"] = self.__dict__.get("_config_version", 0) + 1
+
+    def _config_fingerprint(self) -> Tuple:
+        collaborators = tuple(
+            (id(collaborator), collaborator._config_fingerprint())
+            for collaborator in self.collaborators or []
+            if isinstance(collaborator, InlineAgent)
+        )
+        return (self.__dict__.get("_config_version", 0), collaborators)
 
     @property
     def session(self) -> boto3.Session:
         """Lazy loading of AWS session"""
-        return boto3.Session(profile_name=self.profile)
+        return get_session(profile=self.profile)
 
     @property
     def account_id(self) -> str:
-        sts_client = self.session.client("sts")
-        identity = sts_client.get_caller_identity()
-        return identity["Account"]
+        return get_account_id(profile=self.profile)
 
     @property
     def region(self) -> str:
-        return self.session.region_name
+        return get_region(profile=self.profile)
 
     def __post_init__(self):
 
@@ -87,6 +155,7 @@ class InlineAgent:
                 self.action_groups = ActionGroups(action_groups=self.action_groups)
 
             self.tool_map = self.action_groups.tool_map
+            self.tool_config_map = self.action_groups.tool_config_map
 
             self.action_groups = self.action_groups.actionGroups
 
@@ -140,6 +209,22 @@ class InlineAgent:
             self.collaborator_configuration.instruction = self.instruction
 
     def get_invoke_params(self) -> Dict:
+        """
+        Return the agent configuration part of the invokeInlineAgent request.
+
+        The payload is built once and reused by every turn and session until
+        the configuration of this agent or of an inline collaborator changes.
+        The nested values are shared between calls and must not be mutated.
+        """
+        fingerprint = self._config_fingerprint()
+        cached = self.__dict__.get("_invoke_params")
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, self._build_invoke_params())
+            self.__dict__["_invoke_params"] = cached
+
+        return dict(cached[1])
+
+    def _build_invoke_params(self) -> Dict:
         invokeParams = dict()
         match self.agent_collaboration:
             case "DISABLED":
@@ -217,11 +302,74 @@ class InlineAgent:
         bedrock_model_configurations: Dict = {
             "performanceConfig": {"latency": "standard"}
         },
+        answer_buffer: Optional[AnswerBuffer] = None,
+        event_sink: Optional[EventSink] = None,
+    ):
+        answer = answer_buffer or AnswerBuffer()
+        try:
+            return await self._invoke(
+                answer=answer,
+                sink=event_sink or self.event_sink or get_event_sink(),
+                input_text=input_text,
+                enable_trace=enable_trace,
+                session_id=session_id,
+                end_session=end_session,
+                session_state=session_state,
+                add_citation=add_citation,
+                process_response=process_response,
+                truncate_response=truncate_response,
+                streaming_configurations=streaming_configurations,
+                bedrock_model_configurations=bedrock_model_configurations,
+            )
+        finally:
+            answer.close()
+
+    async def stream(self, input_text: str, **kwargs) -> AsyncIterator[str]:
+        """Invoke the agent and yield its final answer as text deltas."""
+        answer = AnswerBuffer()
+        task = asyncio.create_task(
+            self.invoke(input_text=input_text, answer_buffer=answer, **kwargs)
+        )
+        try:
+            async for delta in answer:
+                yield delta
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def run_batch(
+        self, requests: Iterable[BatchInput], **kwargs
+    ) -> List[BatchResult]:
+        """Invoke the agent for many prompts concurrently, see ``batch.stream_batch``."""
+        return await run_batch(self, requests, **kwargs)
+
+    async def _invoke(
+        self,
+        answer: AnswerBuffer,
+        sink: EventSink,
+        input_text: str,
+        enable_trace: bool,
+        session_id: str,
+        end_session: bool,
+        session_state: Dict,
+        add_citation: bool,
+        process_response: bool,
+        truncate_response: int,
+        streaming_configurations: Dict,
+        bedrock_model_configurations: Dict,
     ):
         if session_state is None:
             session_state = {}
 
-        print(f"SessionId: {session_id}")
+        if sink.enabled:
+            sink.emit(
+                AgentEvent(
+                    type=AgentEventType.SESSION,
+                    message=f"SessionId: {session_id}",
+                    data={"sessionId": session_id},
+                )
+            )
         if "returnControlInvocationResults" in session_state:
             raise ValueError(
                 "returnControlInvocationResults key is not supported in inlineSessionState"
@@ -230,10 +378,8 @@ class InlineAgent:
         if "invocationId" in session_state:
             raise ValueError("invocationId key is not supported in inlineSessionState")
 
-        agent_answer = ""
-
-        bedrock_agent_runtime = boto3.Session(profile_name=self.profile).client(
-            "bedrock-agent-runtime"
+        bedrock_agent_runtime = get_client(
+            "bedrock-agent-runtime", profile=self.profile
         )
 
         inlineSessionState = copy.deepcopy(session_state)
@@ -247,11 +393,15 @@ class InlineAgent:
         orch_step = 0
         sub_step = 0
 
-        stream_final_response = streaming_configurations["streamFinalResponse"]
-        # print(self.get_invoke_params())
-        while not agent_answer:
+        file_sink = self.file_sink or get_file_sink()
+        pending_files: List[asyncio.Future] = list()
+
+        invoke_params = self.get_invoke_params()
+        while not answer.text:
             if inlineSessionState:
-                response = bedrock_agent_runtime.invoke_inline_agent(
+                response = await run_blocking(
+                    bedrock_agent_runtime.invoke_inline_agent,
+                    executor=self.stream_executor,
                     sessionId=session_id,
                     inputText=input_text,
                     enableTrace=enable_trace,
@@ -259,17 +409,19 @@ class InlineAgent:
                     inlineSessionState=inlineSessionState,
                     streamingConfigurations=streaming_configurations,
                     bedrockModelConfigurations=bedrock_model_configurations,
-                    **self.get_invoke_params(),
+                    **invoke_params,
                 )
             else:
-                response = bedrock_agent_runtime.invoke_inline_agent(
+                response = await run_blocking(
+                    bedrock_agent_runtime.invoke_inline_agent,
+                    executor=self.stream_executor,
                     sessionId=session_id,
                     inputText=input_text,
                     enableTrace=enable_trace,
                     endSession=end_session,
                     streamingConfigurations=streaming_configurations,
                     bedrockModelConfigurations=bedrock_model_configurations,
-                    **self.get_invoke_params(),
+                    **invoke_params,
                 )
 
             if not process_response:
@@ -277,54 +429,51 @@ class InlineAgent:
 
             inlineSessionState = copy.deepcopy(session_state)
 
-            event_stream = response["completion"]
+            event_stream = AsyncEventStream(
+                response["completion"], executor=self.stream_executor
+            )
 
             try:
-                for event in event_stream:
+                async for event in event_stream:
                     # print(json.dumps(event, indent=2, default=str))
                     if "files" in event:
                         files_event = event["files"]
 
-                        console = Console()
-                        print("\n\n")
-                        console.print(Markdown("**Files saved in output directory**"))
-
-                        files_list = files_event["files"]
-                        for idx, this_file in enumerate(files_list):
-                            file_bytes = this_file["bytes"]
-
-                            # save bytes to file, given the name of file and the bytes
-                            directory_path = os.path.join(os.getcwd(), "output")
-                            if not os.path.exists(directory_path):
-                                try:
-                                    os.makedirs(directory_path, exist_ok=True)
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            if not os.path.exists(
-                                os.path.join(directory_path, str(session_id))
-                            ):
-                                try:
-                                    os.makedirs(
-                                        os.path.join(directory_path, str(session_id)),
-                                        exist_ok=True,
-                                    )
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            file_name = os.path.join(
-                                directory_path, str(session_id), this_file["name"]
+                        if sink.enabled:
+                            sink.emit(
+                                AgentEvent(type=AgentEventType.FILES, message="\n\n")
+                            )
+                            sink.emit(
+                                AgentEvent(
+                                    type=AgentEventType.FILES,
+                                    message="**Files saved in output directory**",
+                                    data={
+                                        "files": [
+                                            this_file["name"]
+                                            for this_file in files_event["files"]
+                                        ]
+                                    },
+                                    markdown=True,
+                                )
                             )
-                            with open(file_name, "wb") as f:
-                                f.write(file_bytes)
+
+                        # Written on the file sink's pool while the stream goes on
+                        pending_files.extend(
+                            asyncio.wrap_future(future)
+                            for future in file_sink.submit(
+                                session_id=session_id, files=files_event["files"]
+                            )
+                        )
 
                     if "returnControl" in event:
                         inlineSessionState = await ProcessROC.process_roc(
                             inlineSessionState=inlineSessionState,
                             roc_event=event["returnControl"],
                             tool_map=self.tool_map,
+                            tool_config_map=self.tool_config_map,
+                            event_sink=sink,
+                            confirmation_provider=self.confirmation_provider,
+                            session_id=session_id,
                         )
 
                     # Process trace
@@ -335,6 +484,7 @@ class InlineAgent:
                             trace=event["trace"]["trace"],
                             truncateResponse=truncate_response,
                             agentName=self.agent_name,
+                            sink=sink,
                         )
                         total_input_tokens += int(input_tokens)
                         total_output_tokens += int(output_tokens)
@@ -344,62 +494,87 @@ class InlineAgent:
                     if "chunk" in event:
                         if add_citation:
                             if "attribution" in event["chunk"]:
-                                agent_answer, cite = Trace.add_citation(
+                                cited_answer, cite = Trace.add_citation(
                                     citations=event["chunk"]["attribution"][
                                         "citations"
                                     ],
                                     cite=1 if not cite else cite,
+                                    sink=sink,
                                 )
+                                answer.write_text(cited_answer)
                             else:
-                                data = event["chunk"]["bytes"]
-                                agent_answer += data.decode("utf8")
-                                print(
-                                    colored(
-                                        data.decode("utf8"), TraceColor.final_output
-                                    ),
-                                    end="",
+                                self._emit_delta(
+                                    sink, answer.write(event["chunk"]["bytes"])
                                 )
                         elif not add_citation:
-                            data = event["chunk"]["bytes"]
-                            if stream_final_response:
-                                agent_answer += data.decode("utf8")
-                                print(
-                                    colored(
-                                        data.decode("utf8"), TraceColor.final_output
-                                    ),
-                                    end="",
-                                )
-                            else:
-                                agent_answer += data.decode("utf8")
-                                print(
-                                    colored(agent_answer, TraceColor.final_output),
-                                    end="",
-                                )
+                            # Emit only the new text, never the whole answer
+                            self._emit_delta(
+                                sink, answer.write(event["chunk"]["bytes"])
+                            )
 
             except Exception as e:
-                print(
-                    colored("Caught exception while invoking Agent", TraceColor.error)
-                )
-                print(colored(f"input text: {input_text}", TraceColor.error))
-                print(
-                    colored(
-                        f"request ID: {response['ResponseMetadata']['RequestId']}, retries: {response['ResponseMetadata']['RetryAttempts']}\n",
-                        TraceColor.error,
+                for message in (
+                    "Caught exception while invoking Agent",
+                    f"input text: {input_text}",
+                    f"request ID: {response['ResponseMetadata']['RequestId']}, retries: {response['ResponseMetadata']['RetryAttempts']}\n",
+                    f"Error: {e}",
+                ):
+                    sink.emit(
+                        AgentEvent(
+                            type=AgentEventType.ERROR,
+                            message=message,
+                            color=TraceColor.error,
+                        )
                     )
-                )
-                print(colored(f"Error: {e}", TraceColor.error))
                 raise Exception("Unexpected exception: ", e)
+            finally:
+                # Also on cancellation, which is not an Exception: releases the
+                # connection and unblocks a worker still waiting in next()
+                event_stream.close()
+
+        try:
+            await asyncio.gather(*pending_files)
+        except OSError as e:
+            sink.emit(
+                AgentEvent(
+                    type=AgentEventType.ERROR,
+                    message=f"Error saving files to output: {e}",
+                    color=TraceColor.error,
+                )
+            )
+            raise
 
         duration = datetime.now(UTC) - time_before_call
+        answer.usage = {
+            "llmCalls": total_llm_calls,
+            "inputTokens": total_input_tokens,
+            "outputTokens": total_output_tokens,
+            "duration": duration.total_seconds(),
+        }
 
-        print(
-            colored(
-                f"\nAgent made a total of {total_llm_calls} LLM calls, "
-                + f"using {total_input_tokens+total_output_tokens} tokens "
-                + f"(in: {total_input_tokens}, out: {total_output_tokens})"
-                + f", and took {duration.total_seconds():,.1f} total seconds",
-                TraceColor.stats,
+        if sink.enabled:
+            sink.emit(
+                AgentEvent(
+                    type=AgentEventType.STATS,
+                    message=f"\nAgent made a total of {total_llm_calls} LLM calls, "
+                    + f"using {total_input_tokens+total_output_tokens} tokens "
+                    + f"(in: {total_input_tokens}, out: {total_output_tokens})"
+                    + f", and took {duration.total_seconds():,.1f} total seconds",
+                    data=answer.usage,
+                    color=TraceColor.stats,
+                )
             )
-        )
 
-        return agent_answer
+        return answer.text
+
+    @staticmethod
+    def _emit_delta(sink: EventSink, delta: str):
+        if sink.enabled and delta:
+            sink.emit(
+                AgentEvent(
+                    type=AgentEventType.ANSWER,
+                    message=delta,
+                    color=TraceColor.final_output,
+                    end="",
+                )
+            )
@@ -1,16 +1,72 @@
+import asyncio
 import copy
+import functools
 import inspect
 import json
-from typing import Any, Callable, Dict, Union
-from termcolor import colored
+import os
+import urllib.error
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Union
 
+from InlineAgent.agent.confirmation import (
+    ConfirmationProvider,
+    ConfirmationRequest,
+    get_confirmation_provider,
+)
+from InlineAgent.agent.event_stream import run_blocking
+from InlineAgent.agent.roc_parameters import ParameterDecodeError, get_parameter_decoder
 from InlineAgent.constants import TraceColor
+from InlineAgent.observability.event_sink import (
+    AgentEvent,
+    AgentEventType,
+    EventSink,
+    get_event_sink,
+)
+from InlineAgent.types import ToolConfig, ToolExecutor, ToolResult
+
+# Upper bound on synchronous tools running at the same time across all sessions
+ROC_TOOL_MAX_WORKERS = 16
+ROC_PROCESS_MAX_WORKERS = os.cpu_count() or 1
+
+_tool_executors: Dict[ToolExecutor, Executor] = dict()
+_tool_executor_lock = Lock()
+
+
+def get_tool_executor(kind: ToolExecutor = ToolExecutor.THREAD) -> Executor:
+    """Return the bounded pool that runs synchronous tools of the given kind."""
+    executor = _tool_executors.get(kind)
+    if executor is None:
+        with _tool_executor_lock:
+            executor = _tool_executors.get(kind)
+            if executor is None:
+                if kind == ToolExecutor.PROCESS:
+                    executor = ProcessPoolExecutor(max_workers=ROC_PROCESS_MAX_WORKERS)
+                else:
+                    executor = ThreadPoolExecutor(
+                        max_workers=ROC_TOOL_MAX_WORKERS,
+                        thread_name_prefix="InlineAgentTool",
+                    )
+                _tool_executors[kind] = executor
+    return executor
+
+
+def set_tool_executor(kind: ToolExecutor, executor: Executor) -> None:
+    """Replace the pool used for a kind of tool, e.g. to tune its size."""
+    with _tool_executor_lock:
+        _tool_executors[kind] = executor
 
 
 class ProcessROC:
     @staticmethod
     async def process_roc(
-        inlineSessionState: Dict, roc_event: Dict, tool_map: Dict[str, Callable]
+        inlineSessionState: Dict,
+        roc_event: Dict,
+        tool_map: Dict[str, Callable],
+        tool_config_map: Dict[str, ToolConfig] = None,
+        event_sink: EventSink = None,
+        confirmation_provider: ConfirmationProvider = None,
+        session_id: str = None,
     ):
         # TODO: Tool to invoke is str and callable
         if "returnControlInvocationResults" in inlineSessionState:
@@ -25,7 +81,20 @@ class ProcessROC:
         inlineSessionState = {"returnControlInvocationResults": []}
         inlineSessionState["invocationId"] = roc_event["invocationId"]
 
-        for invocationInput in roc_event["invocationInputs"]:
+        # One result slot per invocation input so results keep their original
+        # order no matter which tool finishes first.
+        results: List[Dict] = [
+            {"returnControlInvocationResults": []}
+            for _ in roc_event["invocationInputs"]
+        ]
+        # Independent tools run concurrently, confirmations are asked one at a time
+        tool_calls = list()
+        confirmations = list()
+
+        if tool_config_map is None:
+            tool_config_map = dict()
+
+        for idx, invocationInput in enumerate(roc_event["invocationInputs"]):
 
             # This is a Tagged Union structure. Only one of the following top level keys will be set: apiInvocationInput, functionInvocationInput.
             # If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member.
@@ -41,31 +110,28 @@ class ProcessROC:
             functionInvocationInput = invocationInput["functionInvocationInput"]
             actionGroup = functionInvocationInput["actionGroup"]
 
-            parameters = dict()
-            for param in functionInvocationInput["parameters"]:
-                if param["type"] == "array":
-                    result = None
-                    try:
-                        result = json.loads(param["value"])
-                    except Exception:
-                        json_str = (
-                            param["value"]
-                            .replace("=", ":")
-                            .replace("[{", '[{"')
-                            .replace("}]", '"}]')
-                        )
-                        json_str = json_str.replace(", ", '", "').replace(":", '":"')
-                        result = json.loads(json_str)
-                    finally:
-                        parameters[param["name"]] = result
-                elif param["type"] == "string":
-                    parameters[param["name"]] = param["value"]
-                elif param["type"] == "number":
-                    parameters[param["name"]] = int(param["value"])
-                elif param["type"] == "boolean":
-                    parameters[param["name"]] = bool(param["value"])
-                elif param["type"] == "integer":
-                    parameters[param["name"]] = int(param["value"])
+            function = functionInvocationInput["function"]
+            try:
+                parameters = get_parameter_decoder(tool_map.get(function)).decode(
+                    function, functionInvocationInput["parameters"]
+                )
+            except ParameterDecodeError as e:
+                if actionInvocationType == "USER_CONFIRMATION":
+                    # Only shown to the user, who can judge the raw values
+                    parameters = {
+                        param["name"]: param["value"]
+                        for param in functionInvocationInput["parameters"]
+                    }
+                else:
+                    results[idx]["returnControlInvocationResults"].append(
+                        {
+                            "functionResult": ProcessROC.invalid_parameters_result(
+                                functionInvocationInput, e
+                            )
+                        }
+                    )
+                    continue
+
             if (
                 actionInvocationType == "RESULT"
                 or actionInvocationType == "USER_CONFIRMATION_AND_RESULT"
@@ -79,41 +145,104 @@ class ProcessROC:
                         f"Function {functionInvocationInput['function']} not found in tools or tools class"
                     )
 
+                tool_config = tool_config_map.get(functionInvocationInput["function"])
+
                 if actionInvocationType == "USER_CONFIRMATION_AND_RESULT":
-                    await ProcessROC.process_user_confirmation(
-                        sessionState=inlineSessionState,
-                        tool_to_invoke=tool_to_invoke,
-                        functionInvocationInput=functionInvocationInput,
-                        include_result=True,
-                        parameters=parameters,
+                    confirmations.append(
+                        dict(
+                            sessionState=results[idx],
+                            tool_to_invoke=tool_to_invoke,
+                            functionInvocationInput=functionInvocationInput,
+                            include_result=True,
+                            parameters=parameters,
+                            tool_config=tool_config,
+                            event_sink=event_sink,
+                            confirmation_provider=confirmation_provider,
+                            session_id=session_id,
+                        )
                     )
 
                 else:
-                    inlineSessionState["returnControlInvocationResults"].append(
-                        {
-                            "functionResult": await ProcessROC.invoke_roc_function(
-                                functionInvocationInput=functionInvocationInput,
-                                tool_to_invoke=tool_to_invoke,
-                                parameters=parameters,
-                                confirm=None,
-                            )
-                        }
+                    tool_calls.append(
+                        ProcessROC._invoke_into(
+                            sessionState=results[idx],
+                            functionInvocationInput=functionInvocationInput,
+                            tool_to_invoke=tool_to_invoke,
+                            parameters=parameters,
+                            tool_config=tool_config,
+                            event_sink=event_sink,
+                        )
                     )
 
             elif actionInvocationType == "USER_CONFIRMATION":
                 tool_to_invoke = functionInvocationInput["function"]
-                await ProcessROC.process_user_confirmation(
-                    sessionState=inlineSessionState,
-                    tool_to_invoke=tool_to_invoke,
-                    functionInvocationInput=functionInvocationInput,
-                    include_result=False,
-                    parameters=parameters,
+                confirmations.append(
+                    dict(
+                        sessionState=results[idx],
+                        tool_to_invoke=tool_to_invoke,
+                        functionInvocationInput=functionInvocationInput,
+                        include_result=False,
+                        parameters=parameters,
+                        event_sink=event_sink,
+                        confirmation_provider=confirmation_provider,
+                        session_id=session_id,
+                    )
                 )
 
-        inlineSessionState.update(inlineSessionState)
+        async def ask_confirmations():
+            for confirmation in confirmations:
+                await ProcessROC.process_user_confirmation(**confirmation)
+
+        await asyncio.gather(*tool_calls, ask_confirmations())
+
+        for result in results:
+            inlineSessionState["returnControlInvocationResults"].extend(
+                result["returnControlInvocationResults"]
+            )
 
         return inlineSessionState
 
+    @staticmethod
+    def invalid_parameters_result(
+        functionInvocationInput: Dict, error: ParameterDecodeError
+    ) -> Dict:
+        """Ask the agent to retry an invocation whose parameters did not decode."""
+        return {
+            "actionGroup": functionInvocationInput["actionGroup"],
+            "agentId": functionInvocationInput["agentId"],
+            "function": functionInvocationInput["function"],
+            "responseBody": {
+                "TEXT": {
+                    "body": json.dumps(
+                        {"error": str(error), "invalidParameters": error.errors}
+                    )
+                }
+            },
+            "responseState": "REPROMPT",
+        }
+
+    @staticmethod
+    async def _invoke_into(
+        sessionState: Dict,
+        functionInvocationInput: Dict,
+        tool_to_invoke: Callable,
+        parameters: Dict,
+        tool_config: ToolConfig = None,
+        event_sink: EventSink = None,
+    ):
+        sessionState["returnControlInvocationResults"].append(
+            {
+                "functionResult": await ProcessROC.invoke_roc_function(
+                    functionInvocationInput=functionInvocationInput,
+                    tool_to_invoke=tool_to_invoke,
+                    parameters=parameters,
+                    confirm=None,
+                    tool_config=tool_config,
+                    event_sink=event_sink,
+                )
+            }
+        )
+
     @staticmethod
     async def process_user_confirmation(
         sessionState: Dict,
@@ -121,71 +250,92 @@ class ProcessROC:
         include_result: bool,
         parameters: Dict,
         tool_to_invoke: Union[str, Callable] = None,
+        tool_config: ToolConfig = None,
+        event_sink: EventSink = None,
+        confirmation_provider: ConfirmationProvider = None,
+        session_id: str = None,
     ):
-        while True:
-            if isinstance(tool_to_invoke, Callable):
-                tool_name = tool_to_invoke.__name__
-            else:
-                tool_name = tool_to_invoke
-            confirmation_message = f"Do you want to proceed with {tool_name} with parameters : {json.dumps(parameters)}?"
-            response = input(f"{confirmation_message} (y/n): ").lower()
-            if response in ["y", "yes"]:
-                if include_result:
-                    sessionState["returnControlInvocationResults"].append(
-                        {
-                            "functionResult": await ProcessROC.invoke_roc_function(
-                                functionInvocationInput=functionInvocationInput,
-                                tool_to_invoke=tool_to_invoke,
-                                confirm="CONFIRM",
-                                parameters=parameters,
-                            )
-                        }
-                    )
-                else:
-                    sessionState["returnControlInvocationResults"].append(
-                        {
-                            "functionResult": {
-                                "actionGroup": functionInvocationInput["actionGroup"],
-                                "agentId": functionInvocationInput["agentId"],
-                                "function": functionInvocationInput["function"],
-                                "confirmationState": "CONFIRM",
-                            }
-                        }
+        if isinstance(tool_to_invoke, Callable):
+            tool_name = tool_to_invoke.__name__
+        else:
+            tool_name = tool_to_invoke
+
+        provider = confirmation_provider or get_confirmation_provider()
+        denied_body = "Access Denied to this function. Do not try again."
+        try:
+            # Only this session waits for the answer, the event loop keeps going
+            approved = await asyncio.wait_for(
+                provider.confirm(
+                    ConfirmationRequest(
+                        function=tool_name,
+                        action_group=functionInvocationInput["actionGroup"],
+                        parameters=parameters,
+                        session_id=session_id,
                     )
-                break
-            elif response in ["n", "no"]:
-                if include_result:
-                    sessionState["returnControlInvocationResults"].append(
-                        {
-                            "functionResult": {
-                                "actionGroup": functionInvocationInput["actionGroup"],
-                                "agentId": functionInvocationInput["agentId"],
-                                "function": functionInvocationInput["function"],
-                                "responseBody": {
-                                    "TEXT": {
-                                        "body": "Access Denied to this function. Do not try again."
-                                    }
-                                },
-                                "confirmationState": "DENY",
-                                # "responseState": "FAILURE"
-                            }
+                ),
+                timeout=provider.timeout,
+            )
+        except urllib.error.URLError as e:
+            # The request never reached whoever answers it, e.g. a webhook
+            approved = False
+            denied_body = (
+                f"The confirmation request could not be sent: {e}. Do not try again."
+            )
+        except TimeoutError:
+            approved = False
+            denied_body = f"No confirmation received within {provider.timeout} seconds. Do not try again."
+
+        if approved:
+            if include_result:
+                sessionState["returnControlInvocationResults"].append(
+                    {
+                        "functionResult": await ProcessROC.invoke_roc_function(
+                            functionInvocationInput=functionInvocationInput,
+                            tool_to_invoke=tool_to_invoke,
+                            confirm="CONFIRM",
+                            parameters=parameters,
+                            tool_config=tool_config,
+                            event_sink=event_sink,
+                        )
+                    }
+                )
+            else:
+                sessionState["returnControlInvocationResults"].append(
+                    {
+                        "functionResult": {
+                            "actionGroup": functionInvocationInput["actionGroup"],
+                            "agentId": functionInvocationInput["agentId"],
+                            "function": functionInvocationInput["function"],
+                            "confirmationState": "CONFIRM",
                         }
-                    )
-                else:
-                    sessionState["returnControlInvocationResults"].append(
-                        {
-                            "functionResult": {
-                                "actionGroup": functionInvocationInput["actionGroup"],
-                                "agentId": functionInvocationInput["agentId"],
-                                "function": functionInvocationInput["function"],
-                                "confirmationState": "DENY",
-                                # "responseState": "FAILURE"
-                            }
+                    }
+                )
+        else:
+            if include_result:
+                sessionState["returnControlInvocationResults"].append(
+                    {
+                        "functionResult": {
+                            "actionGroup": functionInvocationInput["actionGroup"],
+                            "agentId": functionInvocationInput["agentId"],
+                            "function": functionInvocationInput["function"],
+                            "responseBody": {"TEXT": {"body": denied_body}},
+                            "confirmationState": "DENY",
+                            # "responseState": "FAILURE"
                         }
-                    )
-                break
+                    }
+                )
             else:
-                print("Please enter 'y' for yes or 'n' for no.")
+                sessionState["returnControlInvocationResults"].append(
+                    {
+                        "functionResult": {
+                            "actionGroup": functionInvocationInput["actionGroup"],
+                            "agentId": functionInvocationInput["agentId"],
+                            "function": functionInvocationInput["function"],
+                            "confirmationState": "DENY",
+                            # "responseState": "FAILURE"
+                        }
+                    }
+                )
 
     @staticmethod
     async def invoke_roc_function(
@@ -193,37 +343,82 @@ class ProcessROC:
         parameters: Dict = dict(),
         confirm: str = None,
         tool_to_invoke: Callable = None,
+        tool_config: ToolConfig = None,
+        event_sink: EventSink = None,
     ) -> Dict:
 
         functionResult = dict
 
+        if tool_config is None:
+            tool_config = ToolConfig()
+
         # TODO: responseState
         try:
 
             if inspect.iscoroutinefunction(tool_to_invoke):
-                result = await tool_to_invoke(**parameters)
+                call = tool_to_invoke(**parameters)
             else:
-                result = tool_to_invoke(**parameters)
+                call = run_blocking(
+                    functools.partial(tool_to_invoke, **parameters),
+                    executor=get_tool_executor(tool_config.executor),
+                )
+            # On timeout the awaiting side is cancelled and the tool reported as
+            # failed; a tool already running on a worker cannot be interrupted.
+            result = await asyncio.wait_for(call, timeout=tool_config.timeout)
 
-            print(
-                colored(
-                    f"Tool output: {result}",
-                    TraceColor.invocation_input,
+            sink = event_sink or get_event_sink()
+            if sink.enabled:
+                sink.emit(
+                    AgentEvent(
+                        type=AgentEventType.TOOL_OUTPUT,
+                        message=(
+                            f"Tool output: {result.body} [{len(result.images)} images]"
+                            if isinstance(result, ToolResult)
+                            else f"Tool output: {result}"
+                        ),
+                        data={
+                            "function": functionInvocationInput["function"],
+                            "result": result,
+                        },
+                        color=TraceColor.invocation_input,
+                    )
                 )
-            )
 
             functionResult = {
                 "actionGroup": functionInvocationInput["actionGroup"],
                 "agentId": functionInvocationInput["agentId"],
                 "function": functionInvocationInput["function"],
-                "responseBody": {"TEXT": {"body": result}},
+                "responseBody": {
+                    "TEXT": (
+                        result.content_body()
+                        if isinstance(result, ToolResult)
+                        else {"body": result}
+                    )
+                },
+            }
+        except TimeoutError as e:
+            # Timeouts raised by the tool itself (e.g. an MCP call running out
+            # of retries) carry their own message, the tool_config one does not
+            functionResult = {
+                "actionGroup": functionInvocationInput["actionGroup"],
+                "agentId": functionInvocationInput["agentId"],
+                "function": functionInvocationInput["function"],
+                "responseBody": {
+                    "TEXT": {
+                        "body": (
+                            str(e)
+                            or f"Function {functionInvocationInput['function']} timed out after {tool_config.timeout} seconds"
+                        )
+                    }
+                },
+                "responseState": "FAILURE",
             }
         except Exception as e:
             functionResult = {
                 "actionGroup": functionInvocationInput["actionGroup"],
                 "agentId": functionInvocationInput["agentId"],
                 "function": functionInvocationInput["function"],
-                "responseBody": {"TEXT": {"body": e}},
+                "responseBody": {"TEXT": {"body": str(e)}},
                 "responseState": "FAILURE",
             }
 
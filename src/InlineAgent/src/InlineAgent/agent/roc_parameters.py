@@ -0,0 +1,277 @@
+"""
+Decoding of return of control parameters into the values a tool expects.
+
+Bedrock sends every parameter as a string together with the type from the
+function schema. A ``ParameterDecoder`` is compiled once per tool from its
+signature: annotated parameters are converted to the annotated type, the
+others by the type Bedrock reports. Values that cannot be converted are
+collected into a ``ParameterDecodeError`` instead of reaching the tool.
+"""
+
+import inspect
+import json
+import re
+import types
+import typing
+import weakref
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+BOOLEAN_VALUES = {
+    "true": True,
+    "yes": True,
+    "1": True,
+    "false": False,
+    "no": False,
+    "0": False,
+}
+
+_BRACKETS = re.compile(r"[\[\]{}]")
+# A list of objects without nested values, the common ``{key=value}`` case
+_FLAT_OBJECT = re.compile(r"\{([^\[\]{}]*)\}")
+_FLAT_OBJECTS = re.compile(r"\s*\{[^\[\]{}]*\}(\s*,\s*\{[^\[\]{}]*\})*\s*")
+# Characters after ``[`` that start a JSON array rather than Bedrock's rendering
+_JSON_ARRAY_STARTS = frozenset('"-0123456789[]tfn ')
+
+
+class ParameterDecodeError(ValueError):
+    """
+    Parameters of an invocation could not be converted.
+
+    ``errors`` has one ``{"name", "type", "value", "message"}`` dict per
+    parameter that failed.
+    """
+
+    def __init__(self, function: str, errors: List[Dict[str, str]]):
+        self.function = function
+        self.errors = errors
+        super().__init__(
+            f"Invalid parameters for {function}: "
+            + "; ".join(f"{error['name']}: {error['message']}" for error in errors)
+        )
+
+
+def decode_string(value: str) -> str:
+    return value
+
+
+def decode_integer(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"{value!r} is not an integer")
+        return int(number)
+
+
+def decode_float(value: str) -> float:
+    return float(value)
+
+
+def decode_number(value: str):
+    # Keep whole numbers as int, like earlier versions, and floats as float
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def decode_boolean(value: str) -> bool:
+    try:
+        return BOOLEAN_VALUES[value.strip().lower()]
+    except KeyError:
+        raise ValueError(f"{value!r} is not a boolean") from None
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas outside of brackets and braces, in one pass."""
+    if not _BRACKETS.search(text):
+        return [item.strip() for item in text.split(",") if item.strip()]
+
+    items, depth, start = list(), 0, 0
+    for position, character in enumerate(text):
+        if character in "[{":
+            depth += 1
+        elif character in "]}":
+            depth -= 1
+        elif character == "," and depth == 0:
+            items.append(text[start:position].strip())
+            start = position + 1
+    items.append(text[start:].strip())
+    return [item for item in items if item]
+
+
+def _unquote(text: str) -> str:
+    if len(text) > 1 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    return text
+
+
+def _parse_object(body: str) -> Dict[str, Any]:
+    parsed = dict()
+    for item in _split_top_level(body):
+        key, separator, value = item.partition("=")
+        if not separator:
+            key, separator, value = item.partition(":")
+        if not separator:
+            raise ValueError(f"{item!r} is not a key=value pair")
+        parsed[_unquote(key.strip())] = _parse_loose(value)
+    return parsed
+
+
+def _parse_flat_object(body: str) -> Dict[str, str]:
+    parsed = dict()
+    for item in body.split(","):
+        key, separator, value = item.partition("=")
+        if not separator:
+            key, separator, value = item.partition(":")
+            if not separator:
+                if not item.strip():
+                    continue
+                raise ValueError(f"{item.strip()!r} is not a key=value pair")
+        parsed[key.strip()] = value.strip()
+    return parsed
+
+
+def _parse_loose(text: str) -> Any:
+    """Parse Bedrock's ``[a, b]`` and ``[{key=value, ...}]`` renderings."""
+    text = text.strip()
+    if text.startswith("[") and text.endswith("]"):
+        inner = text[1:-1]
+        if '"' not in inner and _FLAT_OBJECTS.fullmatch(inner):
+            # Objects holding plain values need no bracket matching
+            return [_parse_flat_object(body) for body in _FLAT_OBJECT.findall(inner)]
+        return [_parse_loose(item) for item in _split_top_level(inner)]
+    if text.startswith("{") and text.endswith("}"):
+        return _parse_object(text[1:-1])
+    return _unquote(text)
+
+
+def decode_array(value: str, item_decoder: Optional[Callable] = None) -> List:
+    items = None
+    if value[1:2] in _JSON_ARRAY_STARTS or value.startswith('[{"'):
+        try:
+            items = json.loads(value)
+        except ValueError:
+            pass
+    if items is None:
+        items = _parse_loose(value)
+    if not isinstance(items, list):
+        raise ValueError(f"{value!r} is not an array")
+    if item_decoder is not None:
+        items = [
+            item_decoder(item) if isinstance(item, str) else item for item in items
+        ]
+    return items
+
+
+# Decoders by the parameter type Bedrock reports
+TYPE_DECODERS: Dict[str, Callable[[str], Any]] = {
+    "string": decode_string,
+    "integer": decode_integer,
+    "number": decode_number,
+    "boolean": decode_boolean,
+    "array": decode_array,
+}
+
+# Decoders by the annotation of a tool's parameter
+ANNOTATION_DECODERS: Dict[Any, Callable[[str], Any]] = {
+    str: decode_string,
+    int: decode_integer,
+    float: decode_float,
+    bool: decode_boolean,
+    list: decode_array,
+}
+
+
+def _annotation_decoder(annotation) -> Optional[Callable[[str], Any]]:
+    if annotation in ANNOTATION_DECODERS:
+        return ANNOTATION_DECODERS[annotation]
+    origin = typing.get_origin(annotation)
+    arguments = typing.get_args(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        # Optional[X] and X | None decode as X
+        arguments = [argument for argument in arguments if argument is not type(None)]
+        return _annotation_decoder(arguments[0]) if len(arguments) == 1 else None
+    if origin in (list, List):
+        item_decoder = _annotation_decoder(arguments[0]) if arguments else None
+        if item_decoder is None:
+            return decode_array
+        return lambda value: decode_array(value, item_decoder=item_decoder)
+    return None
+
+
+class ParameterDecoder:
+    """Converts the parameters of one tool, see the module docstring."""
+
+    __slots__ = ("decoders",)
+
+    def __init__(self, decoders: Optional[Dict[str, Callable[[str], Any]]] = None):
+        self.decoders = decoders or dict()
+
+    @classmethod
+    def from_function(cls, function: Callable) -> "ParameterDecoder":
+        try:
+            parameters = inspect.signature(function).parameters
+        except (TypeError, ValueError):
+            return cls()
+        try:
+            hints = typing.get_type_hints(function)
+        except Exception:
+            hints = dict()
+
+        decoders = dict()
+        for name, parameter in parameters.items():
+            annotation = hints.get(name, parameter.annotation)
+            if annotation is inspect.Parameter.empty:
+                continue
+            decoder = _annotation_decoder(annotation)
+            if decoder is not None:
+                decoders[name] = decoder
+        return cls(decoders)
+
+    def decode(self, function: str, parameters: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Convert ``functionInvocationInput["parameters"]`` to keyword arguments."""
+        decoded, errors = dict(), list()
+        for parameter in parameters:
+            name, value = parameter["name"], parameter["value"]
+            decoder = self.decoders.get(name) or TYPE_DECODERS.get(
+                parameter.get("type"), decode_string
+            )
+            try:
+                decoded[name] = decoder(value)
+            except (TypeError, ValueError) as e:
+                errors.append(
+                    {
+                        "name": name,
+                        "type": parameter.get("type"),
+                        "value": value,
+                        "message": str(e),
+                    }
+                )
+        if errors:
+            raise ParameterDecodeError(function, errors)
+        return decoded
+
+
+_decoders: "weakref.WeakKeyDictionary[Callable, ParameterDecoder]" = (
+    weakref.WeakKeyDictionary()
+)
+_decoders_lock = Lock()
+_UNTYPED = ParameterDecoder()
+
+
+def get_parameter_decoder(tool: Optional[Callable]) -> ParameterDecoder:
+    """Return the decoder of a tool, compiled on first use."""
+    if not callable(tool):
+        return _UNTYPED
+    try:
+        decoder = _decoders.get(tool)
+    except TypeError:
+        return ParameterDecoder.from_function(tool)
+    if decoder is None:
+        decoder = ParameterDecoder.from_function(tool)
+        with _decoders_lock:
+            _decoders[tool] = decoder
+    return decoder
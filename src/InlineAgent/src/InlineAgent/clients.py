@@ -0,0 +1,98 @@
+"""
+Process wide registry of boto3 sessions and clients.
+
+Sessions, clients and caller identities are created once per profile, region
+and client configuration and then shared by every InlineAgent, ActionGroup,
+KnowledgeBasePlugin and CollaboratorAgent in the process. boto3 clients are
+thread safe, so sharing them lets urllib3 keep connections alive across turns
+instead of paying credential resolution and a TLS handshake on every call.
+"""
+
+import json
+from threading import RLock
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_TCP_KEEPALIVE = True
+
+_lock = RLock()
+_sessions: Dict[Tuple[str, Optional[str]], boto3.Session] = dict()
+_clients: Dict[Tuple[str, str, Optional[str], str], Any] = dict()
+_account_ids: Dict[str, str] = dict()
+
+
+def _config_key(config_options: Dict[str, Any]) -> str:
+    return json.dumps(config_options, sort_keys=True, default=str)
+
+
+def get_session(
+    profile: str = "default", region: Optional[str] = None
+) -> boto3.Session:
+    """Return the shared boto3 session for a profile and region."""
+    key = (profile, region)
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = boto3.Session(profile_name=profile, region_name=region)
+                _sessions[key] = session
+    return session
+
+
+def get_client(
+    service_name: str,
+    profile: str = "default",
+    region: Optional[str] = None,
+    **config_options,
+):
+    """
+    Return a shared boto3 client.
+
+    Any keyword argument is forwarded to ``botocore.config.Config`` and is part
+    of the cache key, so e.g. a client with a long ``read_timeout`` does not
+    collide with the default one. ``max_pool_connections`` and
+    ``tcp_keepalive`` default to ``DEFAULT_MAX_POOL_CONNECTIONS`` and
+    ``DEFAULT_TCP_KEEPALIVE``.
+    """
+    config_options.setdefault("max_pool_connections", DEFAULT_MAX_POOL_CONNECTIONS)
+    config_options.setdefault("tcp_keepalive", DEFAULT_TCP_KEEPALIVE)
+
+    key = (service_name, profile, region, _config_key(config_options))
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                # Creating clients from a session is not thread safe
+                client = get_session(profile=profile, region=region).client(
+                    service_name, config=Config(**config_options)
+                )
+                _clients[key] = client
+    return client
+
+
+def get_account_id(profile: str = "default") -> str:
+    """Return the AWS account of a profile, calling STS only once."""
+    account_id = _account_ids.get(profile)
+    if account_id is None:
+        identity = get_client("sts", profile=profile).get_caller_identity()
+        account_id = identity["Account"]
+        _account_ids[profile] = account_id
+    return account_id
+
+
+def get_region(profile: str = "default") -> str:
+    """Return the region configured for a profile."""
+    return get_session(profile=profile).region_name
+
+
+def clear_clients() -> None:
+    """Drop every cached session, client and identity, e.g. after credentials rotate."""
+    with _lock:
+        _sessions.clear()
+        _clients.clear()
+        _account_ids.clear()
@@ -0,0 +1,160 @@
+"""
+Writer for the files an agent returns in ``files`` events.
+
+Files are written on a small thread pool instead of inside the event loop, and
+every output directory is created only once per process. Optionally, contents
+are stored once under ``<directory>/objects/<sha256>`` and each session path is
+a hard link to the stored object, so a chart the code interpreter regenerates
+on every turn takes disk space only once. Linked files share their contents and
+should be treated as read-only.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from threading import Lock, get_ident
+from typing import Dict, List, Optional, Set
+
+OUTPUT_DIRECTORY = "output"
+OBJECTS_DIRECTORY = "objects"
+FILE_WRITER_MAX_WORKERS = 8
+# Span attributes holding file contents are cut to this many bytes
+MAX_FILE_ATTRIBUTE_BYTES = 64 * 1024
+
+
+def file_attribute(data: bytes, max_bytes: int = MAX_FILE_ATTRIBUTE_BYTES) -> str:
+    """Decode file bytes for a span attribute, truncated to ``max_bytes``."""
+    if len(data) <= max_bytes:
+        return data.decode("utf8", errors="ignore")
+    return (
+        data[:max_bytes].decode("utf8", errors="ignore")
+        + f"... [truncated {len(data) - max_bytes} bytes]"
+    )
+
+
+class FileSink:
+    """Writes agent output files concurrently, off the event loop."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        content_addressed: bool = False,
+    ):
+        self._directory = directory
+        self.content_addressed = content_addressed
+        self._executor = executor
+        self._executor_lock = Lock()
+        self._directories: Set[str] = set()
+        self._directories_lock = Lock()
+
+    @property
+    def directory(self) -> str:
+        # Without an explicit directory, follow the working directory like before
+        return self._directory or os.path.join(os.getcwd(), OUTPUT_DIRECTORY)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=FILE_WRITER_MAX_WORKERS,
+                        thread_name_prefix="InlineAgentFiles",
+                    )
+        return self._executor
+
+    def submit(self, session_id: str, files: List[Dict]) -> List[Future]:
+        """Start writing every file of a ``files`` event; each future returns its path."""
+        session_directory = os.path.join(self.directory, str(session_id))
+        return [
+            self.executor.submit(
+                self._write,
+                session_directory,
+                this_file["name"],
+                this_file["bytes"],
+            )
+            for this_file in files
+        ]
+
+    async def write(self, session_id: str, files: List[Dict]) -> List[str]:
+        """Write every file of a ``files`` event and return their paths."""
+        return await asyncio.gather(
+            *[asyncio.wrap_future(future) for future in self.submit(session_id, files)]
+        )
+
+    @staticmethod
+    def wait(futures: List[Future]) -> List[str]:
+        """Block until submitted writes finish, raising the first error."""
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def _makedirs(self, directory: str):
+        if directory in self._directories:
+            return
+        os.makedirs(directory, exist_ok=True)
+        with self._directories_lock:
+            self._directories.add(directory)
+
+    def _write(self, session_directory: str, name: str, data: bytes) -> str:
+        try:
+            return self._store(session_directory, name, data)
+        except FileNotFoundError:
+            # A directory was removed after it was created, create it again
+            with self._directories_lock:
+                self._directories.clear()
+            return self._store(session_directory, name, data)
+
+    def _store(self, session_directory: str, name: str, data: bytes) -> str:
+        self._makedirs(session_directory)
+        path = os.path.join(session_directory, name)
+
+        if not self.content_addressed:
+            with open(path, "wb") as f:
+                f.write(data)
+            return path
+
+        digest = hashlib.sha256(data).hexdigest()
+        objects_directory = os.path.join(
+            os.path.dirname(session_directory), OBJECTS_DIRECTORY
+        )
+        self._makedirs(objects_directory)
+        object_path = os.path.join(objects_directory, digest)
+        if not os.path.exists(object_path):
+            # Write under a unique name first so readers never see a partial object
+            temporary_path = f"{object_path}.{os.getpid()}.{get_ident()}.tmp"
+            with open(temporary_path, "wb") as f:
+                f.write(data)
+            os.replace(temporary_path, object_path)
+
+        if os.path.lexists(path):
+            os.remove(path)
+        try:
+            os.link(object_path, path)
+        except OSError:
+            # File systems without hard links get a copy
+            shutil.copyfile(object_path, path)
+        return path
+
+
+_file_sink: Optional[FileSink] = None
+_file_sink_lock = Lock()
+
+
+def get_file_sink() -> FileSink:
+    """Return the process wide FileSink, writing to ``./output``."""
+    global _file_sink
+    if _file_sink is None:
+        with _file_sink_lock:
+            if _file_sink is None:
+                _file_sink = FileSink()
+    return _file_sink
+
+
+def set_file_sink(file_sink: FileSink) -> None:
+    """Replace the process wide FileSink, e.g. to enable content addressing."""
+    global _file_sink
+    with _file_sink_lock:
+        _file_sink = file_sink
@@ -1,4 +1,8 @@
-from .knowledgebase_plugin import KnowledgeBasePlugin
+from .knowledgebase_plugin import (
+    KnowledgeBasePlugin,
+    KnowledgeBaseIdCache,
+    knowledge_base_id_cache,
+)
 
 
-__all__ = ["KnowledgeBasePlugin"]
+__all__ = ["KnowledgeBasePlugin", "KnowledgeBaseIdCache", "knowledge_base_id_cache"]
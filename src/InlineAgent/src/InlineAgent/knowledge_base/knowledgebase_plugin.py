@@ -1,10 +1,91 @@
 from dataclasses import dataclass, field
 from functools import cached_property
-from typing import Any, Dict, Optional
+from threading import Lock
+import time
+from typing import Any, Dict, Optional, Tuple
 
 import boto3
 from pydantic import BaseModel, Field, computed_field, model_validator, validate_call
 
+from InlineAgent.clients import get_client, get_session
+
+KNOWLEDGE_BASE_CACHE_TTL = 300
+# Least seconds between two listings caused by names that are not found
+KNOWLEDGE_BASE_MISS_REFRESH_INTERVAL = 5
+
+
+class KnowledgeBaseIdCache:
+    """
+    Thread safe TTL cache of knowledge base name to ID resolutions.
+
+    A profile's cache is warmed in bulk from one complete paginated
+    ``list_knowledge_bases`` listing, so resolving any number of names costs at
+    most one listing per TTL. A name missing from the cached listing triggers a
+    refresh, which picks up knowledge bases created since it was taken, unless
+    the listing is younger than ``miss_refresh_interval`` seconds, so repeated
+    lookups of a missing name do not list again each time.
+    """
+
+    def __init__(
+        self,
+        ttl: float = KNOWLEDGE_BASE_CACHE_TTL,
+        miss_refresh_interval: float = KNOWLEDGE_BASE_MISS_REFRESH_INTERVAL,
+    ):
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._lock = Lock()
+        # profile -> (monotonic time of the listing, name -> knowledgeBaseId)
+        self._entries: Dict[str, Tuple[float, Dict[str, str]]] = dict()
+
+    @staticmethod
+    def list_knowledge_bases(bedrock_agent) -> Dict[str, str]:
+        """Page through every knowledge base and index the IDs by name."""
+        knowledge_bases = dict()
+        kwargs = {}
+        while True:
+            response = bedrock_agent.list_knowledge_bases(**kwargs)
+            for kb in response.get("knowledgeBaseSummaries", []):
+                knowledge_bases[kb.get("name")] = kb.get("knowledgeBaseId")
+
+            next_token = response.get("nextToken")
+            if not next_token:
+                return knowledge_bases
+            kwargs["nextToken"] = next_token
+
+    def warm(self, profile: str = "default") -> Dict[str, str]:
+        """Refresh the cache of a profile from a full listing."""
+        knowledge_bases = KnowledgeBaseIdCache.list_knowledge_bases(
+            get_client("bedrock-agent", profile=profile)
+        )
+        with self._lock:
+            self._entries[profile] = (time.monotonic(), knowledge_bases)
+        return knowledge_bases
+
+    def get(self, name: str, profile: str = "default") -> Optional[str]:
+        """Return the ID of a knowledge base, or None if it does not exist."""
+        with self._lock:
+            entry = self._entries.get(profile)
+
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl and (
+                name in entry[1] or age < self.miss_refresh_interval
+            ):
+                return entry[1].get(name)
+
+        return self.warm(profile=profile).get(name)
+
+    def invalidate(self, profile: Optional[str] = None) -> None:
+        """Drop the cache of one profile, or of every profile."""
+        with self._lock:
+            if profile is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(profile, None)
+
+
+knowledge_base_id_cache = KnowledgeBaseIdCache()
+
 
 class KnowledgeBasePlugin(BaseModel):
     name: str
@@ -19,15 +100,15 @@ class KnowledgeBasePlugin(BaseModel):
     @cached_property
     def session(self) -> boto3.Session:
         """Lazy loading of AWS session"""
-        return boto3.Session(profile_name=self.profile)
+        return get_session(profile=self.profile)
 
     def to_dict(self) -> dict:
         """Convert the KnowledgeBase instance to a dictionary"""
 
         # Adding for unittest
         if self.name != "SKaEdphpZh":
-            knowledgeBaseId = KnowledgeBasePlugin.get_knowledge_base_id_by_name(
-                self.name, self.session
+            knowledgeBaseId = knowledge_base_id_cache.get(
+                name=self.name, profile=self.profile
             )
             if knowledgeBaseId is None:
                 raise ValueError(f"Knowledge base {self.name} does not exist")
@@ -57,26 +138,6 @@ class KnowledgeBasePlugin(BaseModel):
         # Create a Bedrock Agent client"
         bedrock_agent = session.client("bedrock-agent")
 
-        # Initialize variables for pagination
-        next_token = None
-
-        while True:
-            # Prepare the list request
-            kwargs = {}
-            if next_token:
-                kwargs["nextToken"] = next_token
-
-            # List knowledge bases
-            response = bedrock_agent.list_knowledge_bases(**kwargs)
-
-            # Search for the knowledge base with matching name
-            for kb in response.get("knowledgeBaseSummaries", []):
-                if kb.get("name") == knowledge_base_name:
-                    return kb.get("knowledgeBaseId")
-
-            # Check if there are more results
-            next_token = response.get("nextToken")
-            if not next_token:
-                break
-
-            raise ValueError(f"Knowledge base {knowledge_base_name} not found")
+        return KnowledgeBaseIdCache.list_knowledge_bases(bedrock_agent).get(
+            knowledge_base_name
+        )
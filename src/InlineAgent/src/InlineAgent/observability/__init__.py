@@ -1,6 +1,35 @@
 from .trace import Trace
+from .event_sink import (
+    AgentEvent,
+    AgentEventType,
+    ConsoleEventSink,
+    EventSink,
+    NoopEventSink,
+    QueueEventSink,
+    get_event_sink,
+    set_event_sink,
+)
 from .agent_instrument import observe
 from .settings_management import ObservabilityConfig
 from .trace_provider import create_tracer_provider
+from .span_export import QueuedSpanProcessor, SpanExportStats
+from .trace_writer import TraceWriter, read_trace
 
-__all__ = ["Trace", "observe", "ObservabilityConfig", "create_tracer_provider"]
+__all__ = [
+    "Trace",
+    "AgentEvent",
+    "AgentEventType",
+    "ConsoleEventSink",
+    "EventSink",
+    "NoopEventSink",
+    "QueueEventSink",
+    "get_event_sink",
+    "set_event_sink",
+    "observe",
+    "ObservabilityConfig",
+    "create_tracer_provider",
+    "QueuedSpanProcessor",
+    "SpanExportStats",
+    "TraceWriter",
+    "read_trace",
+]
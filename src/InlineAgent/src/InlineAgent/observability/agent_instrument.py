@@ -1,7 +1,7 @@
+from dataclasses import dataclass
 from datetime import datetime, timezone
 import functools
 import logging
-import os
 from opentelemetry import trace as otel_trace
 from termcolor import colored
 from rich.console import Console
@@ -18,11 +18,13 @@ from .utils import add_citation, get_agent_from_caller_chain
 from .semantics import SpanAttributes, SpanName
 from .process import ProcessL2Trace
 from .settings_management import ObservabilityConfig
-from .span_manager import SpanManager
+from .span_manager import create_span_manager
+from .trace_writer import close_trace_writer
 from .utils import json_safe
 
 
 from InlineAgent.constants import TraceColor
+from InlineAgent.file_sink import FileSink, file_attribute, get_file_sink
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -32,9 +34,18 @@ config = ObservabilityConfig()
 
 tracer = otel_trace.get_tracer(config.BEDROCK_AGENT_TRACER_NAME)
 
-guardrail_span: otel_trace.Span = None
-output_stream_guardrail_intervene: bool = False
-is_guardrail: bool = False
+
+@dataclass
+class InvocationState:
+    """Guardrail state of a single invocation wrapped by ``observe``.
+
+    Kept per call instead of in module globals so concurrent invocations, in
+    threads or in tasks, cannot see each other's spans.
+    """
+
+    guardrail_span: otel_trace.Span = None
+    output_stream_guardrail_intervene: bool = False
+    is_guardrail: bool = False
 
 
 def observe(show_traces: bool = True, save_traces: bool = False):
@@ -45,9 +56,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
             sessionId: str,
             **kwargs,
         ):
-            global guardrail_span
-            global output_stream_guardrail_intervene
-            global is_guardrail
+            state = InvocationState()
             # Extract tracing parameters
             user_id = kwargs.pop("user_id", "anonymous")
             tags = kwargs.pop("tags", [])
@@ -65,7 +74,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
             )
             
             stream_final_response= stream_final_response["streamFinalResponse"]
-            span_manager = SpanManager()
+            span_manager = create_span_manager(config.SPAN_MANAGER)
 
             time_before_call = datetime.now(timezone.utc)
             time_after_call = None
@@ -100,6 +109,8 @@ def observe(show_traces: bool = True, save_traces: bool = False):
             total_input_tokens = 0
             total_output_tokens = 0
             total_llm_calls = 0
+            pending_files = list()
+            file_index = 0
             try:
                 response = func(
                     inputText=inputText,
@@ -114,43 +125,23 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                         files_event = event["files"]
 
                         files_list = files_event["files"]
-                        for idx, this_file in enumerate(files_list):
-                            file_bytes = this_file["bytes"]
-
-                            # save bytes to file, given the name of file and the bytes
-
-                            directory_path = os.path.join(os.getcwd(), "output")
-                            if not os.path.exists(directory_path):
-                                try:
-                                    os.makedirs(directory_path, exist_ok=True)
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            if not os.path.exists(
-                                os.path.join(directory_path, str(sessionId))
-                            ):
-                                try:
-                                    os.makedirs(
-                                        os.path.join(directory_path, str(sessionId)),
-                                        exist_ok=True,
-                                    )
-                                except OSError as e:
-                                    print(f"Error creating directory output: {e}")
-                                    raise
-
-                            file_name = os.path.join(
-                                directory_path, str(sessionId), this_file["name"]
+                        pending_files.extend(
+                            get_file_sink().submit(
+                                session_id=sessionId, files=files_list
                             )
-                            with open(file_name, "wb") as f:
-                                f.write(file_bytes)
-
-                            if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                                with open(file_name, "rb") as f:
-                                    root_agent_span.set_attribute(
-                                        SpanAttributes.FILES.value + str(idx + 1),
-                                        f.read().decode("utf8", errors="ignore"),
-                                    )
+                        )
+
+                        if config.PRODUCE_BEDROCK_OTEL_TRACES:
+                            # Trace the bytes already in memory, not a re-read
+                            for this_file in files_list:
+                                file_index += 1
+                                root_agent_span.set_attribute(
+                                    SpanAttributes.FILES.value + str(file_index),
+                                    file_attribute(
+                                        this_file["bytes"],
+                                        max_bytes=config.FILE_ATTRIBUTE_MAX_BYTES,
+                                    ),
+                                )
 
                         if show_traces:
                             console = Console()
@@ -194,7 +185,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                     sub_agent_id == agent_id
                                     and sub_agent_alias_id == agent_alias_id
                                 ):
-                                    is_guardrail = True
+                                    state.is_guardrail = True
 
                                 if "inputAssessments" in guardrail_trace:
 
@@ -217,7 +208,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                         agent_answer = str()
 
                                     if config.PRODUCE_BEDROCK_OTEL_TRACES:
-                                        guardrail_span = tracer.start_span(
+                                        state.guardrail_span = tracer.start_span(
                                             name=SpanName.GUARDRAIL.value,
                                             kind=SpanKind.CLIENT,
                                             attributes={
@@ -230,7 +221,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                                 agent_span
                                             ),
                                         )
-                                        guardrail_span.set_attributes(
+                                        state.guardrail_span.set_attributes(
                                             {
                                                 OtelSpanAttributes.INPUT_VALUE: json_safe(
                                                     guardrail_trace["inputAssessments"]
@@ -239,9 +230,11 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                             }
                                         )
 
-                                        guardrail_span.set_status(Status(StatusCode.OK))
-                                        guardrail_span.end()
-                                        guardrail_span = None
+                                        state.guardrail_span.set_status(
+                                            Status(StatusCode.OK)
+                                        )
+                                        state.guardrail_span.end()
+                                        state.guardrail_span = None
 
                                 if "outputAssessments" in guardrail_trace:
                                     if config.PRODUCE_BEDROCK_OTEL_TRACES:
@@ -252,7 +245,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                             ):
                                                 agent_answer = str()
 
-                                            guardrail_span = tracer.start_span(
+                                            state.guardrail_span = tracer.start_span(
                                                 name=SpanName.GUARDRAIL.value,
                                                 kind=SpanKind.CLIENT,
                                                 attributes={
@@ -267,7 +260,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                                     ].agent_span.span
                                                 ),
                                             )
-                                            guardrail_span.set_attributes(
+                                            state.guardrail_span.set_attributes(
                                                 {
                                                     OtelSpanAttributes.OUTPUT_VALUE: json_safe(
                                                         guardrail_trace[
@@ -277,13 +270,13 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                                     OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
                                                 }
                                             )
-                                            guardrail_span.set_status(
+                                            state.guardrail_span.set_status(
                                                 Status(StatusCode.OK)
                                             )
-                                            guardrail_span.end()
+                                            state.guardrail_span.end()
                                         else:
                                             if (
-                                                not guardrail_span
+                                                not state.guardrail_span
                                                 and guardrail_trace["action"]
                                                 == "INTERVENED"
                                             ):
@@ -293,11 +286,9 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                                     and sub_agent_alias_id
                                                     == agent_alias_id
                                                 ):
-                                                    output_stream_guardrail_intervene = (
-                                                        True
-                                                    )
+                                                    state.output_stream_guardrail_intervene = True
 
-                                                guardrail_span = tracer.start_span(
+                                                state.guardrail_span = tracer.start_span(
                                                     name=SpanName.GUARDRAIL.value,
                                                     kind=SpanKind.CLIENT,
                                                     attributes={
@@ -312,7 +303,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                                         ].agent_span.span
                                                     ),
                                                 )
-                                                guardrail_span.set_attributes(
+                                                state.guardrail_span.set_attributes(
                                                     {
                                                         OtelSpanAttributes.OUTPUT_VALUE: json_safe(
                                                             guardrail_trace[
@@ -322,10 +313,10 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                                         OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
                                                     }
                                                 )
-                                                guardrail_span.set_status(
+                                                state.guardrail_span.set_status(
                                                     Status(StatusCode.OK)
                                                 )
-                                                guardrail_span.end()
+                                                state.guardrail_span.end()
 
                         input_tokens, output_tokens, llm_calls = (
                             ProcessL2Trace.process_trace_event(
@@ -351,7 +342,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                         else:
                             data = event["chunk"]["bytes"]
                             if stream_final_response is True:
-                                if output_stream_guardrail_intervene is True:
+                                if state.output_stream_guardrail_intervene is True:
                                     agent_answer = str()
                                     agent_answer += data.decode("utf8")
                                     print(
@@ -377,18 +368,19 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                                     end="",
                                 )
 
+                FileSink.wait(pending_files)
                 time_after_call = datetime.now(timezone.utc)
 
                 if config.PRODUCE_BEDROCK_OTEL_TRACES:
                     if sessionId not in span_manager.spans:
                         raise RuntimeError("Root Agent span not found")
-                    if citations and output_stream_guardrail_intervene is False:
+                    if citations and state.output_stream_guardrail_intervene is False:
                         root_agent_span.set_attribute(
                             OtelSpanAttributes.RETRIEVAL_DOCUMENTS, json_safe(citations)
                         )
 
-                    if is_guardrail and not guardrail_span:
-                        guardrail_span = tracer.start_span(
+                    if state.is_guardrail and not state.guardrail_span:
+                        state.guardrail_span = tracer.start_span(
                             name=SpanName.GUARDRAIL.value,
                             kind=SpanKind.CLIENT,
                             attributes={
@@ -398,18 +390,18 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                             context=otel_trace.set_span_in_context(root_agent_span),
                         )
 
-                        guardrail_span.set_attributes(
+                        state.guardrail_span.set_attributes(
                             {
                                 OtelSpanAttributes.OUTPUT_VALUE: json_safe([{}]),
                                 OtelSpanAttributes.OUTPUT_MIME_TYPE: "application/json",
                             }
                         )
 
-                        guardrail_span.set_status(Status(StatusCode.OK))
-                        guardrail_span.end()
-                        guardrail_span = None
+                        state.guardrail_span.set_status(Status(StatusCode.OK))
+                        state.guardrail_span.end()
+                        state.guardrail_span = None
                     else:
-                        guardrail_span = None
+                        state.guardrail_span = None
 
                     root_agent_span.set_attribute(
                         OtelSpanAttributes.OUTPUT_VALUE, agent_answer
@@ -419,7 +411,7 @@ def observe(show_traces: bool = True, save_traces: bool = False):
                     )
                     # End root span
 
-                    if output_stream_guardrail_intervene is True:
+                    if state.output_stream_guardrail_intervene is True:
                         span_manager.end_all_spans(status_code=StatusCode.OK)
                     else:
                         span_manager.spans[sessionId].agent_span.end_time = int(
@@ -458,6 +450,12 @@ def observe(show_traces: bool = True, save_traces: bool = False):
 
                 time_after_call = datetime.now(timezone.utc)
 
+            finally:
+                # Also when the error is re-raised, so compressed segments get
+                # their trailer and stay readable
+                if save_traces:
+                    close_trace_writer(session_id=sessionId)
+
             duration = (time_after_call - time_before_call).total_seconds()
 
             print(
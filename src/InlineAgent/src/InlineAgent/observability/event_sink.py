@@ -0,0 +1,117 @@
+"""Sinks receiving the agent's answer, tool output and trace as structured events."""
+
+import asyncio
+import queue
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, Optional, Union
+
+from rich.console import Console
+from rich.markdown import Markdown
+from termcolor import colored
+
+
+class AgentEventType:
+    SESSION = "session"
+    ANSWER = "answer"
+    CITATION = "citation"
+    TRACE = "trace"
+    TOOL_OUTPUT = "tool_output"
+    FILES = "files"
+    STATS = "stats"
+    ERROR = "error"
+
+
+@dataclass
+class AgentEvent:
+    """
+    One piece of agent output.
+
+    ``message`` is the human readable line the console shows, ``data`` the
+    structured payload it was built from (e.g. the raw Bedrock trace).
+    ``color``, ``end`` and ``markdown`` are rendering hints for the console.
+    """
+
+    type: str
+    message: str = ""
+    data: Dict[str, Any] = field(default_factory=dict)
+    color: Optional[str] = None
+    end: str = "\n"
+    markdown: bool = False
+
+
+class EventSink(ABC):
+    """
+    Destination of agent events.
+
+    Producers skip building events altogether when ``enabled`` is False, so
+    a disabled sink costs no formatting work.
+    """
+
+    enabled = True
+
+    @abstractmethod
+    def emit(self, event: AgentEvent) -> None:
+        pass
+
+
+class NoopEventSink(EventSink):
+    """Discards every event, for headless deployments."""
+
+    enabled = False
+
+    def emit(self, event: AgentEvent) -> None:
+        pass
+
+
+class ConsoleEventSink(EventSink):
+    """Prints events to stdout with termcolor and rich, as the SDK always did."""
+
+    def __init__(self):
+        self._console = None
+
+    def emit(self, event: AgentEvent) -> None:
+        if event.markdown:
+            if self._console is None:
+                self._console = Console()
+            self._console.print(Markdown(event.message))
+        elif event.color:
+            print(colored(event.message, event.color), end=event.end)
+        else:
+            print(event.message, end=event.end)
+
+
+class QueueEventSink(EventSink):
+    """
+    Puts events on a ``queue.Queue`` or ``asyncio.Queue`` for another consumer.
+
+    Events that do not fit in a bounded queue are counted in ``dropped``
+    instead of blocking the agent.
+    """
+
+    def __init__(self, event_queue: Union[queue.Queue, asyncio.Queue, None] = None):
+        self.queue = event_queue if event_queue is not None else queue.Queue()
+        self.dropped = 0
+
+    def emit(self, event: AgentEvent) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except (queue.Full, asyncio.QueueFull):
+            self.dropped += 1
+
+
+_event_sink: EventSink = ConsoleEventSink()
+_event_sink_lock = Lock()
+
+
+def get_event_sink() -> EventSink:
+    """Return the process wide default sink, a ConsoleEventSink unless replaced."""
+    return _event_sink
+
+
+def set_event_sink(sink: EventSink) -> None:
+    """Replace the process wide default sink."""
+    global _event_sink
+    with _event_sink_lock:
+        _event_sink = sink
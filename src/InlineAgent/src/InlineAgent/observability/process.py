@@ -20,6 +20,7 @@ from .utils import (
 from .semantics import SpanAttributes, SpanName
 from .settings_management import ObservabilityConfig
 from .span_manager import SpanManager
+from .trace_writer import get_trace_writer
 from .constants import (
     L2Traces,
     L3OrchestrationTraces,
@@ -44,32 +45,14 @@ class ProcessL2Trace:
 
     @staticmethod
     def save_trace(trace_data: Dict, session_id: int):
+        # Appended to trace/<session_id>.jsonl by a background flusher, use
+        # trace_writer.read_trace to load the events back as a list
         try:
-            directory_path = os.path.join(os.getcwd(), "trace")
-            if not os.path.exists(directory_path):
-                try:
-                    os.makedirs(directory_path, exist_ok=True)
-                except OSError as e:
-                    print(f"Error creating directory output: {e}")
-                    raise
-
-            try:
-                with open(
-                    os.path.join(directory_path, str(session_id) + ".json"), "r"
-                ) as file:
-                    data = json.load(file)
-            except (FileNotFoundError, json.JSONDecodeError):
-                # If file doesn't exist or is empty, start with empty list
-                data = []
-
-            # Append the new data
-            data.append(trace_data)
-
-            # Write back to file with proper formatting
-            with open(
-                os.path.join(directory_path, str(session_id) + ".json"), "w"
-            ) as file:
-                json.dump(data, file, indent=2, default=str)
+            get_trace_writer(
+                session_id=session_id,
+                compression=config.TRACE_COMPRESSION,
+                max_bytes=config.TRACE_MAX_BYTES,
+            ).write(trace_data)
 
         except Exception as e:
             print(f"An error occurred: {str(e)}")
@@ -1,6 +1,6 @@
 from pydantic import HttpUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Literal, Optional
 
 
 class ObservabilityConfig(BaseSettings):
@@ -18,3 +18,13 @@ class ObservabilityConfig(BaseSettings):
     LANGFUSE_SECRET_KEY: Optional[str] = None
     BEDROCK_AGENT_TRACER_NAME: str = Field(default="bedrock-agent-tracer")
     PRODUCE_BEDROCK_OTEL_TRACES: bool = Field(default=False)
+    TRACE_COMPRESSION: Optional[Literal["gzip", "zstd"]] = None
+    TRACE_MAX_BYTES: Optional[int] = None
+    # Output files attached to the agent span are truncated to this size
+    FILE_ATTRIBUTE_MAX_BYTES: int = Field(default=64 * 1024)
+    # "fast" skips pydantic validation of every span bookkeeping call
+    SPAN_MANAGER: Literal["pydantic", "fast"] = Field(default="pydantic")
+    SPAN_EXPORT_QUEUE_SIZE: int = Field(default=2048)
+    SPAN_EXPORT_BATCH_SIZE: int = Field(default=512)
+    SPAN_EXPORT_INTERVAL: float = Field(default=5.0)
+    SPAN_EXPORT_BACKPRESSURE: Literal["drop", "block"] = Field(default="drop")
@@ -0,0 +1,169 @@
+"""Bounded, batched export stage for agent spans."""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import List, Literal, Optional
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+logger = logging.getLogger(__name__)
+
+MAX_QUEUE_SIZE = 2048
+MAX_EXPORT_BATCH_SIZE = 512
+SCHEDULE_DELAY = 5.0
+
+Backpressure = Literal["drop", "block"]
+
+
+@dataclass
+class SpanExportStats:
+    queue_depth: int = 0
+    enqueued: int = 0
+    exported: int = 0
+    dropped: int = 0
+    failed: int = 0
+    batches: int = 0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+    total_flush_latency: float = 0.0
+
+    @property
+    def average_flush_latency(self) -> float:
+        return self.total_flush_latency / self.batches if self.batches else 0.0
+
+
+class QueuedSpanProcessor(SpanProcessor):
+    """
+    Span processor that hands finished spans to a background exporter.
+
+    ``on_end`` only puts the span on a bounded queue, so ending a span never
+    waits for the network. A worker thread exports the queue in batches of
+    ``max_export_batch_size`` every ``schedule_delay`` seconds, or as soon as
+    a full batch is waiting. When the queue is full, ``backpressure="drop"``
+    discards the span and ``"block"`` waits up to ``block_timeout`` seconds
+    (forever if None) for room. ``stats`` reports queue depth, drops and
+    flush latency.
+    """
+
+    def __init__(
+        self,
+        span_exporter: SpanExporter,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        max_export_batch_size: int = MAX_EXPORT_BATCH_SIZE,
+        schedule_delay: float = SCHEDULE_DELAY,
+        backpressure: Backpressure = "drop",
+        block_timeout: Optional[float] = None,
+    ):
+        if backpressure not in ("drop", "block"):
+            raise ValueError(f"Unsupported backpressure policy: {backpressure}")
+        if max_export_batch_size > max_queue_size:
+            raise ValueError("max_export_batch_size must not exceed max_queue_size")
+
+        self.span_exporter = span_exporter
+        self.max_export_batch_size = max_export_batch_size
+        self.schedule_delay = schedule_delay
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._stats = SpanExportStats()
+        self._stats_lock = threading.Lock()
+        # Held for a whole drain so force_flush sees every dequeued span exported
+        self._export_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._shutdown = False
+
+        self._thread = threading.Thread(
+            target=self._run, name="InlineAgentSpanExporter", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def stats(self) -> SpanExportStats:
+        with self._stats_lock:
+            return replace(self._stats, queue_depth=self._queue.qsize())
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if self._shutdown or not span.context.trace_flags.sampled:
+            return
+
+        try:
+            if self.backpressure == "block":
+                if self._queue.full():
+                    self._wake.set()
+                self._queue.put(span, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(span)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats.dropped += 1
+            return
+
+        with self._stats_lock:
+            self._stats.enqueued += 1
+        if self._queue.qsize() >= self.max_export_batch_size:
+            self._wake.set()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        deadline = time.monotonic() + timeout_millis / 1000
+        self._export_queued(deadline=deadline)
+        return self._queue.empty()
+
+    def shutdown(self) -> None:
+        if self._shutdown:
+            return
+        self._shutdown = True
+        self._wake.set()
+        self._thread.join()
+        self._export_queued()
+        self.span_exporter.shutdown()
+
+    def _run(self):
+        while not self._shutdown:
+            self._wake.wait(self.schedule_delay)
+            self._wake.clear()
+            self._export_queued()
+
+    def _export_queued(self, deadline: Optional[float] = None):
+        with self._export_lock:
+            while deadline is None or time.monotonic() < deadline:
+                batch = self._take_batch()
+                if not batch:
+                    return
+                self._export(batch)
+
+    def _take_batch(self) -> List[ReadableSpan]:
+        batch = list()
+        while len(batch) < self.max_export_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: List[ReadableSpan]):
+        start = time.perf_counter()
+        try:
+            result = self.span_exporter.export(batch)
+        except Exception as e:
+            logger.error(f"Failed to export {len(batch)} spans: {e}")
+            result = SpanExportResult.FAILURE
+        latency = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._stats.batches += 1
+            self._stats.last_flush_latency = latency
+            self._stats.max_flush_latency = max(self._stats.max_flush_latency, latency)
+            self._stats.total_flush_latency += latency
+            if result == SpanExportResult.SUCCESS:
+                self._stats.exported += len(batch)
+            else:
+                self._stats.failed += len(batch)
@@ -15,9 +15,7 @@ from pydantic import (
 
 from .utils import get_agent_from_caller_chain
 
-
-from pydantic import BaseModel
-from typing import Dict, Any
+SpanManagerImplementation = Literal["pydantic", "fast"]
 
 tracer = trace.get_tracer("bedrock-agent-tracing")
 
@@ -46,11 +44,15 @@ class SpanModel(BaseModel):
     @staticmethod
     @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def process_end(span: Span, end_time: int):
-        if span.is_recording():
-            if end_time:
-                span.end(end_time=end_time)
-            else:
-                span.end()
+        _end_span(span=span, end_time=end_time)
+
+
+def _end_span(span: Span, end_time: int):
+    if span.is_recording():
+        if end_time:
+            span.end(end_time=end_time)
+        else:
+            span.end()
 
 
 class SpanFamily(BaseModel):
@@ -67,17 +69,77 @@ class SpanFamily(BaseModel):
         extra = "forbid"  # Prevents additional fields
 
 
-class SpanManager(BaseModel):
+class FastSpanModel:
+    """``SpanModel`` without pydantic validation; setting ``end`` to True ends the span."""
 
-    spans: Optional[Dict[str, SpanFamily]] = {}
-    agent_session_id_dict: Optional[Dict[str, str]] = {}
+    __slots__ = ("span", "end_time", "_end")
 
-    class Config:
-        arbitrary_types_allowed = True
-        extra = "forbid"
-        validate_assignment = True
+    def __init__(self, span: Span, end_time: int = 0, end: Optional[bool] = None):
+        self.span = span
+        self.end_time = end_time
+        self._end = None
+        if end is not None:
+            self.end = end
+
+    @property
+    def end(self) -> Optional[bool]:
+        return self._end
+
+    @end.setter
+    def end(self, value: Optional[bool]):
+        if value is True:
+            _end_span(span=self.span, end_time=self.end_time)
+        self._end = value
+
+
+class FastSpanFamily:
+    """``SpanFamily`` without pydantic validation."""
+
+    __slots__ = ("family", "counter", "agent_span", "l2_span", "l3_span")
+
+    def __init__(
+        self,
+        family: str,
+        counter: str,
+        agent_span: FastSpanModel,
+        l2_span: Optional[FastSpanModel] = None,
+        l3_span: Optional[Dict[str, FastSpanModel]] = None,
+    ):
+        self.family = family
+        self.counter = counter
+        self.agent_span = agent_span
+        self.l2_span = l2_span
+        self.l3_span = l3_span if l3_span is not None else {}
+
+
+class FastSpanManager:
+    """
+    Span bookkeeping of one ``observe`` invocation, without pydantic.
+
+    ``SpanManager`` validates every call and every assignment, which costs
+    more than the spans themselves on long event streams. This class keeps
+    the exact same API and logic on plain ``__slots__`` objects;
+    ``SpanManager`` delegates to it after validating its arguments.
+    """
+
+    __slots__ = ("spans", "agent_session_id_dict")
+
+    def __init__(
+        self,
+        spans: Optional[Dict[str, FastSpanFamily]] = None,
+        agent_session_id_dict: Optional[Dict[str, str]] = None,
+    ):
+        self.spans = spans if spans is not None else {}
+        self.agent_session_id_dict = (
+            agent_session_id_dict if agent_session_id_dict is not None else {}
+        )
+
+    def _span_model(self, span: Span):
+        return FastSpanModel(span=span)
+
+    def _span_family(self, agent_span) -> FastSpanFamily:
+        return FastSpanFamily(family="", counter="", agent_span=agent_span)
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def create_agent_span_return(
         self,
         agent_session_id: str,
@@ -137,18 +199,13 @@ class SpanManager(BaseModel):
             # start_time=start_time,
         )
 
-        span_family = SpanFamily(
-            family="",
-            counter="",
-            agent_span=SpanModel(span=span),
-        )
+        span_family = self._span_family(agent_span=self._span_model(span=span))
 
         self.spans[agent_session_id] = span_family
         self.agent_session_id_dict[f"{agent_id}:{agent_alias_id}"] = agent_session_id
 
         return span
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def delete_agent_span(
         self,
         agent_session_id: str,
@@ -169,7 +226,6 @@ class SpanManager(BaseModel):
 
         del self.spans[agent_session_id]
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def assign_new_l2_return(
         self,
         agent_session_id: str,
@@ -207,7 +263,7 @@ class SpanManager(BaseModel):
 
                         self.spans[agent_session_id].l3_span[
                             f"{agent_id}:{agent_alias_id}"
-                        ].span.end = True
+                        ].end = True
                         del self.spans[agent_session_id].l3_span[
                             f"{agent_id}:{agent_alias_id}"
                         ]
@@ -236,10 +292,10 @@ class SpanManager(BaseModel):
             context=trace.set_span_in_context(l2_span),
         )
 
-        self.spans[agent_session_id].l2_span = SpanModel(span=l2_span)
+        self.spans[agent_session_id].l2_span = self._span_model(span=l2_span)
 
         self.spans[agent_session_id].l3_span.update(
-            {f"{agent_id}:{agent_alias_id}": SpanModel(span=l3_span)}
+            {f"{agent_id}:{agent_alias_id}": self._span_model(span=l3_span)}
         )
 
         self.spans[agent_session_id].family = family
@@ -247,7 +303,6 @@ class SpanManager(BaseModel):
 
         return l2_span
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def assign_new_l3_return(
         self,
         agent_session_id: str,
@@ -287,14 +342,13 @@ class SpanManager(BaseModel):
         )
 
         self.spans[agent_session_id].l3_span.update(
-            {collab_agent_trace_id: SpanModel(span=l3_span)}
+            {collab_agent_trace_id: self._span_model(span=l3_span)}
         )
 
         self.agent_session_id_dict[collab_agent_trace_id] = agent_session_id
 
         return l3_span
 
-    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
     def delete_l3_span(
         self,
         agent_session_id: str,
@@ -352,3 +406,113 @@ class SpanManager(BaseModel):
             current_span.counter = ""
 
         self.spans = {}
+
+
+class SpanManager(BaseModel):
+
+    spans: Optional[Dict[str, SpanFamily]] = {}
+    agent_session_id_dict: Optional[Dict[str, str]] = {}
+
+    class Config:
+        arbitrary_types_allowed = True
+        extra = "forbid"
+        validate_assignment = True
+
+    def _span_model(self, span: Span) -> SpanModel:
+        return SpanModel(span=span)
+
+    def _span_family(self, agent_span: SpanModel) -> SpanFamily:
+        return SpanFamily(family="", counter="", agent_span=agent_span)
+
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def create_agent_span_return(
+        self,
+        agent_session_id: str,
+        caller_chain: list,
+        attributes: Dict[str, Any],
+        name: str,
+    ) -> Span:
+        return FastSpanManager.create_agent_span_return(
+            self,
+            agent_session_id=agent_session_id,
+            caller_chain=caller_chain,
+            attributes=attributes,
+            name=name,
+        )
+
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def delete_agent_span(
+        self,
+        agent_session_id: str,
+    ) -> Span:
+        return FastSpanManager.delete_agent_span(
+            self, agent_session_id=agent_session_id
+        )
+
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def assign_new_l2_return(
+        self,
+        agent_session_id: str,
+        caller_chain: list,
+        trace_id: str,
+        l2_attributes: Dict[str, Any],
+        l3_attributes: Dict[str, Any],
+        l2_name: str,
+        l3_name: str,
+    ) -> Span:
+        return FastSpanManager.assign_new_l2_return(
+            self,
+            agent_session_id=agent_session_id,
+            caller_chain=caller_chain,
+            trace_id=trace_id,
+            l2_attributes=l2_attributes,
+            l3_attributes=l3_attributes,
+            l2_name=l2_name,
+            l3_name=l3_name,
+        )
+
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def assign_new_l3_return(
+        self,
+        agent_session_id: str,
+        collab_agent_trace_id: str,
+        trace_id: str,
+        attributes: Dict[str, Any],
+        name: str,
+    ) -> Span:
+        return FastSpanManager.assign_new_l3_return(
+            self,
+            agent_session_id=agent_session_id,
+            collab_agent_trace_id=collab_agent_trace_id,
+            trace_id=trace_id,
+            attributes=attributes,
+            name=name,
+        )
+
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def delete_l3_span(
+        self,
+        agent_session_id: str,
+        collab_agent_trace_id: str,
+        trace_id: str,
+        status=StatusCode.OK,
+    ) -> Span:
+        return FastSpanManager.delete_l3_span(
+            self,
+            agent_session_id=agent_session_id,
+            collab_agent_trace_id=collab_agent_trace_id,
+            trace_id=trace_id,
+            status=status,
+        )
+
+    def end_all_spans(self, status_code: Literal[StatusCode.OK, StatusCode.ERROR]):
+        FastSpanManager.end_all_spans(self, status_code=status_code)
+
+
+def create_span_manager(implementation: SpanManagerImplementation = "pydantic"):
+    """Return a new span manager of the given implementation."""
+    if implementation == "fast":
+        return FastSpanManager()
+    if implementation == "pydantic":
+        return SpanManager()
+    raise ValueError(f"Unknown span manager implementation: {implementation}")
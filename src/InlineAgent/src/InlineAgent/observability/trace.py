@@ -1,17 +1,26 @@
 from enum import Enum
 from typing import Dict, List
 from InlineAgent.constants import Level, TraceColor
-from termcolor import colored
-from rich.console import Console
-from rich.markdown import Markdown
 
 import json
 
+from .event_sink import AgentEvent, AgentEventType, EventSink, get_event_sink
 
 AGENT = {}
 STEP = 1
 
 
+def _emit(sink: EventSink, trace: Dict, message: str, color: str):
+    sink.emit(
+        AgentEvent(
+            type=AgentEventType.TRACE,
+            message=message,
+            data={"trace": trace},
+            color=color,
+        )
+    )
+
+
 class Trace:
 
     @staticmethod
@@ -19,7 +28,13 @@ class Trace:
         trace: Dict,
         agentName: str,
         truncateResponse: int = None,
+        sink: EventSink = None,
     ):
+        sink = sink or get_event_sink()
+        if not sink.enabled:
+            # Nothing will be shown, only count tokens
+            return Trace.count_tokens(trace=trace)
+
         input_tokens = 0
         output_tokens = 0
         llm_calls = 0
@@ -34,28 +49,30 @@ class Trace:
         # If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member.
         # The structure of SDK_UNKNOWN_MEMBER is as follows: 'SDK_UNKNOWN_MEMBER': {'name': 'UnknownMemberName'}
 
-        HighLevelTrace.parse_custom_orchestration_trace(trace=trace)
+        HighLevelTrace.parse_custom_orchestration_trace(trace=trace, sink=sink)
 
-        HighLevelTrace.parse_failure_trace(trace=trace)
+        HighLevelTrace.parse_failure_trace(trace=trace, sink=sink)
 
-        HighLevelTrace.guardrail_trace(trace=trace)
+        HighLevelTrace.guardrail_trace(trace=trace, sink=sink)
 
         orch_input_tokens, orch_output_tokens, orch_llm_calls = (
-            HighLevelTrace.parse_orchestration_trace(trace=trace, agentName=agentName)
+            HighLevelTrace.parse_orchestration_trace(
+                trace=trace, agentName=agentName, sink=sink
+            )
         )
         input_tokens += orch_input_tokens
         output_tokens += orch_output_tokens
         llm_calls += orch_llm_calls
 
         post_input_tokens, post_output_tokens, post_llm_calls = (
-            HighLevelTrace.parse_post_processing_trace(trace=trace)
+            HighLevelTrace.parse_post_processing_trace(trace=trace, sink=sink)
         )
         input_tokens += post_input_tokens
         output_tokens += post_output_tokens
         llm_calls += post_llm_calls
 
         pre_input_tokens, pre_output_tokens, pre_llm_calls = (
-            HighLevelTrace.parse_preprocessing_trace(trace=trace)
+            HighLevelTrace.parse_preprocessing_trace(trace=trace, sink=sink)
         )
         input_tokens += pre_input_tokens
         output_tokens += pre_output_tokens
@@ -63,7 +80,7 @@ class Trace:
 
         rout_input_tokens, rout_output_tokens, rout_llm_calls = (
             HighLevelTrace.parse_routing_classifier_trace(
-                trace=trace, agentName=agentName
+                trace=trace, agentName=agentName, sink=sink
             )
         )
         input_tokens += rout_input_tokens
@@ -73,7 +90,25 @@ class Trace:
         return int(input_tokens), int(output_tokens), int(llm_calls)
 
     @staticmethod
-    def add_citation(citations: List, cite=1) -> str:
+    def count_tokens(trace: Dict):
+        """Token usage and LLM calls of a trace, without formatting anything."""
+        for key in ("orchestrationTrace", "routingClassifierTrace"):
+            if key in trace and "modelInvocationOutput" in trace[key]:
+                usage = trace[key]["modelInvocationOutput"]["metadata"]["usage"]
+                return (
+                    int(usage.get("inputTokens", 0)),
+                    int(usage.get("outputTokens", 0)),
+                    1,
+                )
+        for key in ("preProcessingTrace", "postProcessingTrace"):
+            if key in trace and "modelInvocationOutput" in trace[key]:
+                usage = trace[key]["modelInvocationOutput"]["metadata"]["usage"]
+                return int(usage["inputTokens"]), int(usage["outputTokens"]), 1
+        return 0, 0, 0
+
+    @staticmethod
+    def add_citation(citations: List, cite=1, sink: EventSink = None) -> str:
+        sink = sink or get_event_sink()
 
         agent_answer = str()
 
@@ -118,17 +153,46 @@ class Trace:
             )
 
             agent_answer += text
-            print(colored(text, TraceColor.final_output), end="")
-            if citation["retrievedReferences"]:
-                print(colored(f" [{cite}]", TraceColor.error), end="")
+            if sink.enabled:
+                sink.emit(
+                    AgentEvent(
+                        type=AgentEventType.ANSWER,
+                        message=text,
+                        color=TraceColor.final_output,
+                        end="",
+                    )
+                )
+                if citation["retrievedReferences"]:
+                    sink.emit(
+                        AgentEvent(
+                            type=AgentEventType.CITATION,
+                            message=f" [{cite}]",
+                            data={"citation": citation},
+                            color=TraceColor.error,
+                            end="",
+                        )
+                    )
 
             cite += 1
 
-        print("\n\n")
-        for output in cite_output:
-            if len(output[1]):
-                print(colored(output[0], TraceColor.cite))
-                print(colored(output[1] + "\n", TraceColor.retrieved_references))
+        if sink.enabled:
+            sink.emit(AgentEvent(type=AgentEventType.CITATION, message="\n\n"))
+            for output in cite_output:
+                if len(output[1]):
+                    sink.emit(
+                        AgentEvent(
+                            type=AgentEventType.CITATION,
+                            message=output[0],
+                            color=TraceColor.cite,
+                        )
+                    )
+                    sink.emit(
+                        AgentEvent(
+                            type=AgentEventType.CITATION,
+                            message=output[1] + "\n",
+                            color=TraceColor.retrieved_references,
+                        )
+                    )
 
         return agent_answer, cite
 
@@ -136,74 +200,79 @@ class Trace:
 class HighLevelTrace:
 
     @staticmethod
-    def parse_custom_orchestration_trace(trace: Dict):
+    def parse_custom_orchestration_trace(trace: Dict, sink: EventSink = None):
+        sink = sink or get_event_sink()
         if "customOrchestrationTrace" in trace:
-            print(
-                colored(
-                    f"Agent error: {trace['customOrchestrationTrace']['event']['text']}",
-                    TraceColor.custom_orchestraction_trace,
-                )
+            _emit(
+                sink,
+                trace,
+                f"Agent error: {trace['customOrchestrationTrace']['event']['text']}",
+                TraceColor.custom_orchestraction_trace,
             )
 
     @staticmethod
-    def parse_failure_trace(trace: Dict):
+    def parse_failure_trace(trace: Dict, sink: EventSink = None):
+        sink = sink or get_event_sink()
         if "failureTrace" in trace:
-            print(
-                colored(
-                    f"Agent error: {trace['failureTrace']['failureReason']}",
-                    TraceColor.error,
-                )
+            _emit(
+                sink,
+                trace,
+                f"Agent error: {trace['failureTrace']['failureReason']}",
+                TraceColor.error,
             )
 
     @staticmethod
-    def guardrail_trace(trace: Dict):
+    def guardrail_trace(trace: Dict, sink: EventSink = None):
+        sink = sink or get_event_sink()
         if "guardrailTrace" in trace:
             if trace["guardrailTrace"]["action"] == "INTERVENED":
-                print(
-                    colored(
-                        "<--- Guardrail Intervened --->", TraceColor.guardrail_trace
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    "<--- Guardrail Intervened --->",
+                    TraceColor.guardrail_trace,
                 )
                 for inputAssessment in trace["guardrailTrace"]["inputAssessments"]:
-                    print(colored("Input Guardrail", TraceColor.guardrail_trace))
-                    print(
-                        colored(
-                            json.dumps(inputAssessment, indent=2, default=str),
-                            TraceColor.guardrail_trace,
-                        )
+                    _emit(sink, trace, "Input Guardrail", TraceColor.guardrail_trace)
+                    _emit(
+                        sink,
+                        trace,
+                        json.dumps(inputAssessment, indent=2, default=str),
+                        TraceColor.guardrail_trace,
                     )
 
                 for outputAssessment in trace["guardrailTrace"]["outputAssessments"]:
-                    print(colored("Output Guardrail", TraceColor.guardrail_trace))
-                    print(
-                        colored(
-                            json.dumps(outputAssessment, indent=2, default=str),
-                            TraceColor.guardrail_trace,
-                        )
+                    _emit(sink, trace, "Output Guardrail", TraceColor.guardrail_trace)
+                    _emit(
+                        sink,
+                        trace,
+                        json.dumps(outputAssessment, indent=2, default=str),
+                        TraceColor.guardrail_trace,
                     )
 
     @staticmethod
-    def parse_orchestration_trace(trace: Dict, agentName: str):
+    def parse_orchestration_trace(trace: Dict, agentName: str, sink: EventSink = None):
+        sink = sink or get_event_sink()
         # This is a Tagged Union structure. Only one of the following top level keys will be set: invocationInput, modelInvocationInput, modelInvocationOutput, observation, rationale. If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member. The structure of SDK_UNKNOWN_MEMBER is as follows:'SDK_UNKNOWN_MEMBER': {'name': 'UnknownMemberName'}
 
         if "orchestrationTrace" in trace:
 
             RoutingAndOrchestrationTrace.parse_invocation_input(
-                trace=trace["orchestrationTrace"]
+                trace=trace["orchestrationTrace"], sink=sink
             )
 
             RoutingAndOrchestrationTrace.parse_model_invocation_input(
-                trace=trace["orchestrationTrace"]
+                trace=trace["orchestrationTrace"], sink=sink
             )
 
             input_tokens, output_tokens, llm_calls = (
                 RoutingAndOrchestrationTrace.parse_model_invocation_output(
-                    trace=trace["orchestrationTrace"]
+                    trace=trace["orchestrationTrace"], sink=sink
                 )
             )
 
             RoutingAndOrchestrationTrace.parse_observation(
-                trace=trace["orchestrationTrace"]
+                trace=trace["orchestrationTrace"], sink=sink
             )
 
             if "rationale" in trace["orchestrationTrace"]:
@@ -213,18 +282,19 @@ class HighLevelTrace:
                 # else:
                 #     # Main agent
                 #     print(colored("Supervisor Agent Invoked", TraceColor.rationale))
-                print(
-                    colored(
-                        f"Thought: {trace['orchestrationTrace']['rationale']['text']}",
-                        TraceColor.rationale,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Thought: {trace['orchestrationTrace']['rationale']['text']}",
+                    TraceColor.rationale,
                 )
 
             return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_preprocessing_trace(trace: Dict):
+    def parse_preprocessing_trace(trace: Dict, sink: EventSink = None):
+        sink = sink or get_event_sink()
 
         if "preProcessingTrace" in trace:
             if "modelInvocationOutput" in trace["preProcessingTrace"]:
@@ -242,24 +312,25 @@ class HighLevelTrace:
 
                 llm_calls = 1
 
-                print(
-                    colored(
-                        "Pre-processing trace, agent came up with an initial plan.",
-                        TraceColor.pre_processing,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    "Pre-processing trace, agent came up with an initial plan.",
+                    TraceColor.pre_processing,
                 )
-                print(
-                    colored(
-                        f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
-                        TraceColor.stats,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
+                    TraceColor.stats,
                 )
 
                 return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_post_processing_trace(trace: Dict):
+    def parse_post_processing_trace(trace: Dict, sink: EventSink = None):
+        sink = sink or get_event_sink()
 
         if "postProcessingTrace" in trace:
             if "modelInvocationOutput" in trace["postProcessingTrace"]:
@@ -276,42 +347,46 @@ class HighLevelTrace:
                 )
 
                 llm_calls = 1
-                print(
-                    colored(
-                        "Agent post-processing complete.", TraceColor.post_processing
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    "Agent post-processing complete.",
+                    TraceColor.post_processing,
                 )
-                print(
-                    colored(
-                        f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
-                        TraceColor.stats,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
+                    TraceColor.stats,
                 )
 
                 return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_routing_classifier_trace(trace: Dict, agentName: str):
+    def parse_routing_classifier_trace(
+        trace: Dict, agentName: str, sink: EventSink = None
+    ):
+        sink = sink or get_event_sink()
         # This is a Tagged Union structure. Only one of the following top level keys will be set: invocationInput, modelInvocationInput, modelInvocationOutput, observation. If a client receives an unknown member it will set SDK_UNKNOWN_MEMBER as the top level key, which maps to the name or tag of the unknown member. The structure of SDK_UNKNOWN_MEMBER is as follows: 'SDK_UNKNOWN_MEMBER': {'name': 'UnknownMemberName'}
 
         if "routingClassifierTrace" in trace:
             RoutingAndOrchestrationTrace.parse_invocation_input(
-                trace=trace["routingClassifierTrace"]
+                trace=trace["routingClassifierTrace"], sink=sink
             )
 
             RoutingAndOrchestrationTrace.parse_model_invocation_input(
-                trace=trace["routingClassifierTrace"]
+                trace=trace["routingClassifierTrace"], sink=sink
             )
 
             input_tokens, output_tokens, llm_calls = (
                 RoutingAndOrchestrationTrace.parse_model_invocation_output(
-                    trace=trace["routingClassifierTrace"]
+                    trace=trace["routingClassifierTrace"], sink=sink
                 )
             )
 
             RoutingAndOrchestrationTrace.parse_observation(
-                trace=trace["routingClassifierTrace"]
+                trace=trace["routingClassifierTrace"], sink=sink
             )
 
             return input_tokens, output_tokens, llm_calls
@@ -321,7 +396,8 @@ class HighLevelTrace:
 class RoutingAndOrchestrationTrace:
 
     @staticmethod
-    def parse_invocation_input(trace):
+    def parse_invocation_input(trace, sink: EventSink = None):
+        sink = sink or get_event_sink()
         if "invocationInput" in trace:
             # NOTE: when agent determines invocations should happen in parallel
             # the trace objects for invocation input still come back one at a time.
@@ -348,11 +424,11 @@ class RoutingAndOrchestrationTrace:
                     param_str = f"{parameter['name']}[{parameter['value']}] ({parameter['type']})"
                     params_info.append(param_str)
 
-                print(
-                    colored(
-                        f"Tool use: {tool} with these inputs: {' '.join(params_info)}",
-                        TraceColor.invocation_input,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Tool use: {tool} with these inputs: {' '.join(params_info)}",
+                    TraceColor.invocation_input,
                 )
 
             if "agentCollaboratorInvocationInput" in trace["invocationInput"]:
@@ -378,11 +454,11 @@ class RoutingAndOrchestrationTrace:
                                 text += f"{returnControlInvocationResult['functionResult']['actionGroup']} :: {returnControlInvocationResult['functionResult']['function']} ({returnControlInvocationResult['functionResult']['responseBody']['string']['body']})"
 
                     if text:
-                        print(
-                            colored(
-                                f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
-                                TraceColor.invocation_input,
-                            )
+                        _emit(
+                            sink,
+                            trace,
+                            f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
+                            TraceColor.invocation_input,
                         )
                     if (
                         "text"
@@ -393,22 +469,26 @@ class RoutingAndOrchestrationTrace:
                         text = trace["invocationInput"][
                             "agentCollaboratorInvocationInput"
                         ]["input"]["text"]
-                        print(
-                            colored(
-                                f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
-                                TraceColor.invocation_input,
-                            )
+                        _emit(
+                            sink,
+                            trace,
+                            f"Agent collaborator: {trace['invocationInput']['agentCollaboratorInvocationInput']['agentCollaboratorName']} invoked with {text}",
+                            TraceColor.invocation_input,
                         )
                     else:
                         text = str()
 
             if "codeInterpreterInvocationInput" in trace["invocationInput"]:
                 if "code" in trace["invocationInput"]["codeInterpreterInvocationInput"]:
-                    print(colored(f"Code interpreter:", TraceColor.invocation_input))
-                    console = Console()
-                    console.print(
-                        Markdown(
-                            f"**Generated code**\n```python\n{trace['invocationInput']['codeInterpreterInvocationInput']['code']}\n```"
+                    _emit(
+                        sink, trace, f"Code interpreter:", TraceColor.invocation_input
+                    )
+                    sink.emit(
+                        AgentEvent(
+                            type=AgentEventType.TRACE,
+                            message=f"**Generated code**\n```python\n{trace['invocationInput']['codeInterpreterInvocationInput']['code']}\n```",
+                            data={"trace": trace},
+                            markdown=True,
                         )
                     )
 
@@ -416,34 +496,36 @@ class RoutingAndOrchestrationTrace:
                     "files"
                     in trace["invocationInput"]["codeInterpreterInvocationInput"]
                 ):
-                    print(
-                        colored(
-                            "Code Interpreter invoked with uploaded files",
-                            TraceColor.invocation_input,
-                        )
+                    _emit(
+                        sink,
+                        trace,
+                        "Code Interpreter invoked with uploaded files",
+                        TraceColor.invocation_input,
                     )
 
             if "knowledgeBaseLookupInput" in trace["invocationInput"]:
-                print(
-                    colored(
-                        f"Knowledgebase retrieval: Knowledgebase Id ({trace['invocationInput']['knowledgeBaseLookupInput']['knowledgeBaseId']}) query ({trace['invocationInput']['knowledgeBaseLookupInput']['text']})",
-                        TraceColor.invocation_input,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Knowledgebase retrieval: Knowledgebase Id ({trace['invocationInput']['knowledgeBaseLookupInput']['knowledgeBaseId']}) query ({trace['invocationInput']['knowledgeBaseLookupInput']['text']})",
+                    TraceColor.invocation_input,
                 )
 
     @staticmethod
-    def parse_model_invocation_input(trace):
+    def parse_model_invocation_input(trace, sink: EventSink = None):
+        sink = sink or get_event_sink()
         if "modelInvocationInput" in trace:
             if trace["modelInvocationInput"]["type"] == "ROUTING_CLASSIFIER":
-                print(
-                    colored(
-                        f"Routing the request to collaborators",
-                        TraceColor.rationale,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Routing the request to collaborators",
+                    TraceColor.rationale,
                 )
 
     @staticmethod
-    def parse_model_invocation_output(trace):
+    def parse_model_invocation_output(trace, sink: EventSink = None):
+        sink = sink or get_event_sink()
 
         if "modelInvocationOutput" in trace:
             if "inputTokens" in trace["modelInvocationOutput"]["metadata"]["usage"]:
@@ -459,26 +541,27 @@ class RoutingAndOrchestrationTrace:
             else:
                 output_tokens = 0
             llm_calls = 1
-            print(
-                colored(
-                    f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
-                    TraceColor.stats,
-                )
+            _emit(
+                sink,
+                trace,
+                f"Input Tokens: {input_tokens} Output Tokens: {output_tokens}",
+                TraceColor.stats,
             )
             return input_tokens, output_tokens, llm_calls
         return 0, 0, 0
 
     @staticmethod
-    def parse_observation(trace):
+    def parse_observation(trace, sink: EventSink = None):
+        sink = sink or get_event_sink()
 
         if "observation" in trace:
 
             if "actionGroupInvocationOutput" in trace["observation"]:
-                print(
-                    colored(
-                        f"Tool use output: {trace['observation']['actionGroupInvocationOutput']['text']}",
-                        TraceColor.invocation_output,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Tool use output: {trace['observation']['actionGroupInvocationOutput']['text']}",
+                    TraceColor.invocation_output,
                 )
 
             if "agentCollaboratorInvocationOutput" in trace["observation"]:
@@ -501,11 +584,11 @@ class RoutingAndOrchestrationTrace:
                             elif "functionInvocationInput" in invocationInput:
                                 text += f"{invocationInput['functionInvocationInput']['actionGroup']} :: {invocationInput['functionInvocationInput']['function']}"
 
-                        print(
-                            colored(
-                                f"Collaborator output: Invoke ({text})",
-                                TraceColor.invocation_input,
-                            )
+                        _emit(
+                            sink,
+                            trace,
+                            f"Collaborator output: Invoke ({text})",
+                            TraceColor.invocation_input,
                         )
                     elif (
                         "text"
@@ -516,11 +599,11 @@ class RoutingAndOrchestrationTrace:
                         text = trace["observation"][
                             "agentCollaboratorInvocationOutput"
                         ]["output"]["text"]
-                        print(
-                            colored(
-                                f"Collaborator output: {text}",
-                                TraceColor.invocation_input,
-                            )
+                        _emit(
+                            sink,
+                            trace,
+                            f"Collaborator output: {text}",
+                            TraceColor.invocation_input,
                         )
                     else:
                         text = str()
@@ -530,22 +613,22 @@ class RoutingAndOrchestrationTrace:
                     "executionOutput"
                     in trace["observation"]["codeInterpreterInvocationOutput"]
                 ):
-                    print(
-                        colored(
-                            f"Code interpreter output: {trace['observation']['codeInterpreterInvocationOutput']['executionOutput']}",
-                            TraceColor.invocation_output,
-                        )
+                    _emit(
+                        sink,
+                        trace,
+                        f"Code interpreter output: {trace['observation']['codeInterpreterInvocationOutput']['executionOutput']}",
+                        TraceColor.invocation_output,
                     )
 
                 if (
                     "executionError"
                     in trace["observation"]["codeInterpreterInvocationOutput"]
                 ):
-                    print(
-                        colored(
-                            f"Code interpreter output error: {trace['observation']['codeInterpreterInvocationOutput']['executionError']}",
-                            TraceColor.error,
-                        )
+                    _emit(
+                        sink,
+                        trace,
+                        f"Code interpreter output error: {trace['observation']['codeInterpreterInvocationOutput']['executionError']}",
+                        TraceColor.error,
                     )
 
                 if (
@@ -555,19 +638,19 @@ class RoutingAndOrchestrationTrace:
                     if trace["observation"]["codeInterpreterInvocationOutput"][
                         "executionTimeout"
                     ]:
-                        print(
-                            colored(
-                                f"Code interpreter output error: Execution timeout",
-                                TraceColor.error,
-                            )
+                        _emit(
+                            sink,
+                            trace,
+                            f"Code interpreter output error: Execution timeout",
+                            TraceColor.error,
                         )
 
                 if "files" in trace["observation"]["codeInterpreterInvocationOutput"]:
-                    print(
-                        colored(
-                            "Code Interpreter created new files",
-                            TraceColor.invocation_input,
-                        )
+                    _emit(
+                        sink,
+                        trace,
+                        "Code Interpreter created new files",
+                        TraceColor.invocation_input,
                     )
 
             if "finalResponse" in trace["observation"]:
@@ -584,11 +667,11 @@ class RoutingAndOrchestrationTrace:
                         if "content" in retrievedReference:
                             # TODO: ["content"]["type"] does not exist
                             # if retrievedReference["content"]["type"] == "TEXT":
-                            print(
-                                colored(
-                                    retrievedReference["content"]["text"],
-                                    TraceColor.invocation_output,
-                                )
+                            _emit(
+                                sink,
+                                trace,
+                                retrievedReference["content"]["text"],
+                                TraceColor.invocation_output,
                             )
                             # elif retrievedReference["content"]["type"] == "IMAGE":
                             #     print(
@@ -613,17 +696,17 @@ class RoutingAndOrchestrationTrace:
                             #     )
 
                         if "location" in retrievedReference:
-                            print(
-                                colored(
-                                    f"Location: {json.dumps(retrievedReference['location'], indent=2, default=str)}",
-                                    TraceColor.invocation_output,
-                                )
+                            _emit(
+                                sink,
+                                trace,
+                                f"Location: {json.dumps(retrievedReference['location'], indent=2, default=str)}",
+                                TraceColor.invocation_output,
                             )
 
             if "repromptResponse" in trace["observation"]:
-                print(
-                    colored(
-                        f"Reprompting {trace['observation']['repromptResponse']['source']} with query {trace['orchestrationTrace']['observation']['repromptResponse']['text']}",
-                        TraceColor.invocation_output,
-                    )
+                _emit(
+                    sink,
+                    trace,
+                    f"Reprompting {trace['observation']['repromptResponse']['source']} with query {trace['orchestrationTrace']['observation']['repromptResponse']['text']}",
+                    TraceColor.invocation_output,
                 )
@@ -9,13 +9,13 @@ from opentelemetry.sdk.resources import Resource
 from openinference.semconv.resource import ResourceAttributes
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
     ConsoleSpanExporter,
     SimpleSpanProcessor,
+    SpanExporter,
 )
-from opentelemetry.sdk.resources import Resource
 
 from .settings_management import ObservabilityConfig
+from .span_export import QueuedSpanProcessor
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -24,6 +24,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def create_span_processor(
+    config: ObservabilityConfig, span_exporter: SpanExporter
+) -> QueuedSpanProcessor:
+    """Wrap an exporter in the bounded, batched export stage set up by config."""
+    return QueuedSpanProcessor(
+        span_exporter=span_exporter,
+        max_queue_size=config.SPAN_EXPORT_QUEUE_SIZE,
+        max_export_batch_size=config.SPAN_EXPORT_BATCH_SIZE,
+        schedule_delay=config.SPAN_EXPORT_INTERVAL,
+        backpressure=config.SPAN_EXPORT_BACKPRESSURE,
+    )
+
+
 def create_tracer_provider(config: ObservabilityConfig, timeout: int = 300):
     """Create an OpenTelemetry TracerProvider configured for Langfuse."""
 
@@ -63,14 +76,16 @@ def create_tracer_provider(config: ObservabilityConfig, timeout: int = 300):
             logger.info(
                 f"Langfuse exporter configured for project: {config.PROJECT_NAME}"
             )
-            tracer_provider.add_span_processor(BatchSpanProcessor(langfuse_exporter))
+            tracer_provider.add_span_processor(
+                create_span_processor(config, span_exporter=langfuse_exporter)
+            )
         else:
             span_exporter = OTLPSpanExporter(
                 endpoint=endpoint,
                 timeout=timeout,
             )
             tracer_provider.add_span_processor(
-                BatchSpanProcessor(span_exporter=span_exporter)
+                create_span_processor(config, span_exporter=span_exporter)
             )
 
     else:
@@ -0,0 +1,278 @@
+"""Append-only JSON Lines persistence for agent trace events."""
+
+import atexit
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Literal, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIRECTORY = "trace"
+FLUSH_INTERVAL = 1.0
+# Wake the flusher early once this many events are waiting
+MAX_BUFFERED_EVENTS = 256
+
+Compression = Optional[Literal["gzip", "zstd"]]
+
+_EXTENSIONS = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def _segment_pattern(session_id: str) -> re.Pattern:
+    return re.compile(
+        rf"^{re.escape(str(session_id))}(?:\.(\d+))?\.jsonl(\.gz|\.zst)?$"
+    )
+
+
+def _list_segments(directory: str, session_id: str) -> List[tuple]:
+    """Return (index, path) of every trace segment of a session, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    pattern = _segment_pattern(session_id)
+    segments = list()
+    for file_name in os.listdir(directory):
+        match = pattern.match(file_name)
+        if match:
+            segments.append(
+                (int(match.group(1) or 0), os.path.join(directory, file_name))
+            )
+    return sorted(segments)
+
+
+class TraceWriter:
+    """
+    Buffered, append-only writer of one session's trace events.
+
+    ``write`` only appends to an in-memory buffer; serialization and disk I/O
+    happen on a shared background thread, so saving traces never blocks the
+    event stream. Each event is one JSON line. Segments can be gzip or zstd
+    compressed and are rotated to ``<session>.<n>.jsonl`` once they exceed
+    ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        directory: Optional[str] = None,
+        compression: Compression = None,
+        max_bytes: Optional[int] = None,
+    ):
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Unsupported trace compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd trace compression requires `pip install zstandard`")
+
+        self.session_id = str(session_id)
+        self.directory = directory or os.path.join(os.getcwd(), TRACE_DIRECTORY)
+        self.compression = compression
+        self.max_bytes = max_bytes
+
+        self._buffer: List[Dict] = list()
+        self._buffer_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._raw = None
+        self._stream = None
+
+        segments = _list_segments(self.directory, self.session_id)
+        self._segment = segments[-1][0] if segments else 0
+
+        _flusher.register(self)
+
+    @property
+    def path(self) -> str:
+        index = f".{self._segment}" if self._segment else ""
+        return os.path.join(
+            self.directory,
+            f"{self.session_id}{index}{_EXTENSIONS[self.compression]}",
+        )
+
+    def write(self, trace_data: Dict):
+        with self._buffer_lock:
+            self._buffer.append(trace_data)
+            pending = len(self._buffer)
+        if pending >= MAX_BUFFERED_EVENTS:
+            _flusher.wake()
+
+    def flush(self):
+        with self._buffer_lock:
+            events, self._buffer = self._buffer, list()
+
+        if not events:
+            return
+
+        with self._io_lock:
+            if self._stream is None:
+                self._open()
+            for event in events:
+                self._stream.write(
+                    (json.dumps(event, default=str) + "\n").encode("utf-8")
+                )
+            self._stream.flush()
+            self._raw.flush()
+
+            if self.max_bytes and self._raw.tell() >= self.max_bytes:
+                self._close_segment()
+                self._segment += 1
+
+    def close(self):
+        _flusher.unregister(self)
+        self.flush()
+        with self._io_lock:
+            self._close_segment()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._raw = open(self.path, "ab")
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        elif self.compression == "zstd":
+            self._stream = zstandard.ZstdCompressor().stream_writer(
+                self._raw, closefd=False
+            )
+        else:
+            self._stream = self._raw
+
+    def _close_segment(self):
+        if self._stream is not None and self._stream is not self._raw:
+            self._stream.close()
+        if self._raw is not None:
+            self._raw.close()
+        self._stream = None
+        self._raw = None
+
+
+class _BackgroundFlusher:
+    """Single daemon thread that periodically flushes every open TraceWriter."""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        self._writers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, writer: TraceWriter):
+        with self._lock:
+            self._writers.add(writer)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="InlineAgentTraceFlusher", daemon=True
+                )
+                self._thread.start()
+
+    def unregister(self, writer: TraceWriter):
+        with self._lock:
+            self._writers.discard(writer)
+
+    def wake(self):
+        self._wake.set()
+
+    def flush_all(self):
+        with self._lock:
+            writers = list(self._writers)
+        for writer in writers:
+            try:
+                writer.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush traces of {writer.session_id}: {e}")
+
+    def close_all(self):
+        """Close every open writer, so compressed segments get their trailer."""
+        with self._lock:
+            writers = list(self._writers)
+        for writer in writers:
+            try:
+                writer.close()
+            except Exception as e:
+                logger.error(f"Failed to close traces of {writer.session_id}: {e}")
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush_all()
+
+
+_flusher = _BackgroundFlusher()
+
+_writers: Dict[str, TraceWriter] = dict()
+_writers_lock = threading.Lock()
+
+
+def get_trace_writer(session_id: str, **kwargs) -> TraceWriter:
+    """Return the open TraceWriter of a session, creating it on first use."""
+    session_id = str(session_id)
+    with _writers_lock:
+        writer = _writers.get(session_id)
+        if writer is None:
+            writer = TraceWriter(session_id=session_id, **kwargs)
+            _writers[session_id] = writer
+    return writer
+
+
+def close_trace_writer(session_id: str):
+    """Flush and close the TraceWriter of a session, if one is open."""
+    with _writers_lock:
+        writer = _writers.pop(str(session_id), None)
+    if writer is not None:
+        writer.close()
+
+
+def _close_all_trace_writers():
+    # Runs at exit: flushing alone would leave compressed segments without
+    # their trailer
+    with _writers_lock:
+        _writers.clear()
+    _flusher.close_all()
+
+
+atexit.register(_close_all_trace_writers)
+
+
+def read_trace(session_id: str, directory: Optional[str] = None) -> List[Dict]:
+    """
+    Read every saved trace event of a session, in order.
+
+    Returns the same list of events that used to be stored in
+    ``trace/<session>.json``; a legacy file of that name is included first.
+    """
+    directory = directory or os.path.join(os.getcwd(), TRACE_DIRECTORY)
+    data = list()
+
+    legacy_path = os.path.join(directory, f"{session_id}.json")
+    if os.path.exists(legacy_path):
+        with open(legacy_path, "r") as file:
+            data.extend(json.load(file))
+
+    for _, path in _list_segments(directory, str(session_id)):
+        if path.endswith(".gz"):
+            file = gzip.open(path, "rt", encoding="utf-8")
+        elif path.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError(
+                    "Reading zstd traces requires `pip install zstandard`"
+                )
+            file = io.TextIOWrapper(
+                zstandard.ZstdDecompressor().stream_reader(
+                    open(path, "rb"), read_across_frames=True, closefd=True
+                ),
+                encoding="utf-8",
+            )
+        else:
+            file = open(path, "r", encoding="utf-8")
+
+        with file:
+            for line in file:
+                if line.strip():
+                    data.append(json.loads(line))
+
+    return data
@@ -1,3 +1,11 @@
 from .mcp import MCPStdio, MCPServer, MCPHttp
+from .mcp_pool import MCPServerPool, get_mcp_pool, set_mcp_pool
 
-__all__ = ["MCPStdio", "MCPServer", "MCPHttp"]
+__all__ = [
+    "MCPStdio",
+    "MCPServer",
+    "MCPHttp",
+    "MCPServerPool",
+    "get_mcp_pool",
+    "set_mcp_pool",
+]
@@ -1,126 +1,297 @@
-from abc import ABC, abstractmethod
+import asyncio
+import base64
+import random
+from abc import ABC
 from contextlib import AsyncExitStack
 
+import anyio
 from termcolor import colored
 
 from pydantic import validate_call
-from mcp import ClientSession, ListToolsResult, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from mcp.client.sse import sse_client
-from typing import Any, Callable, Dict, List
-
-from InlineAgent.types.action_group import FunctionDefination
+from mcp import ClientSession, StdioServerParameters
+from mcp.types import (
+    BlobResourceContents,
+    CallToolResult,
+    EmbeddedResource,
+    ImageContent,
+    TextContent,
+    TextResourceContents,
+    Tool,
+)
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Union
+
+from InlineAgent.types.action_group import FunctionDefination, ToolResult
+from InlineAgent.types.mcp import MCPCallConfig
 from InlineAgent.constants import TraceColor
+from InlineAgent.tools.mcp_pool import (
+    MCPServerPool,
+    Transport,
+    http_server_key,
+    http_transport,
+    is_tool_list_changed,
+    stdio_server_key,
+    stdio_transport,
+)
+
+# Bedrock accepts these image formats in a return of control result
+IMAGE_FORMATS = {
+    "image/png": "png",
+    "image/jpeg": "jpeg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+# Failures of an attempt, not of the tool, which are worth retrying
+RETRYABLE_ERRORS = (
+    TimeoutError,
+    ConnectionError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+)
+
+
+class MCPToolError(RuntimeError):
+    """An MCP tool reported an error in its result."""
+
+
+class MCPTimeoutError(TimeoutError):
+    """Every attempt of an MCP tool call timed out."""
+
+
+def _image(mime_type: str, data: Union[str, bytes]) -> Optional[Dict]:
+    image_format = IMAGE_FORMATS.get(mime_type)
+    if image_format is None:
+        return None
+    return {"format": image_format, "source": {"bytes": base64.b64decode(data)}}
+
+
+def to_tool_result(result: CallToolResult) -> Union[str, ToolResult]:
+    """
+    Convert every content block of an MCP tool result for the agent.
+
+    Text blocks and text resources become the body, images and image blobs
+    become Bedrock images, decoded from base64 once. Other blobs are listed in
+    the body by URI. Results without images stay plain strings.
+    """
+    texts = list()
+    images = list()
+    for content in result.content:
+        if isinstance(content, TextContent):
+            texts.append(content.text)
+        elif isinstance(content, ImageContent):
+            image = _image(content.mimeType, content.data)
+            if image is None:
+                texts.append(f"[image of unsupported type {content.mimeType}]")
+            else:
+                images.append(image)
+        elif isinstance(content, EmbeddedResource):
+            resource = content.resource
+            if isinstance(resource, TextResourceContents):
+                texts.append(resource.text)
+            elif isinstance(resource, BlobResourceContents):
+                image = _image(resource.mimeType, resource.blob)
+                if image is None:
+                    texts.append(f"[resource {resource.uri} ({resource.mimeType})]")
+                else:
+                    images.append(image)
+
+    body = "\n".join(texts)
+    if result.isError:
+        raise MCPToolError(body)
+    if images:
+        return ToolResult(body=body, images=images)
+    return body
 
 
 class MCPServer(ABC):
 
-    @validate_call
-    async def set_available_tools(self, tools_to_use: set) -> List[FunctionDefination]:
+    def _init_state(
+        self,
+        pool: Optional[MCPServerPool] = None,
+        server_key: Optional[str] = None,
+        call_config: Optional[MCPCallConfig] = None,
+        call_overrides: Optional[Dict[str, MCPCallConfig]] = None,
+    ):
+        self.session = None
+        self.exit_stack = AsyncExitStack()
+        self.function_schema = dict()
+        self.callable_tools = dict()
+        self._tools: Optional[List[Tool]] = None
+        self._pool = pool
+        self._server_key = server_key
+        self.call_config = call_config or MCPCallConfig()
+        self.call_overrides = call_overrides or dict()
+
+    async def _connect(self, transport: AsyncContextManager, tools_to_use: set):
+        self.stdio, self.write = await self.exit_stack.enter_async_context(transport)
+        self.session = await self.exit_stack.enter_async_context(
+            ClientSession(self.stdio, self.write, message_handler=self._on_message)
+        )
+
+        await self.session.initialize()
+        await self._load_tools(tools_to_use)
+
+    @classmethod
+    async def from_pool(
+        cls,
+        pool: MCPServerPool,
+        server_key: str,
+        transport: Transport,
+        tools_to_use: set = set(),
+        call_config: Optional[MCPCallConfig] = None,
+        call_overrides: Optional[Dict[str, MCPCallConfig]] = None,
+    ):
+        """Create a client whose tools run on the pool's shared sessions."""
+        self = cls()
+        self._init_state(
+            pool=pool,
+            server_key=pool.add_server(server_key, transport),
+            call_config=call_config,
+            call_overrides=call_overrides,
+        )
+        await pool.warm(self._server_key)
+        await self._load_tools(tools_to_use)
+        return self
+
+    async def _load_tools(self, tools_to_use: set):
+        tools = await self.list_tools()
+        print(
+            colored(
+                f"\nConnected to server with tools:{[tool.name for tool in tools]}",
+                TraceColor.invocation_output,
+            )
+        )
+
+        await self.set_available_tools(tools_to_use=tools_to_use)
+        await self.set_callable_tool(tools_to_use=tools_to_use)
+
+    async def _on_message(self, message):
+        if is_tool_list_changed(message):
+            self._tools = None
+
+    async def list_tools(self) -> List[Tool]:
         """
-        Retrieve a list of available tools from the MCP server.
+        Tools of the MCP server, fetched once and cached until the server
+        reports that its tool list changed.
         """
+        if self._pool is not None:
+            return await self._pool.list_tools(self._server_key)
+
         if not self.session:
             raise RuntimeError("Not connected to MCP server")
 
-        tools: ListToolsResult = await self.session.list_tools()
-        tools_list = tools.tools
-
-        function = {}
-        for tool in tools_list:
-            if len(tools_to_use) != 0:
-                if tool.name in tools_to_use:
-                    function = {
-                        "description": tool.description,
-                        "name": tool.name,
-                        "parameters": {},
-                        "requireConfirmation": "DISABLED",
-                    }
-                    # Process input schema properties
-                    if "properties" in tool.inputSchema:
-
-                        for param_name, param_details in tool.inputSchema[
-                            "properties"
-                        ].items():
-                            function["parameters"][param_name] = {
-                                "description": param_details.get(
-                                    "description", param_name
-                                ),
-                                "type": param_details.get("type", "string"),
-                                "required": param_name
-                                in tool.inputSchema.get("required", []),
-                            }
-
-                        if len(function["parameters"]) > 5:
-
-                            raise ValueError(
-                                f"Tool {tool.name} has more than 5 parameters. This is not supported by Bedrock Agents."
+        if self._tools is None:
+            self._tools = (await self.session.list_tools()).tools
+        return self._tools
+
+    async def _call_tool_once(
+        self, name: str, arguments: Dict[str, Any]
+    ) -> CallToolResult:
+        if self._pool is not None:
+            return await self._pool.call_tool(self._server_key, name, arguments)
+
+        if not self.session:
+            raise RuntimeError("Not connected to MCP server")
+
+        return await self.session.call_tool(name, arguments=arguments)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        """
+        Call a tool under its MCPCallConfig: every attempt is cancelled after
+        the timeout, timeouts and lost connections are retried with jitter.
+        """
+        call_config = self.call_overrides.get(name, self.call_config)
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(
+                    self._call_tool_once(name, arguments),
+                    timeout=call_config.timeout,
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt >= call_config.max_retries:
+                    if isinstance(e, TimeoutError):
+                        raise MCPTimeoutError(
+                            f"MCP tool {name} timed out after {attempt + 1} attempts"
+                            + (
+                                f" of {call_config.timeout} seconds"
+                                if call_config.timeout is not None
+                                else ""
                             )
+                        ) from e
+                    raise
+            await asyncio.sleep(
+                random.uniform(
+                    0,
+                    min(call_config.max_backoff, call_config.backoff * 2**attempt),
+                )
+            )
+            attempt += 1
 
-                    if "functions" not in self.function_schema:
-                        self.function_schema["functions"] = list()
+    async def refresh_tools(self, tools_to_use: set = set()):
+        """Rebuild the function schema and callables, e.g. after the tool list changed."""
+        self.function_schema = dict()
+        self.callable_tools = dict()
+        await self.set_available_tools(tools_to_use=tools_to_use)
+        await self.set_callable_tool(tools_to_use=tools_to_use)
 
-                    self.function_schema["functions"].append(function)
-            else:
-                function = {
-                    "description": tool.description,
-                    "name": tool.name,
-                    "parameters": {},
-                    "requireConfirmation": "DISABLED",
-                }
-                # Process input schema properties
-                if "properties" in tool.inputSchema:
-
-                    for param_name, param_details in tool.inputSchema[
-                        "properties"
-                    ].items():
-                        function["parameters"][param_name] = {
-                            "description": param_details.get("description", param_name),
-                            "type": param_details.get("type", "string"),
-                            "required": param_name
-                            in tool.inputSchema.get("required", []),
-                        }
-
-                    if len(function["parameters"]) > 5:
-
-                        raise ValueError(
-                            f"Tool {tool.name} has more than 5 parameters. This is not supported by Bedrock Agents."
-                        )
-
-                if "functions" not in self.function_schema:
-                    self.function_schema["functions"] = list()
-
-                self.function_schema["functions"].append(function)
+    @validate_call
+    async def set_available_tools(self, tools_to_use: set) -> List[FunctionDefination]:
+        """
+        Retrieve a list of available tools from the MCP server.
+        """
+        for tool in await self.list_tools():
+            if len(tools_to_use) != 0 and tool.name not in tools_to_use:
+                continue
+
+            function = {
+                "description": tool.description,
+                "name": tool.name,
+                "parameters": {},
+                "requireConfirmation": "DISABLED",
+            }
+            # Process input schema properties
+            if "properties" in tool.inputSchema:
+
+                for param_name, param_details in tool.inputSchema["properties"].items():
+                    function["parameters"][param_name] = {
+                        "description": param_details.get("description", param_name),
+                        "type": param_details.get("type", "string"),
+                        "required": param_name in tool.inputSchema.get("required", []),
+                    }
+
+                if len(function["parameters"]) > 5:
+
+                    raise ValueError(
+                        f"Tool {tool.name} has more than 5 parameters. This is not supported by Bedrock Agents."
+                    )
+
+            if "functions" not in self.function_schema:
+                self.function_schema["functions"] = list()
+
+            self.function_schema["functions"].append(function)
 
     @validate_call
     async def set_callable_tool(self, tools_to_use: set) -> Dict[str, Callable]:
         """
         Get callable function
         """
-        if not self.session:
-            raise RuntimeError("Not connected to MCP server")
-
-        tools = await self.session.list_tools()
-        tools_list = tools.tools
 
         # Helper factory function to create a callable with the correct tool name
         def create_callable(tool_name):
             async def callable(*args, **kwargs):
-                response = await self.session.call_tool(
-                    tool_name, arguments=kwargs
-                )
-                return response.content[0].text
+                return to_tool_result(await self.call_tool(tool_name, arguments=kwargs))
+
             return callable
 
-        for tool in tools_list:
-            if len(tools_to_use) != 0:
-                if tool.name in tools_to_use:
-                    self.callable_tools[tool.name] = create_callable(tool.name)
-            else:
-                self.callable_tools[tool.name] = create_callable(tool.name)
+        for tool in await self.list_tools():
+            if len(tools_to_use) != 0 and tool.name not in tools_to_use:
+                continue
+            self.callable_tools[tool.name] = create_callable(tool.name)
 
     async def cleanup(self):
-        """Clean up resources"""
+        """Clean up resources; sessions of a pool are closed by the pool."""
         await self.exit_stack.aclose()
 
 
@@ -130,46 +301,36 @@ class MCPStdio(MCPServer):
     """
 
     @classmethod
-    @validate_call
+    @validate_call(config=dict(arbitrary_types_allowed=True))
     async def create(
-        cls, server_params: StdioServerParameters, tools_to_use: set = set()
+        cls,
+        server_params: StdioServerParameters,
+        tools_to_use: set = set(),
+        pool: Optional[MCPServerPool] = None,
+        call_config: Optional[MCPCallConfig] = None,
+        call_overrides: Optional[Dict[str, MCPCallConfig]] = None,
     ):
-        # Initialize session and client objects
-        self = cls()
-        self.session = None
-        self.exit_stack = AsyncExitStack()
-        self.function_schema = dict()
-        self.callable_tools = dict()
-
-        stdio_transport = await self.exit_stack.enter_async_context(
-            stdio_client(server_params)
-        )
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(
-            ClientSession(self.stdio, self.write)
-        )
-
-        await self.session.initialize()
-
-        # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
-        print(
-            colored(
-                f"\nConnected to server with tools:{[tool.name for tool in tools]}",
-                TraceColor.invocation_output,
+        if pool is not None:
+            return await cls.from_pool(
+                pool=pool,
+                server_key=stdio_server_key(server_params),
+                transport=stdio_transport(server_params),
+                tools_to_use=tools_to_use,
+                call_config=call_config,
+                call_overrides=call_overrides,
             )
-        )
 
-        await self.set_available_tools(tools_to_use=tools_to_use)
-        await self.set_callable_tool(tools_to_use=tools_to_use)
+        # Initialize session and client objects
+        self = cls()
+        self._init_state(call_config=call_config, call_overrides=call_overrides)
+        await self._connect(stdio_transport(server_params)(), tools_to_use)
 
         return self
 
 
 class MCPHttp(MCPServer):
     @classmethod
-    @validate_call
+    @validate_call(config=dict(arbitrary_types_allowed=True))
     async def create(
         cls,
         url: str,
@@ -177,41 +338,29 @@ class MCPHttp(MCPServer):
         timeout: float = 5,
         sse_read_timeout: float = 60 * 5,
         tools_to_use: set = set(),
+        pool: Optional[MCPServerPool] = None,
+        call_config: Optional[MCPCallConfig] = None,
+        call_overrides: Optional[Dict[str, MCPCallConfig]] = None,
     ):
-
-        # Initialize session and client objects
-        self = cls()
-        self.session = None
-        self.exit_stack = AsyncExitStack()
-        self.function_schema = dict()
-        self.callable_tools = dict()
-
-        stdio_transport = await self.exit_stack.enter_async_context(
-            sse_client(
-                url=url,
-                headers=headers,
-                timeout=timeout,
-                sse_read_timeout=sse_read_timeout,
-            )
-        )
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(
-            ClientSession(self.stdio, self.write)
+        transport = http_transport(
+            url=url,
+            headers=headers,
+            timeout=timeout,
+            sse_read_timeout=sse_read_timeout,
         )
-
-        await self.session.initialize()
-
-        # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
-        print(
-            colored(
-                f"\nConnected to server with tools:{[tool.name for tool in tools]}",
-                TraceColor.invocation_output,
+        if pool is not None:
+            return await cls.from_pool(
+                pool=pool,
+                server_key=http_server_key(url, headers),
+                transport=transport,
+                tools_to_use=tools_to_use,
+                call_config=call_config,
+                call_overrides=call_overrides,
             )
-        )
 
-        await self.set_available_tools(tools_to_use=tools_to_use)
-        await self.set_callable_tool(tools_to_use=tools_to_use)
+        # Initialize session and client objects
+        self = cls()
+        self._init_state(call_config=call_config, call_overrides=call_overrides)
+        await self._connect(transport(), tools_to_use)
 
         return self
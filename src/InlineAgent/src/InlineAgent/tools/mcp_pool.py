@@ -0,0 +1,230 @@
+"""
+Pool of warm MCP client sessions shared by every agent in a process.
+
+Starting a stdio MCP server means spawning a process and running the MCP
+handshake, so agents that each create their own ``MCPStdio`` pay that cost
+once per agent. A ``MCPServerPool`` keeps up to ``max_sessions`` open sessions
+per server definition and sends every ``call_tool`` to the least busy one; MCP
+sessions multiplex concurrent requests, so a new session is only opened when
+all existing ones are busy. ``list_tools`` runs once per session and is cached
+until the server sends ``notifications/tools/list_changed``.
+"""
+
+import asyncio
+import json
+from contextlib import AsyncExitStack
+from threading import Lock
+from typing import (
+    Any,
+    AsyncContextManager,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.types import (
+    CallToolResult,
+    ServerNotification,
+    Tool,
+    ToolListChangedNotification,
+)
+
+# A zero argument callable returning a context manager that yields (read, write)
+Transport = Callable[[], AsyncContextManager[Tuple[Any, Any]]]
+
+MAX_SESSIONS_PER_SERVER = 4
+
+
+def is_tool_list_changed(message: Any) -> bool:
+    """True for a ``notifications/tools/list_changed`` message from a server."""
+    return isinstance(message, ServerNotification) and isinstance(
+        message.root, ToolListChangedNotification
+    )
+
+
+def stdio_server_key(server_params: StdioServerParameters) -> str:
+    return "stdio:" + server_params.model_dump_json()
+
+
+def http_server_key(url: str, headers: Optional[Dict[str, Any]] = None) -> str:
+    return "sse:" + json.dumps([url, headers or {}], sort_keys=True, default=str)
+
+
+def stdio_transport(server_params: StdioServerParameters) -> Transport:
+    return lambda: stdio_client(server_params)
+
+
+def http_transport(
+    url: str,
+    headers: Optional[Dict[str, Any]] = None,
+    timeout: float = 5,
+    sse_read_timeout: float = 60 * 5,
+) -> Transport:
+    return lambda: sse_client(
+        url=url, headers=headers, timeout=timeout, sse_read_timeout=sse_read_timeout
+    )
+
+
+class PooledSession:
+    """
+    One MCP client session, owned by a background task.
+
+    The transport and session context managers are entered and exited by the
+    same task, as anyio requires, so a pooled session can be used and closed
+    from any task of the event loop.
+    """
+
+    def __init__(self, transport: Transport):
+        self._transport = transport
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self._tools: Optional[List[Tool]] = None
+        self._tools_lock = asyncio.Lock()
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.closed = False
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self):
+        try:
+            async with AsyncExitStack() as exit_stack:
+                read, write = await exit_stack.enter_async_context(self._transport())
+                self.session = await exit_stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self._on_message)
+                )
+                await self.session.initialize()
+                self._ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.closed = True
+            self._ready.set()
+
+    async def _on_message(self, message):
+        if is_tool_list_changed(message):
+            self._tools = None
+
+    async def list_tools(self) -> List[Tool]:
+        async with self._tools_lock:
+            if self._tools is None:
+                self._tools = (await self.session.list_tools()).tools
+            return self._tools
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        return await self.session.call_tool(name, arguments=arguments)
+
+    async def close(self):
+        self._closing.set()
+        if self._task is not None:
+            await self._task
+
+
+class MCPServerPool:
+    """Warm MCP sessions keyed by server definition, see the module docstring."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS_PER_SERVER):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.max_sessions = max_sessions
+        self._transports: Dict[str, Transport] = dict()
+        self._sessions: Dict[str, List[PooledSession]] = dict()
+        self._locks: Dict[str, asyncio.Lock] = dict()
+
+    def add_server(self, server_key: str, transport: Transport) -> str:
+        """Register how to connect to a server; the first registration wins."""
+        self._transports.setdefault(server_key, transport)
+        self._sessions.setdefault(server_key, list())
+        self._locks.setdefault(server_key, asyncio.Lock())
+        return server_key
+
+    def sessions(self, server_key: str) -> List[PooledSession]:
+        return [
+            session
+            for session in self._sessions.get(server_key, [])
+            if not session.closed
+        ]
+
+    async def _acquire(self, server_key: str) -> PooledSession:
+        if server_key not in self._transports:
+            raise KeyError(f"MCP server {server_key} is not registered with the pool")
+
+        async with self._locks[server_key]:
+            sessions = self.sessions(server_key)
+            session = min(sessions, key=lambda s: s.in_flight, default=None)
+            if session is None or (
+                session.in_flight and len(sessions) < self.max_sessions
+            ):
+                session = PooledSession(self._transports[server_key])
+                await session.start()
+                sessions.append(session)
+            self._sessions[server_key] = sessions
+            session.in_flight += 1
+            return session
+
+    async def warm(self, server_key: str) -> None:
+        """Open the first session of a server if none is open yet."""
+        session = await self._acquire(server_key)
+        session.in_flight -= 1
+
+    async def list_tools(self, server_key: str) -> List[Tool]:
+        session = await self._acquire(server_key)
+        try:
+            return await session.list_tools()
+        finally:
+            session.in_flight -= 1
+
+    async def call_tool(
+        self, server_key: str, name: str, arguments: Dict[str, Any]
+    ) -> CallToolResult:
+        session = await self._acquire(server_key)
+        try:
+            return await session.call_tool(name, arguments)
+        finally:
+            session.in_flight -= 1
+
+    async def close(self) -> None:
+        """Close every session; the pool can be reused afterwards."""
+        sessions = [s for server in self._sessions.values() for s in server]
+        for server_key in self._sessions:
+            self._sessions[server_key] = list()
+        await asyncio.gather(*[session.close() for session in sessions])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+_mcp_pool: Optional[MCPServerPool] = None
+_mcp_pool_lock = Lock()
+
+
+def get_mcp_pool() -> MCPServerPool:
+    """Return the process wide MCPServerPool."""
+    global _mcp_pool
+    if _mcp_pool is None:
+        with _mcp_pool_lock:
+            if _mcp_pool is None:
+                _mcp_pool = MCPServerPool()
+    return _mcp_pool
+
+
+def set_mcp_pool(pool: MCPServerPool) -> None:
+    """Replace the process wide MCPServerPool."""
+    global _mcp_pool
+    with _mcp_pool_lock:
+        _mcp_pool = pool
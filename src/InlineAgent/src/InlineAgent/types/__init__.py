@@ -1,9 +1,18 @@
-from .action_group import Executor, Parameter, FunctionDefination, APISchema, S3
+from .action_group import (
+    Executor,
+    Parameter,
+    FunctionDefination,
+    APISchema,
+    S3,
+    ToolConfig,
+    ToolExecutor,
+    ToolResult,
+)
 from .inline_agent import (
     InlineCollaboratorAgentConfig,
     InlineCollaboratorConfigurations,
 )
-from .mcp import MCPConfig
+from .mcp import MCPCallConfig, MCPConfig
 
 __all__ = [
     "Executor",
@@ -12,6 +21,10 @@ __all__ = [
     "APISchema",
     "InlineCollaboratorAgentConfig",
     "InlineCollaboratorConfigurations",
+    "MCPCallConfig",
     "MCPConfig",
     "S3",
+    "ToolConfig",
+    "ToolExecutor",
+    "ToolResult",
 ]
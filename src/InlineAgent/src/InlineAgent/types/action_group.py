@@ -1,6 +1,6 @@
 from enum import Enum
-from typing import Dict, Literal, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
 
 
 class Executor(Enum):
@@ -9,6 +9,45 @@ class Executor(Enum):
     INBUILT_TOOL = "INBUILT_TOOL"
 
 
+class ToolExecutor(Enum):
+    THREAD = "THREAD"
+    PROCESS = "PROCESS"
+
+
+class ToolConfig(BaseModel):
+    """How a return of control tool is run.
+
+    Coroutine tools always run on the event loop. Synchronous tools run on a
+    thread pool (I/O bound work) or on a process pool (CPU bound work, the
+    tool must be picklable). A tool that exceeds ``timeout`` seconds is
+    reported back to the agent with ``responseState: FAILURE``.
+    """
+
+    class Config:
+        extra = "forbid"
+
+    executor: ToolExecutor = ToolExecutor.THREAD
+    timeout: Optional[float] = None
+
+
+class ToolResult(BaseModel):
+    """Result of a return of control tool carrying images besides text.
+
+    ``images`` holds Bedrock ``ImageInput`` dicts, e.g.
+    ``{"format": "png", "source": {"bytes": b"..."}}``; the bytes are passed
+    to the agent as they are, without being encoded into the text body.
+    """
+
+    body: str = ""
+    images: List[Dict[str, Any]] = Field(default_factory=list)
+
+    def content_body(self) -> Dict:
+        content_body = {"body": self.body}
+        if self.images:
+            content_body["images"] = self.images
+        return content_body
+
+
 class Parameter(BaseModel):
     class Config:
         extra = "forbid"
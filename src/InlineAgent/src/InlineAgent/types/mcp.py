@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 from pathlib import Path
 
@@ -20,3 +20,21 @@ class MCPConfig(BaseModel):
 
     If not specified, the result of get_default_environment() will be used.
     """
+
+
+class MCPCallConfig(BaseModel):
+    """How a tool of an MCP server is called.
+
+    Each attempt is cancelled after ``timeout`` seconds. Attempts that time
+    out or lose their connection are retried up to ``max_retries`` times,
+    after a random delay of up to ``backoff * 2 ** attempt`` seconds, capped
+    at ``max_backoff``. Errors reported by the tool itself are not retried.
+    """
+
+    class Config:
+        extra = "forbid"
+
+    timeout: Optional[float] = None
+    max_retries: int = 0
+    backoff: float = 0.5
+    max_backoff: float = 10.0
@@ -1,5 +1,6 @@
 from typing import Any, Dict, Literal
 import unittest
+from unittest import mock
 
 from InlineAgent.action_group import ActionGroupBuilder
 
@@ -286,3 +287,39 @@ class TestActionGroupBuilder(unittest.TestCase):
         self.assertEqual(
             ActionGroupBuilder.create_function_schema(spider_run), spider_run_schema
         )
+
+    def test_create_function_schema_is_memoized(self):
+        def tool(city: str):
+            """Get the weather.
+
+            Parameters:
+                city: Name of the city
+            """
+
+        with mock.patch.object(
+            ActionGroupBuilder,
+            "build_function_schema",
+            wraps=ActionGroupBuilder.build_function_schema,
+        ) as build:
+            first = ActionGroupBuilder.create_function_schema(tool)
+            first["parameters"]["city"]["description"] = "changed"
+            second = ActionGroupBuilder.create_function_schema(tool)
+
+            self.assertEqual(build.call_count, 1)
+            self.assertEqual(
+                second["parameters"]["city"]["description"], "Name of the city"
+            )
+
+            def other(country: str):
+                """Get the weather.
+
+                Parameters:
+                    country: Name of the country
+                """
+
+            tool.__code__ = other.__code__
+            tool.__doc__ = other.__doc__
+            third = ActionGroupBuilder.create_function_schema(tool)
+
+        self.assertEqual(build.call_count, 2)
+        self.assertEqual(list(third["parameters"]), ["country"])
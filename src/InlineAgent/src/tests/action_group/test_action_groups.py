@@ -8,6 +8,7 @@ from requests import patch
 from InlineAgent.action_group import ActionGroups, ActionGroup
 from InlineAgent.constants import USER_INPUT_ACTION_GROUP_NAME
 from InlineAgent.tools.mcp import MCPStdio
+from InlineAgent.types import ToolConfig, ToolExecutor
 
 
 def get_current_weather(location: str, state: str, unit: str = "fahrenheit") -> dict:
@@ -632,3 +633,34 @@ class TestActionGroup(unittest.TestCase):
                 get_lat_long.__name__: get_lat_long,
             },
         )
+
+    def test_tool_config_map(self):
+        roc_weather_action_group = ActionGroup(
+            name="WeatherActionGroup",
+            tools=[get_current_weather, get_lat_long],
+            argument_key="Args:",
+            tool_config=ToolConfig(timeout=5),
+            tool_overrides={
+                "get_lat_long": ToolConfig(executor=ToolExecutor.PROCESS, timeout=1)
+            },
+            test=True,
+        )
+        search_action_group = ActionGroup(
+            name="SearchActionGroup",
+            tools=[web_search],
+            argument_key="Args:",
+            test=True,
+        )
+
+        action_groups = ActionGroups(
+            action_groups=[roc_weather_action_group, search_action_group]
+        )
+
+        self.assertEqual(
+            action_groups.tool_config_map,
+            {
+                "get_current_weather": ToolConfig(timeout=5),
+                "get_lat_long": ToolConfig(executor=ToolExecutor.PROCESS, timeout=1),
+                "web_search": ToolConfig(),
+            },
+        )
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from InlineAgent.agent import AnswerBuffer, InlineAgent
+from InlineAgent.observability import AgentEventType, QueueEventSink
+
+ANSWER = "Größe: 42 🚀 done"
+
+
+def chunked(data: bytes, size: int):
+    return [data[idx : idx + size] for idx in range(0, len(data), size)]
+
+
+def mock_response(chunks):
+    return {
+        "completion": iter([{"chunk": {"bytes": chunk}} for chunk in chunks]),
+        "ResponseMetadata": {"RequestId": "MOCK", "RetryAttempts": 0},
+    }
+
+
+class BlockingCompletion:
+    """Yields one chunk, then blocks like a socket read until closed."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield {"chunk": {"bytes": b"first"}}
+        self.closed.wait(5)
+
+    def close(self):
+        self.closed.set()
+
+
+class TestAnswerBuffer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_multibyte_characters_split_across_chunks(self):
+        answer = AnswerBuffer()
+        deltas = [answer.write(chunk) for chunk in chunked(ANSWER.encode(), 1)]
+        answer.close()
+
+        self.assertEqual(answer.text, ANSWER)
+        self.assertEqual("".join(deltas), ANSWER)
+        # Incomplete characters produce no delta until their last byte arrives
+        self.assertIn("", deltas)
+        self.assertIn("🚀", deltas)
+
+    async def test_iterates_deltas_until_closed(self):
+        answer = AnswerBuffer()
+
+        async def produce():
+            for chunk in chunked(ANSWER.encode(), 3):
+                answer.write(chunk)
+                await asyncio.sleep(0)
+            answer.close()
+
+        producer = asyncio.create_task(produce())
+        deltas = [delta async for delta in answer]
+        await producer
+
+        self.assertEqual("".join(deltas), ANSWER)
+        self.assertNotIn("", deltas)
+
+    async def test_truncated_character_is_replaced_on_close(self):
+        answer = AnswerBuffer()
+        answer.write("ok ".encode() + "🚀".encode()[:2])
+        answer.close()
+        answer.close()
+
+        self.assertEqual(answer.text, "ok �")
+
+
+class TestInlineAgentStream(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.agent = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a friendly assistant.",
+            agent_name="MockAgent",
+        )
+        self.client = mock.MagicMock()
+        self.client.invoke_inline_agent.return_value = mock_response(
+            chunked(ANSWER.encode(), 5)
+        )
+        patcher = mock.patch(
+            "InlineAgent.agent.inline_agent.get_client", return_value=self.client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_invoke_returns_decoded_answer(self):
+        self.agent.event_sink = QueueEventSink()
+        answer = await self.agent.invoke(input_text="Hi", session_id="MOCK")
+
+        self.assertEqual(answer, ANSWER)
+        # Each delta is emitted once, instead of the whole answer per chunk
+        events = list(self.agent.event_sink.queue.queue)
+        deltas = [
+            event.message for event in events if event.type == AgentEventType.ANSWER
+        ]
+        self.assertEqual("".join(deltas), ANSWER)
+
+    async def test_stream_yields_deltas(self):
+        with mock.patch("builtins.print"):
+            deltas = [
+                delta
+                async for delta in self.agent.stream(input_text="Hi", session_id="MOCK")
+            ]
+
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual("".join(deltas), ANSWER)
+
+    async def test_stream_raises_invoke_errors(self):
+        self.client.invoke_inline_agent.side_effect = RuntimeError("boom")
+
+        with mock.patch("builtins.print"), self.assertRaises(RuntimeError):
+            async for _ in self.agent.stream(input_text="Hi", session_id="MOCK"):
+                pass
+
+    async def test_cancelled_stream_is_closed(self):
+        completion = BlockingCompletion()
+        self.client.invoke_inline_agent.return_value = {
+            "completion": completion,
+            "ResponseMetadata": {"RequestId": "MOCK", "RetryAttempts": 0},
+        }
+
+        with mock.patch("builtins.print"):
+            stream = self.agent.stream(input_text="Hi", session_id="MOCK")
+            self.assertEqual(await anext(stream), "first")
+            await stream.aclose()
+
+        # The cancelled invocation closes the stream, which releases the
+        # worker blocked in next()
+        for _ in range(100):
+            if completion.closed.is_set():
+                break
+            await asyncio.sleep(0.01)
+        self.assertTrue(completion.closed.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from InlineAgent.agent import BatchRequest, InlineAgent, run_batch, stream_batch
+from InlineAgent.agent.batch import (
+    AdaptiveBackoff,
+    TokenBucket,
+    get_model_backoff,
+    is_throttling_error,
+)
+
+THROTTLING = ClientError(
+    {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+    "InvokeInlineAgent",
+)
+
+ORCHESTRATION_TRACE = {
+    "trace": {
+        "trace": {
+            "orchestrationTrace": {
+                "modelInvocationOutput": {
+                    "metadata": {"usage": {"inputTokens": 12, "outputTokens": 3}}
+                }
+            }
+        }
+    }
+}
+
+
+def response(text):
+    return {
+        "completion": iter([ORCHESTRATION_TRACE, {"chunk": {"bytes": text.encode()}}]),
+        "ResponseMetadata": {"RequestId": "MOCK", "RetryAttempts": 0},
+    }
+
+
+class TestBatch(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.agent = InlineAgent(
+            foundation_model="MOCK_BATCH_ID",
+            instruction="You are a friendly assistant.",
+            agent_name="MockAgent",
+        )
+        self.client = mock.MagicMock()
+        patcher = mock.patch(
+            "InlineAgent.agent.inline_agent.get_client", return_value=self.client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backoff = get_model_backoff(self.agent.foundation_model)
+        backoff.delay = 0.0
+        backoff.initial = 0.01
+
+    async def test_results_in_input_order_with_usage(self):
+        self.client.invoke_inline_agent.side_effect = lambda **params: response(
+            params["inputText"].upper()
+        )
+
+        results = await self.agent.run_batch(
+            ["a", ("b", "session-b"), BatchRequest(input_text="c")], concurrency=2
+        )
+
+        self.assertEqual([result.output for result in results], ["A", "B", "C"])
+        self.assertEqual(results[1].session_id, "session-b")
+        self.assertEqual(len({result.session_id for result in results}), 3)
+        self.assertEqual(results[0].input_tokens, 12)
+        self.assertEqual(results[0].output_tokens, 3)
+        self.assertEqual(results[0].llm_calls, 1)
+        self.assertEqual(results[0].attempts, 1)
+
+    async def test_throttled_requests_are_retried(self):
+        self.client.invoke_inline_agent.side_effect = [
+            THROTTLING,
+            THROTTLING,
+            response("Done"),
+        ]
+
+        (result,) = await run_batch(self.agent, ["Hi"])
+
+        self.assertEqual(result.output, "Done")
+        self.assertIsNone(result.error)
+        self.assertEqual(result.attempts, 3)
+
+    async def test_errors_are_reported(self):
+        self.client.invoke_inline_agent.side_effect = [THROTTLING, THROTTLING]
+
+        (result,) = await run_batch(self.agent, ["Hi"], max_retries=1)
+
+        self.assertEqual(result.attempts, 2)
+        self.assertIn("ThrottlingException", result.error)
+
+    async def test_concurrency_is_bounded(self):
+        running = 0
+        peak = 0
+
+        async def invoke(**kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return kwargs["input_text"]
+
+        with mock.patch.object(self.agent, "invoke", side_effect=invoke):
+            results = await run_batch(self.agent, map(str, range(10)), concurrency=3)
+
+        self.assertEqual(peak, 3)
+        self.assertEqual(
+            [result.output for result in results], list(map(str, range(10)))
+        )
+
+    async def test_results_are_written_as_they_complete(self):
+        self.client.invoke_inline_agent.side_effect = lambda **params: response("ok")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "results.jsonl")
+
+        async for result in stream_batch(self.agent, ["a", "b"], output_path=path):
+            with open(path) as f:
+                written = [json.loads(line) for line in f]
+            self.assertEqual(written[-1]["index"], result.index)
+
+        self.assertEqual(len(written), 2)
+        self.assertEqual(written[0]["output"], "ok")
+
+
+class TestRateLimiting(unittest.IsolatedAsyncioTestCase):
+
+    async def test_token_bucket_paces_acquisitions(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+
+        # The first token is available immediately, the other four take 20ms each
+        self.assertGreaterEqual(time.monotonic() - start, 0.07)
+
+    def test_adaptive_backoff(self):
+        backoff = AdaptiveBackoff(initial=1.0, maximum=3.0)
+
+        backoff.on_throttle()
+        backoff.on_throttle()
+        self.assertEqual(backoff.delay, 2.0)
+        backoff.on_throttle()
+        self.assertEqual(backoff.delay, 3.0)
+        backoff.on_success()
+        self.assertEqual(backoff.delay, 1.5)
+        for _ in range(4):
+            backoff.on_success()
+        self.assertEqual(backoff.delay, 0.0)
+
+    def test_is_throttling_error(self):
+        self.assertTrue(is_throttling_error(THROTTLING))
+        self.assertTrue(
+            is_throttling_error(Exception("Unexpected exception: ", THROTTLING))
+        )
+        self.assertFalse(is_throttling_error(ValueError("bad input")))
+
+
+if __name__ == "__main__":
+    unittest.main()
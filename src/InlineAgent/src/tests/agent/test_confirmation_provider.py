@@ -0,0 +1,184 @@
+import asyncio
+import json
+import threading
+import unittest
+import urllib.error
+from unittest import mock
+
+from InlineAgent.agent import (
+    AutoApproveConfirmationProvider,
+    ConfirmationProvider,
+    ConfirmationRequest,
+    ConsoleConfirmationProvider,
+    ProcessROC,
+    QueueConfirmationProvider,
+    WebhookConfirmationProvider,
+    require_confirmation,
+)
+
+
+@require_confirmation
+def transfer_money(amount: int) -> str:
+    return f"Transferred {amount}"
+
+
+def roc_event(function="transfer_money"):
+    return {
+        "invocationInputs": [
+            {
+                "functionInvocationInput": {
+                    "actionGroup": "Bank",
+                    "parameters": [{"name": "amount", "type": "integer", "value": "5"}],
+                    "function": function,
+                    "actionInvocationType": "USER_CONFIRMATION_AND_RESULT",
+                    "agentId": "INLINE_AGENT",
+                }
+            }
+        ],
+        "invocationId": "MOCK",
+    }
+
+
+async def process(provider, session_id="session"):
+    with mock.patch("builtins.print"):
+        session_state = await ProcessROC.process_roc(
+            inlineSessionState=dict(),
+            roc_event=roc_event(),
+            tool_map={"transfer_money": transfer_money},
+            confirmation_provider=provider,
+            session_id=session_id,
+        )
+    return session_state["returnControlInvocationResults"][0]["functionResult"]
+
+
+class TestConfirmationProviders(unittest.IsolatedAsyncioTestCase):
+
+    async def test_pending_confirmation_only_suspends_its_session(self):
+        provider = QueueConfirmationProvider()
+        waiting = asyncio.create_task(process(provider, session_id="waiting"))
+        await asyncio.sleep(0.01)
+
+        # Another session completes while the first one waits for its answer
+        other = await process(AutoApproveConfirmationProvider(), session_id="other")
+        self.assertEqual(other["confirmationState"], "CONFIRM")
+        self.assertFalse(waiting.done())
+
+        request = provider.requests.get_nowait()
+        self.assertEqual(request.session_id, "waiting")
+        self.assertEqual(request.parameters, {"amount": 5})
+        # Answered from another thread, like a web handler would
+        thread = threading.Thread(target=provider.resolve, args=(request.id, True))
+        thread.start()
+        thread.join()
+
+        result = await waiting
+        self.assertEqual(result["confirmationState"], "CONFIRM")
+        self.assertEqual(result["responseBody"]["TEXT"]["body"], "Transferred 5")
+        self.assertEqual(provider.pending, [])
+
+    async def test_unanswered_confirmation_is_denied(self):
+        result = await process(QueueConfirmationProvider(timeout=0.05))
+
+        self.assertEqual(result["confirmationState"], "DENY")
+        self.assertIn(
+            "No confirmation received", result["responseBody"]["TEXT"]["body"]
+        )
+
+    async def test_auto_approve_policy(self):
+        async def policy(request: ConfirmationRequest) -> bool:
+            return request.parameters["amount"] < 5
+
+        result = await process(AutoApproveConfirmationProvider(policy=policy))
+
+        self.assertEqual(result["confirmationState"], "DENY")
+
+    async def test_console_asks_off_the_event_loop(self):
+        loop_thread = threading.current_thread()
+
+        def answer(prompt):
+            self.assertIsNot(threading.current_thread(), loop_thread)
+            self.assertIn("transfer_money", prompt)
+            return "y"
+
+        with mock.patch("builtins.input", side_effect=answer):
+            result = await process(ConsoleConfirmationProvider())
+
+        self.assertEqual(result["confirmationState"], "CONFIRM")
+
+    async def test_console_drops_answer_to_expired_request(self):
+        provider = ConsoleConfirmationProvider(timeout=0.05)
+        answer_late = threading.Event()
+        prompts = []
+
+        def answer(prompt):
+            prompts.append((prompt, threading.current_thread().name))
+            if len(prompts) == 1:
+                answer_late.wait(5)
+                return "y"
+            return "n"
+
+        with mock.patch("builtins.input", side_effect=answer):
+            expired = await process(provider)
+            self.assertEqual(expired["confirmationState"], "DENY")
+
+            # The late "y" typed for the expired prompt must not approve this one
+            provider.timeout = None
+            with mock.patch("builtins.print") as print_:
+                waiting = asyncio.create_task(
+                    provider.confirm(
+                        ConfirmationRequest(
+                            function="close_account",
+                            action_group="Bank",
+                            parameters={},
+                        )
+                    )
+                )
+                while not provider._waiting:
+                    await asyncio.sleep(0.01)
+                answer_late.set()
+                approved = await waiting
+
+        self.assertFalse(approved)
+        print_.assert_any_call("That confirmation request has expired, answer ignored.")
+        self.assertIn("close_account", prompts[1][0])
+        # stdin is read by the provider's own thread, not a shared pool worker
+        self.assertEqual({name for _, name in prompts}, {"InlineAgent-confirmation"})
+
+    async def test_webhook_posts_request(self):
+        provider = WebhookConfirmationProvider(url="https://example.com/confirm")
+
+        with mock.patch("urllib.request.urlopen") as urlopen:
+            waiting = asyncio.create_task(process(provider))
+            while not provider.pending:
+                await asyncio.sleep(0.01)
+            provider.resolve(provider.pending[0], False)
+            result = await waiting
+
+        http_request = urlopen.call_args.args[0]
+        self.assertEqual(http_request.full_url, "https://example.com/confirm")
+        self.assertEqual(json.loads(http_request.data)["function"], "transfer_money")
+        self.assertEqual(result["confirmationState"], "DENY")
+
+    async def test_webhook_failure_is_denied(self):
+        provider = WebhookConfirmationProvider(url="https://example.com/confirm")
+
+        with mock.patch(
+            "urllib.request.urlopen",
+            side_effect=urllib.error.URLError("connection refused"),
+        ):
+            result = await process(provider)
+
+        self.assertEqual(result["confirmationState"], "DENY")
+        self.assertIn("could not be sent", result["responseBody"]["TEXT"]["body"])
+        self.assertEqual(provider.pending, [])
+
+    def test_provider_must_implement_confirm(self):
+        class NoConfirm(ConfirmationProvider):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoConfirm()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from InlineAgent.agent import AsyncEventStream
+from InlineAgent.agent.event_stream import run_blocking
+
+
+def slow_event_stream(events, delay):
+    for event in events:
+        time.sleep(delay)
+        yield event
+
+
+class TestAsyncEventStream(unittest.IsolatedAsyncioTestCase):
+
+    async def test_yields_all_events_in_order(self):
+        events = [{"chunk": {"bytes": str(i).encode()}} for i in range(5)]
+
+        received = [event async for event in AsyncEventStream(iter(events))]
+
+        self.assertEqual(received, events)
+
+    async def test_empty_stream(self):
+        received = [event async for event in AsyncEventStream([])]
+
+        self.assertEqual(received, [])
+
+    async def test_does_not_block_event_loop(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        stream = AsyncEventStream(slow_event_stream([{"a": 1}, {"b": 2}], 0.1))
+        received = [event async for event in stream]
+        ticker_task.cancel()
+
+        self.assertEqual(received, [{"a": 1}, {"b": 2}])
+        self.assertGreater(ticks, 5)
+
+    async def test_concurrent_streams_overlap(self):
+        executor = ThreadPoolExecutor(max_workers=8)
+
+        async def consume():
+            stream = AsyncEventStream(
+                slow_event_stream(range(3), 0.1), executor=executor
+            )
+            return [event async for event in stream]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[consume() for _ in range(8)])
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+
+        self.assertEqual(results, [[0, 1, 2]] * 8)
+        self.assertLess(elapsed, 1.5)
+
+    async def test_run_blocking_passes_kwargs(self):
+        def invoke(**kwargs):
+            return kwargs
+
+        response = await run_blocking(invoke, sessionId="MOCK", inputText="hi")
+
+        self.assertEqual(response, {"sessionId": "MOCK", "inputText": "hi"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import json
 import unittest
+from unittest import mock
 from InlineAgent.action_group import ActionGroup
 from InlineAgent.agent.confirmation import require_confirmation
-from InlineAgent.agent import InlineAgent
+from InlineAgent.agent import CollaboratorAgent, InlineAgent
 
 
 @require_confirmation
@@ -584,6 +585,80 @@ class TestInlineAgent(unittest.TestCase):
 
         self.assertEqual(agent.action_groups, data_test___init___8)
 
+    def test_invoke_params_cached(self):
+        agent = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a friendly assistant.",
+            user_input=True,
+            agent_name="MockAgent",
+        )
+
+        with mock.patch.object(
+            agent, "_build_invoke_params", wraps=agent._build_invoke_params
+        ) as build:
+            first = agent.get_invoke_params()
+            second = agent.get_invoke_params()
+
+            self.assertEqual(build.call_count, 1)
+            self.assertEqual(first, second)
+            self.assertIs(first["actionGroups"], second["actionGroups"])
+
+            agent.instruction = "You are a grumpy assistant."
+            third = agent.get_invoke_params()
+
+            self.assertEqual(build.call_count, 2)
+            self.assertEqual(third["instruction"], "You are a grumpy assistant.")
+
+            agent.guardrail_configuration["guardrailIdentifier"] = "MOCK"
+            agent.invalidate_invoke_params()
+            fourth = agent.get_invoke_params()
+
+            self.assertEqual(build.call_count, 3)
+            self.assertEqual(
+                fourth["guardrailConfiguration"], {"guardrailIdentifier": "MOCK"}
+            )
+
+    def test_invoke_params_cached_supervisor(self):
+        collaborator = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a collaborator.",
+            agent_name="MockCollaborator",
+        )
+        remote_collaborator = CollaboratorAgent(
+            agent_name="MockRemote",
+            agent_alias_id="MOCKALIAS",
+            routing_instruction="Route here",
+        )
+        supervisor = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a supervisor.",
+            agent_name="MockSupervisor",
+            agent_collaboration="SUPERVISOR",
+            collaborators=[collaborator, remote_collaborator],
+        )
+
+        with mock.patch.object(
+            CollaboratorAgent,
+            "to_dict",
+            return_value={"collaboratorName": "MockRemote"},
+        ) as to_dict:
+            first = supervisor.get_invoke_params()
+            supervisor.get_invoke_params()
+
+            self.assertEqual(to_dict.call_count, 1)
+            self.assertEqual(
+                first["collaborators"][0]["instruction"], "You are a collaborator."
+            )
+
+            collaborator.instruction = "You are an updated collaborator."
+            updated = supervisor.get_invoke_params()
+
+            self.assertEqual(to_dict.call_count, 2)
+            self.assertEqual(
+                updated["collaborators"][0]["instruction"],
+                "You are an updated collaborator.",
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
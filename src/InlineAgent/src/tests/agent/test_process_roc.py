@@ -1,10 +1,12 @@
 import copy
 import json
+import time
 import unittest
 from unittest import mock
 import asyncio
 from InlineAgent.agent import ProcessROC
 from InlineAgent.agent.confirmation import require_confirmation
+from InlineAgent.types import ToolConfig, ToolExecutor
 
 
 def get_current_weather(location: str, state: str, unit: str = "fahrenheit") -> dict:
@@ -320,6 +322,61 @@ output_invoke_roc_function_without_confirm = {
 }
 
 
+async def slow_async_tool(name: str, delay: str):
+    """Sleep asynchronously and echo the name.
+
+    Args:
+        name: Name to echo
+        delay: Seconds to sleep
+    """
+    await asyncio.sleep(float(delay))
+    return name
+
+
+def slow_sync_tool(name: str, delay: str):
+    """Sleep in a blocking way and echo the name.
+
+    Args:
+        name: Name to echo
+        delay: Seconds to sleep
+    """
+    time.sleep(float(delay))
+    return name
+
+
+def count_primes(limit: str):
+    """Count primes below a limit.
+
+    Args:
+        limit: Upper bound
+    """
+    limit = int(limit)
+    return str(
+        sum(all(n % d for d in range(2, int(n**0.5) + 1)) for n in range(2, limit))
+    )
+
+
+def slow_tool_event(function: str, delays: list):
+    return {
+        "invocationInputs": [
+            {
+                "functionInvocationInput": {
+                    "actionGroup": "SlowActionGroup",
+                    "parameters": [
+                        {"name": "name", "type": "string", "value": f"call-{idx}"},
+                        {"name": "delay", "type": "string", "value": str(delay)},
+                    ],
+                    "function": function,
+                    "actionInvocationType": "RESULT",
+                    "agentId": "INLINE_AGENT",
+                }
+            }
+            for idx, delay in enumerate(delays)
+        ],
+        "invocationId": "MOCKID",
+    }
+
+
 class TestProcessROC(unittest.IsolatedAsyncioTestCase):
     maxDiff = None
 
@@ -469,6 +526,81 @@ class TestProcessROC(unittest.IsolatedAsyncioTestCase):
         )
         self.assertEqual(functionResult, output_invoke_roc_function_without_confirm)
 
+    async def test_parallel_async_tools(self):
+        tools = {"slow_async_tool": slow_async_tool}
+        roc_event = slow_tool_event("slow_async_tool", [0.3, 0.1, 0.2])
+
+        start = time.perf_counter()
+        with mock.patch("builtins.print"):
+            session_state_output = await ProcessROC.process_roc(
+                inlineSessionState=dict(),
+                roc_event=roc_event,
+                tool_map=tools,
+            )
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.55)
+        self.assertEqual(
+            [
+                result["functionResult"]["responseBody"]["TEXT"]["body"]
+                for result in session_state_output["returnControlInvocationResults"]
+            ],
+            ["call-0", "call-1", "call-2"],
+        )
+
+    async def test_parallel_sync_tools(self):
+        tools = {"slow_sync_tool": slow_sync_tool}
+        roc_event = slow_tool_event("slow_sync_tool", [0.3, 0.1, 0.2])
+
+        start = time.perf_counter()
+        with mock.patch("builtins.print"):
+            session_state_output = await ProcessROC.process_roc(
+                inlineSessionState=dict(),
+                roc_event=roc_event,
+                tool_map=tools,
+            )
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.55)
+        self.assertEqual(
+            [
+                result["functionResult"]["responseBody"]["TEXT"]["body"]
+                for result in session_state_output["returnControlInvocationResults"]
+            ],
+            ["call-0", "call-1", "call-2"],
+        )
+
+    async def test_tool_timeout(self):
+        roc_event = slow_tool_event("slow_async_tool", [5])
+
+        start = time.perf_counter()
+        session_state_output = await ProcessROC.process_roc(
+            inlineSessionState=dict(),
+            roc_event=roc_event,
+            tool_map={"slow_async_tool": slow_async_tool},
+            tool_config_map={"slow_async_tool": ToolConfig(timeout=0.1)},
+        )
+        elapsed = time.perf_counter() - start
+
+        function_result = session_state_output["returnControlInvocationResults"][0][
+            "functionResult"
+        ]
+        self.assertLess(elapsed, 1)
+        self.assertEqual(function_result["responseState"], "FAILURE")
+        self.assertIn("timed out", function_result["responseBody"]["TEXT"]["body"])
+
+    async def test_process_executor(self):
+        with mock.patch("builtins.print"):
+            functionResult = await ProcessROC.invoke_roc_function(
+                functionInvocationInput=invoke_roc_function_functionInvocationInput,
+                tool_to_invoke=count_primes,
+                parameters={"limit": "100"},
+                tool_config=ToolConfig(executor=ToolExecutor.PROCESS),
+            )
+
+        self.assertEqual(functionResult["responseBody"]["TEXT"]["body"], "25")
+        self.assertNotIn("responseState", functionResult)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,167 @@
+import json
+import unittest
+from typing import List, Optional
+
+from InlineAgent.agent import ProcessROC
+from InlineAgent.agent.roc_parameters import (
+    ParameterDecodeError,
+    ParameterDecoder,
+    get_parameter_decoder,
+)
+
+
+def book_hotel(
+    city: str, nights: int, budget: float, breakfast: bool, rooms: List[int]
+) -> str:
+    return f"{city} {nights} {budget} {breakfast} {rooms}"
+
+
+def untyped(guests, price, pets, tags):
+    return "ok"
+
+
+def params(**values):
+    return [
+        {"name": name, "type": type_, "value": value}
+        for name, (type_, value) in values.items()
+    ]
+
+
+class TestParameterDecoder(unittest.TestCase):
+
+    def test_annotated_parameters(self):
+        decoded = get_parameter_decoder(book_hotel).decode(
+            "book_hotel",
+            params(
+                city=("string", "Paris"),
+                nights=("number", "3"),
+                budget=("number", "120.5"),
+                breakfast=("boolean", "false"),
+                rooms=("array", "[101, 102]"),
+            ),
+        )
+
+        self.assertEqual(
+            decoded,
+            {
+                "city": "Paris",
+                "nights": 3,
+                "budget": 120.5,
+                "breakfast": False,
+                "rooms": [101, 102],
+            },
+        )
+
+    def test_parameters_without_annotations_use_the_reported_type(self):
+        decoded = get_parameter_decoder(untyped).decode(
+            "untyped",
+            params(
+                guests=("integer", "2"),
+                price=("number", "99.9"),
+                pets=("boolean", "False"),
+                tags=("array", "[{key=color, value=blue}, {key=size, value=L}]"),
+            ),
+        )
+
+        self.assertEqual(
+            decoded,
+            {
+                "guests": 2,
+                "price": 99.9,
+                "pets": False,
+                "tags": [
+                    {"key": "color", "value": "blue"},
+                    {"key": "size", "value": "L"},
+                ],
+            },
+        )
+
+    def test_loose_arrays_with_typed_items(self):
+        def tool(ids: Optional[List[int]] = None):
+            pass
+
+        self.assertEqual(
+            get_parameter_decoder(tool).decode(
+                "tool", params(ids=("array", "[1, 2, 3]"))
+            ),
+            {"ids": [1, 2, 3]},
+        )
+        self.assertEqual(
+            ParameterDecoder().decode("tool", params(ids=("array", "[a, b]"))),
+            {"ids": ["a", "b"]},
+        )
+
+    def test_pep_604_optional_annotations(self):
+        def tool(budget: float | None = None, ids: list[int] | None = None):
+            pass
+
+        self.assertEqual(
+            get_parameter_decoder(tool).decode(
+                "tool",
+                params(budget=("integer", "2.5"), ids=("array", "[1, 2, 3]")),
+            ),
+            {"budget": 2.5, "ids": [1, 2, 3]},
+        )
+
+    def test_errors_are_structured(self):
+        with self.assertRaises(ParameterDecodeError) as context:
+            get_parameter_decoder(book_hotel).decode(
+                "book_hotel",
+                params(
+                    city=("string", "Paris"),
+                    nights=("number", "2.5"),
+                    breakfast=("boolean", "maybe"),
+                ),
+            )
+
+        self.assertEqual(
+            [(error["name"], error["value"]) for error in context.exception.errors],
+            [("nights", "2.5"), ("breakfast", "maybe")],
+        )
+
+    def test_decoder_is_compiled_once(self):
+        self.assertIs(
+            get_parameter_decoder(book_hotel), get_parameter_decoder(book_hotel)
+        )
+
+
+class TestProcessROCParameters(unittest.IsolatedAsyncioTestCase):
+
+    async def test_invalid_parameters_reprompt_the_agent(self):
+        roc_event = {
+            "invocationInputs": [
+                {
+                    "functionInvocationInput": {
+                        "actionGroup": "Hotels",
+                        "parameters": params(
+                            city=("string", "Paris"),
+                            nights=("integer", "three"),
+                            budget=("number", "100"),
+                            breakfast=("boolean", "true"),
+                            rooms=("array", "[1]"),
+                        ),
+                        "function": "book_hotel",
+                        "actionInvocationType": "RESULT",
+                        "agentId": "INLINE_AGENT",
+                    }
+                }
+            ],
+            "invocationId": "MOCK",
+        }
+
+        session_state = await ProcessROC.process_roc(
+            inlineSessionState=dict(),
+            roc_event=roc_event,
+            tool_map={"book_hotel": book_hotel},
+        )
+
+        function_result = session_state["returnControlInvocationResults"][0][
+            "functionResult"
+        ]
+        self.assertEqual(function_result["responseState"], "REPROMPT")
+        body = json.loads(function_result["responseBody"]["TEXT"]["body"])
+        self.assertEqual(body["invalidParameters"][0]["name"], "nights")
+
+
+if __name__ == "__main__":
+    unittest.main()
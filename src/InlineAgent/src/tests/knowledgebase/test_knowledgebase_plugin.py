@@ -1,6 +1,24 @@
 import unittest
+from unittest import mock
+
+import boto3
 
 from InlineAgent.knowledge_base import KnowledgeBasePlugin as KnowledgeBase
+from InlineAgent.knowledge_base import KnowledgeBaseIdCache
+
+
+def mock_bedrock_agent():
+    bedrock_agent = mock.MagicMock()
+    bedrock_agent.list_knowledge_bases.side_effect = lambda **kwargs: {
+        None: {
+            "knowledgeBaseSummaries": [{"name": "kb-1", "knowledgeBaseId": "ID1"}],
+            "nextToken": "page-2",
+        },
+        "page-2": {
+            "knowledgeBaseSummaries": [{"name": "kb-2", "knowledgeBaseId": "ID2"}],
+        },
+    }[kwargs.get("nextToken")]
+    return bedrock_agent
 
 
 class TestKnowledgeBase(unittest.TestCase):
@@ -96,5 +114,77 @@ class TestKnowledgeBase(unittest.TestCase):
             idx += 1
 
 
+class TestKnowledgeBaseIdCache(unittest.TestCase):
+
+    def setUp(self):
+        self.bedrock_agent = mock_bedrock_agent()
+        patcher = mock.patch(
+            "InlineAgent.knowledge_base.knowledgebase_plugin.get_client",
+            return_value=self.bedrock_agent,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_resolves_names_past_first_page(self):
+        session = mock.MagicMock(spec=boto3.Session)
+        session.client.return_value = self.bedrock_agent
+
+        self.assertEqual(
+            KnowledgeBase.get_knowledge_base_id_by_name("kb-2", session), "ID2"
+        )
+        self.assertIsNone(
+            KnowledgeBase.get_knowledge_base_id_by_name("missing", session)
+        )
+
+    def test_warm_once_for_many_names(self):
+        cache = KnowledgeBaseIdCache()
+
+        self.assertEqual(cache.get("kb-1"), "ID1")
+        self.assertEqual(cache.get("kb-2"), "ID2")
+        self.assertEqual(cache.get("kb-1"), "ID1")
+        self.assertEqual(self.bedrock_agent.list_knowledge_bases.call_count, 2)
+
+    def test_ttl_expiry(self):
+        cache = KnowledgeBaseIdCache(ttl=60)
+
+        with mock.patch("time.monotonic", return_value=0):
+            cache.get("kb-1")
+        with mock.patch("time.monotonic", return_value=30):
+            cache.get("kb-1")
+        self.assertEqual(self.bedrock_agent.list_knowledge_bases.call_count, 2)
+
+        with mock.patch("time.monotonic", return_value=61):
+            cache.get("kb-1")
+        self.assertEqual(self.bedrock_agent.list_knowledge_bases.call_count, 4)
+
+    def test_missing_name_lists_at_most_once_per_interval(self):
+        cache = KnowledgeBaseIdCache(ttl=60, miss_refresh_interval=5)
+
+        with mock.patch("time.monotonic", return_value=0):
+            self.assertIsNone(cache.get("missing"))
+        with mock.patch("time.monotonic", return_value=4):
+            self.assertIsNone(cache.get("missing"))
+        self.assertEqual(self.bedrock_agent.list_knowledge_bases.call_count, 2)
+
+        with mock.patch("time.monotonic", return_value=5):
+            self.assertIsNone(cache.get("missing"))
+        self.assertEqual(self.bedrock_agent.list_knowledge_bases.call_count, 4)
+
+    def test_invalidate(self):
+        cache = KnowledgeBaseIdCache()
+        cache.get("kb-1")
+        cache.invalidate()
+        cache.get("kb-1")
+
+        self.assertEqual(self.bedrock_agent.list_knowledge_bases.call_count, 4)
+
+    def test_to_dict_uses_cache(self):
+        knowledge_base = KnowledgeBase(name="kb-2", description="MOCK")
+
+        self.assertEqual(knowledge_base.to_dict()["knowledgeBaseId"], "ID2")
+        with self.assertRaises(ValueError):
+            KnowledgeBase(name="missing", description="MOCK").to_dict()
+
+
 if __name__ == "__main__":
     unittest.main()
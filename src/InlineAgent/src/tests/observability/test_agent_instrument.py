@@ -0,0 +1,159 @@
+import os
+import tempfile
+import time
+import unittest
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from opentelemetry import trace as otel_trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+import InlineAgent.observability.agent_instrument as agent_instrument
+import InlineAgent.observability.process as process
+from InlineAgent.observability import observe, read_trace
+
+span_exporter = InMemorySpanExporter()
+
+AGENT_ID = "MOCKAGENT"
+AGENT_ALIAS_ID = "MOCKALIAS"
+CALLER_CHAIN = [
+    {
+        "agentAliasArn": f"arn:aws:bedrock:us-east-1:123456789012:agent-alias/{AGENT_ID}/{AGENT_ALIAS_ID}"
+    }
+]
+
+
+def setUpModule():
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    otel_trace.set_tracer_provider(tracer_provider)
+
+
+def mock_event_stream(session_id: str, intervene: bool):
+    yield {
+        "trace": {
+            "sessionId": session_id,
+            "callerChain": CALLER_CHAIN,
+            "trace": {"guardrailTrace": {"action": "NONE", "inputAssessments": [{}]}},
+        }
+    }
+    time.sleep(0.001)
+    if intervene:
+        yield {
+            "trace": {
+                "sessionId": session_id,
+                "callerChain": CALLER_CHAIN,
+                "trace": {
+                    "guardrailTrace": {
+                        "action": "INTERVENED",
+                        "outputAssessments": [{}],
+                    }
+                },
+            }
+        }
+        time.sleep(0.001)
+    yield {"chunk": {"bytes": f"answer-{session_id}".encode()}}
+
+
+@observe(show_traces=False, save_traces=False)
+def invoke_agent(inputText: str, sessionId: str, **kwargs):
+    return {"completion": mock_event_stream(sessionId, kwargs.pop("intervene"))}
+
+
+def failing_event_stream(session_id: str):
+    yield {
+        "trace": {
+            "sessionId": session_id,
+            "callerChain": CALLER_CHAIN,
+            "trace": {"guardrailTrace": {"action": "NONE", "inputAssessments": [{}]}},
+        }
+    }
+    raise RuntimeError("stream broke")
+
+
+@observe(show_traces=False, save_traces=True)
+def invoke_failing_agent(inputText: str, sessionId: str, **kwargs):
+    return {"completion": failing_event_stream(sessionId)}
+
+
+class TestObserveConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        span_exporter.clear()
+        patcher = mock.patch.object(
+            agent_instrument.config, "PRODUCE_BEDROCK_OTEL_TRACES", True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parallel_invocations_keep_separate_span_trees(self):
+        invocations = 32
+
+        def run(idx):
+            return invoke_agent(
+                inputText="Hello",
+                sessionId=f"session-{idx}",
+                agentId=AGENT_ID,
+                agentAliasId=AGENT_ALIAS_ID,
+                streamingConfigurations={"streamFinalResponse": True},
+                intervene=idx % 2 == 1,
+            )
+
+        with mock.patch("builtins.print"):
+            with ThreadPoolExecutor(max_workers=invocations) as executor:
+                answers = list(executor.map(run, range(invocations)))
+
+        self.assertEqual(
+            answers, [f"answer-session-{idx}" for idx in range(invocations)]
+        )
+
+        spans = span_exporter.get_finished_spans()
+        roots = {span.context.trace_id: span for span in spans if span.parent is None}
+        guardrails = defaultdict(list)
+        for span in spans:
+            if span.parent is not None:
+                guardrails[span.context.trace_id].append(span)
+
+        self.assertEqual(len(roots), invocations)
+        for trace_id, root in roots.items():
+            # One input guardrail span plus either the output intervention or
+            # the closing NONE guardrail span, all parented by this root
+            self.assertEqual(len(guardrails[trace_id]), 2)
+            for span in guardrails[trace_id]:
+                self.assertEqual(span.parent.span_id, root.context.span_id)
+
+
+class TestObserveSaveTraces(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for target, attribute, value in [
+            (agent_instrument.config, "PRODUCE_BEDROCK_OTEL_TRACES", True),
+            (process.config, "TRACE_COMPRESSION", "gzip"),
+        ]:
+            patcher = mock.patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_gzip_trace_is_readable_after_exception(self):
+        with mock.patch("os.getcwd", return_value=self.directory):
+            with mock.patch("builtins.print"), self.assertRaises(Exception):
+                invoke_failing_agent(
+                    inputText="Hello",
+                    sessionId="MOCK",
+                    agentId=AGENT_ID,
+                    agentAliasId=AGENT_ALIAS_ID,
+                )
+
+        trace = read_trace("MOCK", directory=os.path.join(self.directory, "trace"))
+        self.assertEqual(len(trace), 1)
+        self.assertIn("guardrailTrace", trace[0]["trace"])
+
+
+if __name__ == "__main__":
+    unittest.main()
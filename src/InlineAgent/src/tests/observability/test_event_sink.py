@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from InlineAgent.observability import (
+    AgentEvent,
+    AgentEventType,
+    ConsoleEventSink,
+    EventSink,
+    NoopEventSink,
+    QueueEventSink,
+    Trace,
+    get_event_sink,
+    set_event_sink,
+)
+
+ORCHESTRATION_TRACE = {
+    "orchestrationTrace": {
+        "modelInvocationOutput": {
+            "metadata": {"usage": {"inputTokens": 120, "outputTokens": 30}}
+        }
+    }
+}
+
+RATIONALE_TRACE = {
+    "orchestrationTrace": {"rationale": {"text": "I should call the weather tool"}}
+}
+
+PRE_PROCESSING_TRACE = {
+    "preProcessingTrace": {
+        "modelInvocationOutput": {
+            "metadata": {"usage": {"inputTokens": 10, "outputTokens": 5}}
+        }
+    }
+}
+
+
+class TestEventSinks(unittest.TestCase):
+
+    def test_noop_sink_counts_tokens_without_printing(self):
+        with mock.patch("builtins.print") as print_:
+            for trace in (ORCHESTRATION_TRACE, PRE_PROCESSING_TRACE, RATIONALE_TRACE):
+                self.assertEqual(
+                    Trace.parse_trace(trace=trace, agentName="Mock"),
+                    Trace.parse_trace(
+                        trace=trace, agentName="Mock", sink=NoopEventSink()
+                    ),
+                )
+
+            print_.reset_mock()
+            Trace.parse_trace(
+                trace=ORCHESTRATION_TRACE, agentName="Mock", sink=NoopEventSink()
+            )
+            print_.assert_not_called()
+
+    def test_queue_sink_receives_structured_trace_events(self):
+        sink = QueueEventSink()
+
+        tokens = Trace.parse_trace(
+            trace=ORCHESTRATION_TRACE, agentName="Mock", sink=sink
+        )
+        Trace.parse_trace(trace=RATIONALE_TRACE, agentName="Mock", sink=sink)
+
+        self.assertEqual(tokens, (120, 30, 1))
+        events = list(sink.queue.queue)
+        self.assertEqual([event.type for event in events], [AgentEventType.TRACE] * 2)
+        self.assertEqual(events[0].message, "Input Tokens: 120 Output Tokens: 30")
+        self.assertEqual(events[1].message, "Thought: I should call the weather tool")
+        self.assertEqual(events[1].data["trace"], RATIONALE_TRACE)
+
+    def test_bounded_asyncio_queue_drops_events(self):
+        sink = QueueEventSink(asyncio.Queue(maxsize=1))
+        sink.emit(AgentEvent(type=AgentEventType.ANSWER, message="a"))
+        sink.emit(AgentEvent(type=AgentEventType.ANSWER, message="b"))
+
+        self.assertEqual(sink.queue.qsize(), 1)
+        self.assertEqual(sink.dropped, 1)
+
+    def test_console_sink_prints(self):
+        with mock.patch("builtins.print") as print_:
+            ConsoleEventSink().emit(
+                AgentEvent(type=AgentEventType.ANSWER, message="Hello", end="")
+            )
+        print_.assert_called_once_with("Hello", end="")
+
+    def test_sink_requires_emit(self):
+        with self.assertRaises(TypeError):
+            EventSink()
+
+        class PartialSink(EventSink):
+            pass
+
+        with self.assertRaises(TypeError):
+            PartialSink()
+
+    def test_default_sink(self):
+        self.assertIsInstance(get_event_sink(), ConsoleEventSink)
+
+        sink = QueueEventSink()
+        default = get_event_sink()
+        set_event_sink(sink)
+        try:
+            Trace.parse_trace(trace=RATIONALE_TRACE, agentName="Mock")
+        finally:
+            set_event_sink(default)
+
+        self.assertEqual(sink.queue.qsize(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
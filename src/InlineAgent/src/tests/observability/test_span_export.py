@@ -0,0 +1,149 @@
+import threading
+import time
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from InlineAgent.observability import QueuedSpanProcessor
+
+
+class BlockingExporter(InMemorySpanExporter):
+    """In-memory exporter that holds every export until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.exporting = threading.Event()
+        self.release = threading.Event()
+        self.batch_sizes = list()
+
+    def export(self, spans):
+        self.batch_sizes.append(len(spans))
+        self.exporting.set()
+        self.release.wait(5)
+        return super().export(spans)
+
+
+class FailingExporter(InMemorySpanExporter):
+    def export(self, spans):
+        return SpanExportResult.FAILURE
+
+
+class TestQueuedSpanProcessor(unittest.TestCase):
+
+    def tracer(self, processor: QueuedSpanProcessor):
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(processor)
+        self.addCleanup(processor.shutdown)
+        return tracer_provider.get_tracer("test")
+
+    def end_spans(self, tracer, count: int):
+        for idx in range(count):
+            tracer.start_span(f"span-{idx}").end()
+
+    def test_force_flush_exports_in_batches(self):
+        exporter = BlockingExporter()
+        exporter.release.set()
+        processor = QueuedSpanProcessor(
+            exporter, max_export_batch_size=4, schedule_delay=60
+        )
+        self.end_spans(self.tracer(processor), 10)
+
+        self.assertTrue(processor.force_flush())
+        self.assertEqual(len(exporter.get_finished_spans()), 10)
+        self.assertTrue(all(size <= 4 for size in exporter.batch_sizes))
+
+        stats = processor.stats
+        self.assertEqual(stats.enqueued, 10)
+        self.assertEqual(stats.exported, 10)
+        self.assertEqual(stats.dropped, 0)
+        self.assertEqual(stats.queue_depth, 0)
+        self.assertGreaterEqual(stats.batches, 3)
+
+    def test_exports_on_schedule(self):
+        exporter = InMemorySpanExporter()
+        processor = QueuedSpanProcessor(exporter, schedule_delay=0.01)
+        self.end_spans(self.tracer(processor), 3)
+
+        deadline = time.monotonic() + 5
+        while len(exporter.get_finished_spans()) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(exporter.get_finished_spans()), 3)
+
+    def test_drop_does_not_wait_for_slow_exporter(self):
+        exporter = BlockingExporter()
+        processor = QueuedSpanProcessor(
+            exporter, max_queue_size=4, max_export_batch_size=2, schedule_delay=60
+        )
+        tracer = self.tracer(processor)
+
+        # Fill a batch so the worker starts exporting and stalls
+        self.end_spans(tracer, 2)
+        self.assertTrue(exporter.exporting.wait(5))
+
+        start = time.perf_counter()
+        self.end_spans(tracer, 10)
+        self.assertLess(time.perf_counter() - start, 1)
+
+        stats = processor.stats
+        self.assertEqual(stats.queue_depth, 4)
+        self.assertEqual(stats.dropped, 6)
+
+        exporter.release.set()
+        processor.force_flush()
+        self.assertEqual(len(exporter.get_finished_spans()), 6)
+        self.assertEqual(processor.stats.exported, 6)
+
+    def test_block_waits_for_room(self):
+        exporter = BlockingExporter()
+        processor = QueuedSpanProcessor(
+            exporter,
+            max_queue_size=2,
+            max_export_batch_size=2,
+            schedule_delay=60,
+            backpressure="block",
+            block_timeout=0.05,
+        )
+        tracer = self.tracer(processor)
+        self.end_spans(tracer, 2)
+        self.assertTrue(exporter.exporting.wait(5))
+        self.end_spans(tracer, 3)
+
+        # Two spans fit in the queue, the third times out waiting for room
+        self.assertEqual(processor.stats.dropped, 1)
+
+        exporter.release.set()
+        processor.force_flush()
+        self.assertEqual(len(exporter.get_finished_spans()), 4)
+
+    def test_failed_exports_are_counted(self):
+        processor = QueuedSpanProcessor(FailingExporter(), schedule_delay=60)
+        self.end_spans(self.tracer(processor), 3)
+        processor.force_flush()
+
+        stats = processor.stats
+        self.assertEqual(stats.failed, 3)
+        self.assertEqual(stats.exported, 0)
+        self.assertEqual(stats.batches, 1)
+
+    def test_shutdown_exports_remaining_spans(self):
+        exporter = InMemorySpanExporter()
+        processor = QueuedSpanProcessor(exporter, schedule_delay=60)
+        self.end_spans(self.tracer(processor), 5)
+        processor.shutdown()
+        self.assertEqual(processor.stats.exported, 5)
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            QueuedSpanProcessor(InMemorySpanExporter(), backpressure="other")
+        with self.assertRaises(ValueError):
+            QueuedSpanProcessor(
+                InMemorySpanExporter(), max_queue_size=2, max_export_batch_size=4
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import unittest
+from unittest import mock
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+
+import InlineAgent.observability.span_manager as span_manager
+from InlineAgent.observability.span_manager import (
+    FastSpanManager,
+    SpanManager,
+    create_span_manager,
+)
+
+SESSION_ID = "supervisor-session"
+COLLAB_SESSION_ID = "collaborator-session"
+FAMILY = "3f1c2a4e-9b7d-4c1e-8f2a-6d5b4c3a2e1f"
+
+
+def arn(agent_id: str, agent_alias_id: str) -> dict:
+    return {
+        "agentAliasArn": f"arn:aws:bedrock:us-east-1:123456789012:agent-alias/{agent_id}/{agent_alias_id}"
+    }
+
+
+SUPERVISOR_CHAIN = [arn("SUPERVISOR", "ALIAS")]
+COLLABORATOR_CHAIN = [arn("SUPERVISOR", "ALIAS"), arn("COLLAB", "ALIAS")]
+
+
+def run_scenario(manager):
+    manager.create_agent_span_return(
+        agent_session_id=SESSION_ID,
+        caller_chain=SUPERVISOR_CHAIN,
+        attributes={"agent": "supervisor"},
+        name="supervisor",
+    )
+    manager.assign_new_l2_return(
+        agent_session_id=SESSION_ID,
+        caller_chain=SUPERVISOR_CHAIN,
+        trace_id=f"{FAMILY}-0",
+        l2_attributes={},
+        l3_attributes={},
+        l2_name="l2-0",
+        l3_name="l3-0",
+    )
+    # Same counter returns the open L2 span
+    manager.assign_new_l2_return(
+        agent_session_id=SESSION_ID,
+        caller_chain=SUPERVISOR_CHAIN,
+        trace_id=f"{FAMILY}-0",
+        l2_attributes={},
+        l3_attributes={},
+        l2_name="ignored",
+        l3_name="ignored",
+    )
+    manager.assign_new_l3_return(
+        agent_session_id=SESSION_ID,
+        collab_agent_trace_id="COLLAB:ALIAS",
+        trace_id=f"{FAMILY}-0",
+        attributes={},
+        name="collaborator-call",
+    )
+    manager.create_agent_span_return(
+        agent_session_id=COLLAB_SESSION_ID,
+        caller_chain=COLLABORATOR_CHAIN,
+        attributes={},
+        name="collaborator",
+    )
+    manager.delete_agent_span(agent_session_id=COLLAB_SESSION_ID)
+    manager.delete_l3_span(
+        agent_session_id=SESSION_ID,
+        collab_agent_trace_id="COLLAB:ALIAS",
+        trace_id=f"{FAMILY}-0",
+        status=StatusCode.ERROR,
+    )
+    # A new counter closes the previous L2 span and its L3 span
+    manager.assign_new_l2_return(
+        agent_session_id=SESSION_ID,
+        caller_chain=SUPERVISOR_CHAIN,
+        trace_id=f"{FAMILY}-1",
+        l2_attributes={},
+        l3_attributes={},
+        l2_name="l2-1",
+        l3_name="l3-1",
+    )
+    manager.end_all_spans(status_code=StatusCode.OK)
+
+
+def span_tree(spans):
+    names = {span.context.span_id: span.name for span in spans}
+    return sorted(
+        (
+            span.name,
+            names.get(span.parent.span_id) if span.parent else None,
+            span.status.status_code,
+            dict(span.attributes),
+        )
+        for span in spans
+    )
+
+
+class TestSpanManagerParity(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        patcher = mock.patch.object(
+            span_manager, "tracer", tracer_provider.get_tracer("test")
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, manager):
+        self.exporter.clear()
+        run_scenario(manager)
+        self.assertEqual(manager.spans, {})
+        return span_tree(self.exporter.get_finished_spans())
+
+    def test_same_span_tree(self):
+        expected = self.record(SpanManager())
+        self.assertEqual(self.record(FastSpanManager()), expected)
+
+        self.assertEqual(
+            [(name, parent) for name, parent, _, _ in expected],
+            [
+                ("collaborator", "collaborator-call"),
+                ("collaborator-call", "l2-0"),
+                ("l2-0", "supervisor"),
+                ("l2-1", "supervisor"),
+                ("l3-0", "l2-0"),
+                ("l3-1", "l2-1"),
+                ("supervisor", None),
+            ],
+        )
+
+    def test_same_errors(self):
+        for manager in (SpanManager(), FastSpanManager()):
+            with self.subTest(manager=type(manager).__name__):
+                with self.assertRaisesRegex(RuntimeError, "Agent span not found"):
+                    manager.assign_new_l3_return(
+                        agent_session_id="missing",
+                        collab_agent_trace_id="COLLAB:ALIAS",
+                        trace_id=f"{FAMILY}-0",
+                        attributes={},
+                        name="l3",
+                    )
+                manager.agent_session_id_dict["OTHER:ALIAS"] = "missing"
+                with self.assertRaisesRegex(RuntimeError, "Collaborator span"):
+                    manager.create_agent_span_return(
+                        agent_session_id=COLLAB_SESSION_ID,
+                        caller_chain=[arn("OTHER", "ALIAS"), arn("COLLAB", "ALIAS")],
+                        attributes={},
+                        name="collaborator",
+                    )
+
+    def test_only_pydantic_validates_arguments(self):
+        with self.assertRaises(Exception):
+            SpanManager().create_agent_span_return(
+                agent_session_id=SESSION_ID,
+                caller_chain=SUPERVISOR_CHAIN,
+                attributes="not a dict",
+                name="supervisor",
+            )
+
+    def test_create_span_manager(self):
+        self.assertIsInstance(create_span_manager(), SpanManager)
+        self.assertIsInstance(create_span_manager("fast"), FastSpanManager)
+        with self.assertRaises(ValueError):
+            create_span_manager("other")
+
+
+if __name__ == "__main__":
+    unittest.main()
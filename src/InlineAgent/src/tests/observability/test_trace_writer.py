@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from InlineAgent.observability import TraceWriter, read_trace
+from InlineAgent.observability.process import ProcessL2Trace
+from InlineAgent.observability.trace_writer import close_trace_writer
+
+
+def trace_events(count):
+    return [
+        {"sessionId": "MOCK", "trace": {"orchestrationTrace": {"step": idx}}}
+        for idx in range(count)
+    ]
+
+
+class TestTraceWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_write_and_read(self):
+        writer = TraceWriter(session_id="MOCK", directory=self.directory)
+        for event in trace_events(3):
+            writer.write(event)
+        writer.close()
+
+        self.assertEqual(read_trace("MOCK", directory=self.directory), trace_events(3))
+        with open(os.path.join(self.directory, "MOCK.jsonl")) as file:
+            self.assertEqual(len(file.readlines()), 3)
+
+    def test_append_across_writers(self):
+        for event in trace_events(2):
+            writer = TraceWriter(session_id="MOCK", directory=self.directory)
+            writer.write(event)
+            writer.close()
+
+        self.assertEqual(read_trace("MOCK", directory=self.directory), trace_events(2))
+
+    def test_gzip(self):
+        writer = TraceWriter(
+            session_id="MOCK", directory=self.directory, compression="gzip"
+        )
+        for event in trace_events(3):
+            writer.write(event)
+            writer.flush()
+        writer.close()
+
+        with gzip.open(os.path.join(self.directory, "MOCK.jsonl.gz"), "rt") as file:
+            self.assertEqual(json.loads(file.readline()), trace_events(1)[0])
+        self.assertEqual(read_trace("MOCK", directory=self.directory), trace_events(3))
+
+    def test_rotation(self):
+        writer = TraceWriter(session_id="MOCK", directory=self.directory, max_bytes=1)
+        for event in trace_events(3):
+            writer.write(event)
+            writer.flush()
+        writer.close()
+
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            ["MOCK.1.jsonl", "MOCK.2.jsonl", "MOCK.jsonl"],
+        )
+        self.assertEqual(read_trace("MOCK", directory=self.directory), trace_events(3))
+
+    def test_reads_legacy_json(self):
+        with open(os.path.join(self.directory, "MOCK.json"), "w") as file:
+            json.dump(trace_events(1), file)
+        writer = TraceWriter(session_id="MOCK", directory=self.directory)
+        writer.write(trace_events(2)[1])
+        writer.close()
+
+        self.assertEqual(read_trace("MOCK", directory=self.directory), trace_events(2))
+
+    def test_unsupported_compression(self):
+        with self.assertRaises(ValueError):
+            TraceWriter(session_id="MOCK", directory=self.directory, compression="lz4")
+
+    def test_save_trace(self):
+        with mock.patch("os.getcwd", return_value=self.directory):
+            for event in trace_events(2):
+                ProcessL2Trace.save_trace(trace_data=event, session_id="MOCK")
+            close_trace_writer(session_id="MOCK")
+
+        self.assertEqual(
+            read_trace("MOCK", directory=os.path.join(self.directory, "trace")),
+            trace_events(2),
+        )
+
+    def test_gzip_is_closed_at_exit(self):
+        # The writer is never closed explicitly, the atexit hook has to write
+        # the gzip trailer
+        script = (
+            "from InlineAgent.observability.trace_writer import get_trace_writer\n"
+            f"writer = get_trace_writer('MOCK', directory={self.directory!r}, "
+            "compression='gzip')\n"
+            f"for event in {trace_events(3)!r}:\n"
+            "    writer.write(event)\n"
+            "writer.flush()\n"
+        )
+        subprocess.run(
+            [sys.executable, "-c", script],
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        )
+
+        self.assertEqual(read_trace("MOCK", directory=self.directory), trace_events(3))
+
+
+if __name__ == "__main__":
+    unittest.main()
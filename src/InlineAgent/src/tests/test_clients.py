@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+
+from InlineAgent import clients
+
+
+class TestClientRegistry(unittest.TestCase):
+
+    def setUp(self):
+        clients.clear_clients()
+        patcher = mock.patch("InlineAgent.clients.boto3.Session")
+        self.mock_session_cls = patcher.start()
+        self.mock_session_cls.side_effect = lambda **kwargs: self.new_session()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(clients.clear_clients)
+
+    @staticmethod
+    def new_session():
+        session = mock.MagicMock()
+        session.client.side_effect = lambda *args, **kwargs: mock.MagicMock()
+        return session
+
+    def test_session_is_shared_per_profile(self):
+        self.assertIs(clients.get_session("a"), clients.get_session("a"))
+        self.assertIsNot(clients.get_session("a"), clients.get_session("b"))
+        self.assertEqual(self.mock_session_cls.call_count, 2)
+
+    def test_client_is_shared_per_config(self):
+        first = clients.get_client("bedrock-agent-runtime", profile="a")
+        second = clients.get_client("bedrock-agent-runtime", profile="a")
+        long_timeout = clients.get_client(
+            "bedrock-agent-runtime", profile="a", read_timeout=600
+        )
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, long_timeout)
+
+        session = clients.get_session("a")
+        self.assertEqual(session.client.call_count, 2)
+        config = session.client.call_args_list[0].kwargs["config"]
+        self.assertEqual(
+            config.max_pool_connections, clients.DEFAULT_MAX_POOL_CONNECTIONS
+        )
+        self.assertTrue(config.tcp_keepalive)
+
+    def test_account_id_calls_sts_once(self):
+        sts = clients.get_client("sts", profile="a")
+        sts.get_caller_identity.return_value = {"Account": "123456789012"}
+
+        self.assertEqual(clients.get_account_id("a"), "123456789012")
+        self.assertEqual(clients.get_account_id("a"), "123456789012")
+        sts.get_caller_identity.assert_called_once()
+
+    def test_clear_clients(self):
+        first = clients.get_client("sts", profile="a")
+        clients.clear_clients()
+
+        self.assertIsNot(first, clients.get_client("sts", profile="a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
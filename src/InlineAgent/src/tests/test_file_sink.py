@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from InlineAgent.agent import InlineAgent
+from InlineAgent.file_sink import FileSink, file_attribute
+from InlineAgent.observability import NoopEventSink
+
+FILES = [
+    {"name": "chart.png", "bytes": b"\x89PNG chart", "type": "image/png"},
+    {"name": "data.csv", "bytes": b"a,b\n1,2\n", "type": "text/csv"},
+]
+
+
+class TestFileSink(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def read(self, *path):
+        with open(os.path.join(self.directory.name, *path), "rb") as f:
+            return f.read()
+
+    async def test_write_files_of_event(self):
+        file_sink = FileSink(directory=self.directory.name)
+
+        paths = await file_sink.write(session_id="session", files=FILES)
+
+        self.assertEqual(
+            paths,
+            [os.path.join(self.directory.name, "session", f["name"]) for f in FILES],
+        )
+        for this_file in FILES:
+            self.assertEqual(
+                self.read("session", this_file["name"]), this_file["bytes"]
+            )
+
+    def test_submit_and_wait(self):
+        file_sink = FileSink(directory=self.directory.name)
+
+        with mock.patch("os.makedirs", wraps=os.makedirs) as makedirs:
+            FileSink.wait(file_sink.submit(session_id="session", files=FILES))
+            FileSink.wait(file_sink.submit(session_id="session", files=FILES))
+
+        # The session directory is created once, not once per file
+        self.assertEqual(makedirs.call_count, 1)
+        self.assertEqual(self.read("session", "data.csv"), b"a,b\n1,2\n")
+
+    def test_recreates_removed_directory(self):
+        file_sink = FileSink(directory=self.directory.name)
+        FileSink.wait(file_sink.submit(session_id="session", files=FILES[:1]))
+        for name in os.listdir(os.path.join(self.directory.name, "session")):
+            os.remove(os.path.join(self.directory.name, "session", name))
+        os.rmdir(os.path.join(self.directory.name, "session"))
+
+        FileSink.wait(file_sink.submit(session_id="session", files=FILES[:1]))
+
+        self.assertEqual(self.read("session", "chart.png"), b"\x89PNG chart")
+
+    async def test_content_addressed_files_are_stored_once(self):
+        file_sink = FileSink(directory=self.directory.name, content_addressed=True)
+
+        first = await file_sink.write(session_id="first", files=FILES)
+        second = await file_sink.write(session_id="second", files=FILES)
+
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.directory.name, "objects"))), 2
+        )
+        for first_path, second_path in zip(first, second):
+            self.assertTrue(os.path.samefile(first_path, second_path))
+        self.assertEqual(self.read("second", "data.csv"), b"a,b\n1,2\n")
+
+    def test_file_attribute_is_truncated(self):
+        self.assertEqual(file_attribute(b"short"), "short")
+        self.assertEqual(
+            file_attribute(b"x" * 10, max_bytes=4), "xxxx... [truncated 6 bytes]"
+        )
+
+
+class TestInlineAgentFiles(unittest.IsolatedAsyncioTestCase):
+
+    async def test_invoke_writes_files_events(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        agent = InlineAgent(
+            foundation_model="MOCK_ID",
+            instruction="You are a friendly assistant.",
+            agent_name="MockAgent",
+            event_sink=NoopEventSink(),
+            file_sink=FileSink(directory=directory.name),
+        )
+        client = mock.MagicMock()
+        client.invoke_inline_agent.return_value = {
+            "completion": iter(
+                [{"files": {"files": FILES}}, {"chunk": {"bytes": b"Done"}}]
+            ),
+            "ResponseMetadata": {"RequestId": "MOCK", "RetryAttempts": 0},
+        }
+
+        with mock.patch(
+            "InlineAgent.agent.inline_agent.get_client", return_value=client
+        ):
+            answer = await agent.invoke(input_text="Plot it", session_id="MOCK")
+
+        self.assertEqual(answer, "Done")
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(directory.name, "MOCK"))),
+            ["chart.png", "data.csv"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
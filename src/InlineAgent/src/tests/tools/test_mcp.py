@@ -0,0 +1,194 @@
+import asyncio
+import base64
+import unittest
+from unittest import mock
+
+from mcp.types import (
+    BlobResourceContents,
+    CallToolResult,
+    EmbeddedResource,
+    ImageContent,
+    TextContent,
+    TextResourceContents,
+)
+
+from InlineAgent.agent import ProcessROC
+from InlineAgent.tools import MCPServer, MCPServerPool
+from InlineAgent.tools.mcp import MCPTimeoutError, MCPToolError, to_tool_result
+from InlineAgent.types import MCPCallConfig, ToolResult
+from tests.tools.test_mcp_pool import create_server, memory_transport
+
+PNG = b"\x89PNG image"
+
+
+class TestToolResult(unittest.TestCase):
+
+    def test_text_only_results_stay_strings(self):
+        result = CallToolResult(
+            content=[
+                TextContent(type="text", text="first"),
+                TextContent(type="text", text="second"),
+            ]
+        )
+
+        self.assertEqual(to_tool_result(result), "first\nsecond")
+
+    def test_images_and_resources_are_kept(self):
+        result = CallToolResult(
+            content=[
+                TextContent(type="text", text="chart"),
+                ImageContent(
+                    type="image",
+                    data=base64.b64encode(PNG).decode(),
+                    mimeType="image/png",
+                ),
+                EmbeddedResource(
+                    type="resource",
+                    resource=TextResourceContents(
+                        uri="file:///notes.txt", mimeType="text/plain", text="notes"
+                    ),
+                ),
+                EmbeddedResource(
+                    type="resource",
+                    resource=BlobResourceContents(
+                        uri="file:///data.bin",
+                        mimeType="application/octet-stream",
+                        blob=base64.b64encode(b"\x00").decode(),
+                    ),
+                ),
+            ]
+        )
+
+        tool_result = to_tool_result(result)
+
+        self.assertIsInstance(tool_result, ToolResult)
+        self.assertEqual(
+            tool_result.body,
+            "chart\nnotes\n[resource file:///data.bin (application/octet-stream)]",
+        )
+        self.assertEqual(
+            tool_result.images, [{"format": "png", "source": {"bytes": PNG}}]
+        )
+
+    def test_error_results_raise(self):
+        result = CallToolResult(
+            content=[TextContent(type="text", text="boom")], isError=True
+        )
+
+        with self.assertRaisesRegex(MCPToolError, "boom"):
+            to_tool_result(result)
+
+
+class TestCallTool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = create_server()
+        self.calls = 0
+
+        @self.server.tool()
+        async def slow_once() -> str:
+            """Hangs on the first call"""
+            self.calls += 1
+            if self.calls == 1:
+                await asyncio.sleep(10)
+            return "done"
+
+        @self.server.tool()
+        async def failing() -> str:
+            """Always fails"""
+            raise ValueError("boom")
+
+        self.pool = MCPServerPool()
+        self.addAsyncCleanup(self.pool.close)
+        with mock.patch("builtins.print"):
+            self.client = await MCPServer.from_pool(
+                pool=self.pool,
+                server_key="mock",
+                transport=memory_transport(self.server),
+                call_config=MCPCallConfig(timeout=0.1, max_retries=1, backoff=0.01),
+            )
+
+    async def test_timed_out_attempt_is_retried(self):
+        self.assertEqual(await self.client.callable_tools["slow_once"](), "done")
+        self.assertEqual(self.calls, 2)
+
+    async def test_timeout_without_retries_raises(self):
+        self.client.call_overrides["slow_once"] = MCPCallConfig(timeout=0.1)
+
+        with self.assertRaisesRegex(
+            MCPTimeoutError, "timed out after 1 attempts of 0.1 seconds"
+        ):
+            await self.client.callable_tools["slow_once"]()
+
+    async def process_roc(self, function: str) -> dict:
+        session_state = await ProcessROC.process_roc(
+            inlineSessionState=dict(),
+            roc_event={
+                "invocationInputs": [
+                    {
+                        "functionInvocationInput": {
+                            "actionGroup": "MCP",
+                            "parameters": [],
+                            "function": function,
+                            "actionInvocationType": "RESULT",
+                            "agentId": "INLINE_AGENT",
+                        }
+                    }
+                ],
+                "invocationId": "MOCKID",
+            },
+            tool_map=self.client.callable_tools,
+            event_sink=mock.MagicMock(enabled=False),
+        )
+        return session_state["returnControlInvocationResults"][0]["functionResult"]
+
+    async def test_error_result_reaches_the_agent_as_text(self):
+        function_result = await self.process_roc("failing")
+
+        self.assertEqual(function_result["responseState"], "FAILURE")
+        self.assertIsInstance(function_result["responseBody"]["TEXT"]["body"], str)
+        self.assertIn("boom", function_result["responseBody"]["TEXT"]["body"])
+
+    async def test_timed_out_call_reports_its_own_timeout(self):
+        self.client.call_overrides["slow_once"] = MCPCallConfig(timeout=0.1)
+
+        function_result = await self.process_roc("slow_once")
+
+        self.assertEqual(function_result["responseState"], "FAILURE")
+        self.assertEqual(
+            function_result["responseBody"]["TEXT"]["body"],
+            "MCP tool slow_once timed out after 1 attempts of 0.1 seconds",
+        )
+
+
+class TestToolResultInROC(unittest.IsolatedAsyncioTestCase):
+
+    async def test_images_reach_the_roc_result(self):
+        async def tool():
+            return ToolResult(
+                body="chart", images=[{"format": "png", "source": {"bytes": PNG}}]
+            )
+
+        result = await ProcessROC.invoke_roc_function(
+            functionInvocationInput={
+                "actionGroup": "Charts",
+                "agentId": "INLINE_AGENT",
+                "function": "tool",
+            },
+            tool_to_invoke=tool,
+            event_sink=mock.MagicMock(enabled=False),
+        )
+
+        self.assertEqual(
+            result["responseBody"],
+            {
+                "TEXT": {
+                    "body": "chart",
+                    "images": [{"format": "png", "source": {"bytes": PNG}}],
+                }
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import unittest
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import anyio
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.shared.memory import create_client_server_memory_streams
+from mcp.types import ListToolsRequest
+
+from InlineAgent.tools import MCPServer, MCPServerPool
+
+
+def create_server():
+    server = FastMCP("mock")
+    server.connections = 0
+    server.list_tools_calls = 0
+
+    @server.tool()
+    async def add(a: int, b: int) -> str:
+        """Add two numbers"""
+        await asyncio.sleep(0.01)
+        return str(a + b)
+
+    @server.tool()
+    async def add_tool(ctx: Context) -> str:
+        """Register another tool"""
+        server.add_tool(lambda: "pong", name="ping", description="Ping")
+        await ctx.session.send_tool_list_changed()
+        return "added"
+
+    handlers = server._mcp_server.request_handlers
+    list_tools = handlers[ListToolsRequest]
+
+    async def counting_list_tools(request):
+        server.list_tools_calls += 1
+        return await list_tools(request)
+
+    handlers[ListToolsRequest] = counting_list_tools
+    return server
+
+
+def memory_transport(server):
+    """Serve ``server`` over in-memory streams, counting connections."""
+
+    @asynccontextmanager
+    async def transport():
+        server.connections += 1
+        async with create_client_server_memory_streams() as (client, server_streams):
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(
+                    lambda: server._mcp_server.run(
+                        server_streams[0],
+                        server_streams[1],
+                        server._mcp_server.create_initialization_options(),
+                    )
+                )
+                yield client
+                task_group.cancel_scope.cancel()
+
+    return transport
+
+
+logging.getLogger("mcp").setLevel(logging.WARNING)
+
+
+class TestMCPServerPool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = create_server()
+        self.pool = MCPServerPool(max_sessions=2)
+        self.addAsyncCleanup(self.pool.close)
+        self.print = mock.patch("builtins.print").start()
+        self.addCleanup(mock.patch.stopall)
+
+    async def create_client(self, tools_to_use=set()):
+        return await MCPServer.from_pool(
+            pool=self.pool,
+            server_key="mock",
+            transport=memory_transport(self.server),
+            tools_to_use=tools_to_use,
+        )
+
+    async def test_clients_share_a_warm_session(self):
+        first = await self.create_client()
+        second = await self.create_client(tools_to_use={"add"})
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.list_tools_calls, 1)
+        self.assertEqual(
+            [f["name"] for f in second.function_schema["functions"]], ["add"]
+        )
+        self.assertEqual(
+            first.function_schema["functions"][0]["parameters"]["a"],
+            {"description": "a", "type": "integer", "required": True},
+        )
+        self.assertEqual(await second.callable_tools["add"](a=1, b=2), "3")
+
+    async def test_concurrent_calls_use_bounded_sessions(self):
+        client = await self.create_client()
+
+        results = await asyncio.gather(
+            *[client.callable_tools["add"](a=i, b=1) for i in range(10)]
+        )
+
+        self.assertEqual(results, [str(i + 1) for i in range(10)])
+        self.assertEqual(len(self.pool.sessions("mock")), 2)
+        self.assertEqual(self.server.connections, 2)
+
+    async def test_tool_list_changed_invalidates_cache(self):
+        client = await self.create_client()
+        self.assertNotIn("ping", client.callable_tools)
+
+        await client.callable_tools["add_tool"]()
+        await client.refresh_tools()
+
+        self.assertIn("ping", client.callable_tools)
+        self.assertEqual(self.server.list_tools_calls, 2)
+
+    async def test_closed_pool_reconnects(self):
+        client = await self.create_client()
+        await self.pool.close()
+
+        self.assertEqual(await client.callable_tools["add"](a=2, b=2), "4")
+        self.assertEqual(self.server.connections, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
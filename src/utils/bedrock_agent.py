@@ -33,24 +33,72 @@ from dataclasses import dataclass
 from typing import Self, Callable, Union
 from enum import Enum
 import yaml
-from src.utils.bedrock_agent_helper import AgentsForAmazonBedrock
+from src.utils.bedrock_agent_helper import (
+    AgentsForAmazonBedrock,
+    get_account_id,
+    get_boto3_client,
+    get_region,
+)
 import json
+import functools
+
+
+# Importing this module makes no AWS calls: the shared helper and clients are
+# proxies that create the real object on first attribute access, and region,
+# account_id, suffix and bucket_name are resolved by __getattr__ when first read.
+@functools.lru_cache(maxsize=None)
+def get_agents_helper() -> AgentsForAmazonBedrock:
+    """Returns the shared AgentsForAmazonBedrock, created on first use."""
+    print(f"boto3 version: {boto3.__version__}")
+    return AgentsForAmazonBedrock()
+
+
+class _LazyProxy:
+    """Forwards attribute access to the object returned by a provider."""
+
+    def __init__(self, provider: Callable):
+        object.__setattr__(self, "_provider", provider)
+
+    def __getattr__(self, name):
+        return getattr(self._provider(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._provider(), name, value)
 
-print(f"boto3 version: {boto3.__version__}")
 
 # Clients
-s3_client = boto3.client("s3")
-sts_client = boto3.client("sts")
-bedrock_agent_client = boto3.client("bedrock-agent")
-bedrock_agent_runtime_client = boto3.client("bedrock-agent-runtime")
-bedrock_client = boto3.client("bedrock")
-agents_helper = AgentsForAmazonBedrock()
-
-region = agents_helper.get_region()
-account_id = sts_client.get_caller_identity()["Account"]
-
-suffix = f"{region}-{account_id}"
-bucket_name = f"mac-workshop-{suffix}"
+s3_client = _LazyProxy(lambda: get_boto3_client("s3"))
+sts_client = _LazyProxy(lambda: get_boto3_client("sts"))
+bedrock_agent_client = _LazyProxy(lambda: get_boto3_client("bedrock-agent"))
+bedrock_agent_runtime_client = _LazyProxy(
+    lambda: get_boto3_client("bedrock-agent-runtime")
+)
+bedrock_client = _LazyProxy(lambda: get_boto3_client("bedrock"))
+agents_helper = _LazyProxy(get_agents_helper)
+
+
+def get_suffix() -> str:
+    return f"{get_region()}-{get_account_id()}"
+
+
+def get_bucket_name() -> str:
+    return f"mac-workshop-{get_suffix()}"
+
+
+_LAZY_VALUES = {
+    "region": get_region,
+    "account_id": get_account_id,
+    "suffix": get_suffix,
+    "bucket_name": get_bucket_name,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_VALUES:
+        return _LAZY_VALUES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 agent_foundation_models = [
     "us.anthropic.claude-3-haiku-20240307-v1:0",
     "us.anthropic.claude-3-sonnet-20240307-v1:0",
@@ -293,8 +341,11 @@ class Agent:
         kb_descr: str = " ",
         llm: str = None,
         verbose: bool = False,
+        force_recreate: bool = None,
     ):
         self.name = name
+        if force_recreate is None:
+            force_recreate = Agent.default_force_recreate
 
         self.role = yaml_content[name]["role"]
         self.goal = yaml_content[name]["goal"]
@@ -330,7 +381,7 @@ class Agent:
         else:
             self.llm = DEFAULT_AGENT_MODEL
 
-        if not Agent.default_force_recreate:
+        if not force_recreate:
             # if the agent already exists, get its agent_id and move on.
             try:
                 self.agent_id = agents_helper.get_agent_id_by_name(self.name)
@@ -356,7 +407,6 @@ class Agent:
             try:
                 agents_helper.delete_lambda(f"{self.name}_ag")
                 agents_helper.delete_agent(self.name, verbose=True)
-                time.sleep(4)
             except:
                 pass
 
@@ -442,11 +492,9 @@ class Agent:
         )  # wait to be out of "Versioning" state
         agents_helper.prepare(self.name)
         agents_helper.wait_agent_status_update(self.agent_id)
-        _agent_alias = agents_helper._bedrock_agent_client.create_agent_alias(
-            agentAliasName="with-code-ag", agentId=self.agent_id
+        self.agent_alias_id, self.agent_alias_arn = agents_helper.create_agent_alias(
+            self.agent_id, "with-code-ag"
         )
-        self.agent_alias_id = _agent_alias["agentAlias"]["agentAliasId"]
-        self.agent_alias_arn = _agent_alias["agentAlias"]["agentAliasArn"]
 
         agents_helper.wait_agent_status_update(
             self.agent_id
@@ -469,7 +517,7 @@ class Agent:
 
     def needs_preparation(self) -> bool:
         """Return True if the agent needs to be prepared"""
-        bedrock_agent = boto3.client("bedrock-agent")
+        bedrock_agent = get_boto3_client("bedrock-agent")
         response = bedrock_agent.get_agent(agentId=self.agent_id)
         agent_info = response["agent"]
 
@@ -487,11 +535,9 @@ class Agent:
         if self.needs_preparation():
             agents_helper.prepare(self.name)
             agents_helper.wait_agent_status_update(self.agent_id)
-            _agent_alias = agents_helper._bedrock_agent_client.create_agent_alias(
-                agentAliasName=alias, agentId=self.agent_id
+            self.agent_alias_id, self.agent_alias_arn = (
+                agents_helper.create_agent_alias(self.agent_id, alias)
             )
-            self.agent_alias_id = _agent_alias["agentAlias"]["agentAliasId"]
-            self.agent_alias_arn = _agent_alias["agentAlias"]["agentAliasArn"]
         else:
             print("Agent already prepared")
 
@@ -799,8 +845,11 @@ class SupervisorAgent:
         kb_descr: str = " ",
         llm: str = None,
         verbose: bool = False,
+        force_recreate: bool = None,
     ):
         self.name = name
+        if force_recreate is None:
+            force_recreate = Agent.default_force_recreate
 
         if "collaboration_type" in yaml_content[name]:
             self.collaboration_type = yaml_content[name]["collaboration_type"]
@@ -836,7 +885,7 @@ class SupervisorAgent:
         self.supervisor_agent_alias_id = None
         self.supervisor_agent_alias_arn = None
 
-        if not Agent.default_force_recreate:
+        if not force_recreate:
             # if the supervisor agent already exists, get its agent_id and move on.
             try:
                 if verbose:
@@ -919,7 +968,6 @@ class SupervisorAgent:
         # clean up existing supervisor if needed
         agents_helper.delete_lambda(f"{name}_lambda")
         agents_helper.delete_agent(name, verbose=True)
-        time.sleep(4)
 
         # create the supervisor
         if llm is not None:
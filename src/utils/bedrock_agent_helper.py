@@ -8,9 +8,11 @@ It includes methods for creating, updating, and invoking Agents, as well as mana
 IAM roles and Lambda functions for action groups.
 """
 import copy
+import functools
 
 import boto3
 import json
+import random
 import time
 import uuid
 import zipfile
@@ -22,10 +24,13 @@ from typing import List, Dict, Tuple
 import re
 from boto3.session import Session
 from botocore.config import Config
+from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
 import inspect
+from threading import RLock
 from typing import Callable
 from textwrap import dedent
+from dataclasses import dataclass
 
 # import matplotlib.pyplot as plt
 # import matplotlib.image as mpimg
@@ -119,35 +124,942 @@ DEFAULT_AGENT_IAM_POLICY = {
     ],
 }
 
+MAX_POOL_CONNECTIONS = 50
+
+# Shared boto3 clients, keyed by service, region and client config. boto3 clients
+# are thread safe, so every AgentsForAmazonBedrock instance (and the module level
+# helpers in bedrock_agent.py) reuse the same connection pools instead of
+# resolving credentials and opening new TLS connections per instance.
+_clients_lock = RLock()
+_clients = {}
+_account_ids = {}
+
+
+def get_boto3_client(service_name: str, region_name: str = None, **config_options):
+    """Returns a shared boto3 client, creating it on first use.
+
+    Args:
+        service_name (str): AWS service name, e.g. bedrock-agent
+        region_name (str, Optional): Region of the client. Defaults to the session region
+        config_options: Keyword arguments for botocore.config.Config, part of the cache key
+
+    Returns:
+        A boto3 client shared by every caller with the same arguments
+    """
+    config_options.setdefault("max_pool_connections", MAX_POOL_CONNECTIONS)
+    config_options.setdefault("tcp_keepalive", True)
+    _key = (service_name, region_name, json.dumps(config_options, sort_keys=True))
+    _client = _clients.get(_key)
+    if _client is None:
+        with _clients_lock:
+            _client = _clients.get(_key)
+            if _client is None:
+                _client = boto3.client(
+                    service_name,
+                    region_name=region_name,
+                    config=Config(**config_options),
+                )
+                _clients[_key] = _client
+    return _client
+
+
+def get_account_id() -> str:
+    """Returns the AWS account id of the current credentials, calling STS only once."""
+    if "account_id" not in _account_ids:
+        with _clients_lock:
+            if "account_id" not in _account_ids:
+                _account_ids["account_id"] = get_boto3_client(
+                    "sts"
+                ).get_caller_identity()["Account"]
+    return _account_ids["account_id"]
+
+
+@functools.lru_cache(maxsize=None)
+def get_boto3_session() -> Session:
+    """Returns the shared boto3 Session, created on first use."""
+    return Session()
+
+
+def get_region() -> str:
+    """Returns the region of the default boto3 session, without any network call."""
+    return get_boto3_session().region_name
+
+
+WAITER_INITIAL_DELAY = 0.5
+WAITER_MAX_DELAY = 8
+WAITER_TIMEOUT = 600
+# IAM changes take a few seconds to reach Bedrock and Lambda
+ROLE_PROPAGATION_TIMEOUT = 90
+ROLE_PROPAGATION_ERROR_CODES = {
+    "InvalidParameterValueException",
+    "ValidationException",
+    "AccessDeniedException",
+}
+
+
+class WaiterTimeoutError(TimeoutError):
+    """Raised when a resource does not reach the expected state before the deadline."""
+
+
+def wait_until(
+    poll: Callable,
+    is_done: Callable = bool,
+    description: str = "resource",
+    timeout: float = WAITER_TIMEOUT,
+    initial_delay: float = WAITER_INITIAL_DELAY,
+    max_delay: float = WAITER_MAX_DELAY,
+    is_retryable: Callable = None,
+    sleep: Callable = time.sleep,
+    clock: Callable = time.monotonic,
+):
+    """Calls poll until is_done accepts its result, and returns that result.
+
+    The first call is made right away. Between calls the delay doubles from
+    initial_delay up to max_delay, with random jitter between half and all of
+    it, so several waiters do not poll in lockstep.
+
+    Args:
+        poll (Callable): Zero argument callable, usually a describe/get API call
+        is_done (Callable, Optional): Predicate on the result of poll. Defaults to truthiness
+        description (str, Optional): What is waited for, used in the timeout message
+        timeout (float, Optional): Seconds before WaiterTimeoutError is raised
+        initial_delay (float, Optional): Delay after the first call, in seconds
+        max_delay (float, Optional): Largest delay between calls, in seconds
+        is_retryable (Callable, Optional): Predicate on an exception raised by poll.
+            Matching exceptions count as not done yet, others are raised
+        sleep (Callable, Optional): Used to wait between calls, replaceable in tests
+        clock (Callable, Optional): Monotonic clock for the deadline, replaceable in tests
+
+    Returns:
+        The first result of poll accepted by is_done
+    """
+    deadline = clock() + timeout
+    delay = initial_delay
+    last_error = None
+    while True:
+        try:
+            result = poll()
+        except Exception as e:
+            if is_retryable is None or not is_retryable(e):
+                raise
+            last_error = e
+        else:
+            if is_done(result):
+                return result
+        remaining = deadline - clock()
+        if remaining <= 0:
+            raise WaiterTimeoutError(
+                f"Timed out after {timeout}s waiting for {description}"
+            ) from last_error
+        sleep(min(remaining, random.uniform(delay / 2, delay)))
+        delay = min(delay * 2, max_delay)
+
+
+def is_error_code(error: Exception, *codes: str) -> bool:
+    """Returns True for a botocore ClientError with one of the given error codes."""
+    return (
+        isinstance(error, ClientError)
+        and error.response.get("Error", {}).get("Code") in codes
+    )
+
+
+def is_role_propagation_error(error: Exception) -> bool:
+    """Returns True when a call failed because a new IAM role is not usable yet."""
+    return (
+        is_error_code(error, *ROLE_PROPAGATION_ERROR_CODES)
+        and "role" in str(error).lower()
+    )
+
+
+AGENT_REGISTRY_TTL = 60
+# Least seconds between two listings caused by names that are not found
+AGENT_REGISTRY_MISS_REFRESH_INTERVAL = 5
+
+
+class AgentRegistry:
+    """In-process index of agents and their aliases, by name and by id.
+
+    The first lookup pages through all agents once. Later lookups are served
+    from the index until it is older than ttl seconds, when it is listed again.
+    Agents and aliases created or deleted through AgentsForAmazonBedrock update
+    the index in place, and a name that is not found triggers a refresh so
+    agents created elsewhere are still found, at most once every
+    miss_refresh_interval seconds so polling for a missing name stays cheap.
+    Aliases are listed per agent on first use, with the same ttl.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        ttl: float = AGENT_REGISTRY_TTL,
+        clock=time.monotonic,
+        miss_refresh_interval: float = AGENT_REGISTRY_MISS_REFRESH_INTERVAL,
+    ):
+        """Constructs a registry.
+
+        Args:
+            client (Optional): bedrock-agent client. Defaults to the shared one
+            ttl (float, Optional): Seconds before the index is listed again
+            clock (Callable, Optional): Monotonic clock, replaceable in tests
+            miss_refresh_interval (float, Optional): Least seconds between refreshes for names not found
+        """
+        self._client = client
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._clock = clock
+        self._lock = RLock()
+        self._agents_by_id = {}
+        self._agent_ids_by_name = {}
+        self._agents_refreshed_at = None
+        # agent id -> (refreshed at, {alias id: alias summary})
+        self._aliases = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_boto3_client("bedrock-agent")
+        return self._client
+
+    def _is_stale(self, refreshed_at, max_age: float = None) -> bool:
+        if max_age is None:
+            max_age = self.ttl
+        return refreshed_at is None or self._clock() - refreshed_at > max_age
+
+    def refresh(self) -> None:
+        """Lists every page of agents and rebuilds the index."""
+        _refreshed_at = self._clock()
+        _agents = [
+            _summary
+            for _page in self.client.get_paginator("list_agents").paginate()
+            for _summary in _page["agentSummaries"]
+        ]
+        with self._lock:
+            self._agents_by_id = {_agent["agentId"]: _agent for _agent in _agents}
+            self._agent_ids_by_name = {
+                _agent["agentName"]: _agent["agentId"] for _agent in _agents
+            }
+            for _agent_id in set(self._aliases) - set(self._agents_by_id):
+                del self._aliases[_agent_id]
+            self._agents_refreshed_at = _refreshed_at
+
+    def _ensure_fresh(self) -> None:
+        """Refreshes the index when it is stale."""
+        if self._is_stale(self._agents_refreshed_at):
+            self.refresh()
+
+    def find_agent(self, agent_name: str) -> Dict:
+        """Returns the summary of the agent with this name, or None if there is none."""
+        self._ensure_fresh()
+        _agent_id = self._agent_ids_by_name.get(agent_name)
+        if _agent_id is None and self._is_stale(
+            self._agents_refreshed_at, self.miss_refresh_interval
+        ):
+            self.refresh()
+            _agent_id = self._agent_ids_by_name.get(agent_name)
+        return self._agents_by_id.get(_agent_id)
+
+    def get_agent(self, agent_id: str) -> Dict:
+        """Returns the summary of the agent with this id, or None if there is none."""
+        self._ensure_fresh()
+        return self._agents_by_id.get(agent_id)
+
+    def put_agent(self, agent: Dict) -> None:
+        """Adds or replaces an agent, e.g. from a create_agent response."""
+        with self._lock:
+            _previous = self._agents_by_id.get(agent["agentId"])
+            if _previous is not None:
+                self._agent_ids_by_name.pop(_previous["agentName"], None)
+            self._agents_by_id[agent["agentId"]] = agent
+            self._agent_ids_by_name[agent["agentName"]] = agent["agentId"]
+
+    def remove_agent(self, agent_id: str) -> None:
+        with self._lock:
+            _agent = self._agents_by_id.pop(agent_id, None)
+            if _agent is not None:
+                self._agent_ids_by_name.pop(_agent["agentName"], None)
+            self._aliases.pop(agent_id, None)
+
+    def aliases(self, agent_id: str) -> List[Dict]:
+        """Returns the alias summaries of an agent, listing every page when not cached."""
+        _cached = self._aliases.get(agent_id)
+        if _cached is None or self._is_stale(_cached[0]):
+            _refreshed_at = self._clock()
+            _aliases = {
+                _summary["agentAliasId"]: _summary
+                for _page in self.client.get_paginator("list_agent_aliases").paginate(
+                    agentId=agent_id
+                )
+                for _summary in _page["agentAliasSummaries"]
+            }
+            with self._lock:
+                self._aliases[agent_id] = (_refreshed_at, _aliases)
+            _cached = self._aliases[agent_id]
+        return list(_cached[1].values())
+
+    def put_alias(self, agent_id: str, alias: Dict) -> None:
+        """Adds or replaces an alias, e.g. from a create_agent_alias response."""
+        with self._lock:
+            if agent_id in self._aliases:
+                self._aliases[agent_id][1][alias["agentAliasId"]] = alias
+
+    def remove_alias(self, agent_id: str, agent_alias_id: str) -> None:
+        with self._lock:
+            if agent_id in self._aliases:
+                self._aliases[agent_id][1].pop(agent_alias_id, None)
+
+    def invalidate(self) -> None:
+        """Drops everything, so the next lookup lists agents again."""
+        with self._lock:
+            self._agents_by_id = {}
+            self._agent_ids_by_name = {}
+            self._agents_refreshed_at = None
+            self._aliases = {}
+
+
+_agent_registry = None
+
+
+def get_agent_registry() -> AgentRegistry:
+    """Returns the process wide AgentRegistry, created on first use."""
+    global _agent_registry
+    if _agent_registry is None:
+        with _clients_lock:
+            if _agent_registry is None:
+                _agent_registry = AgentRegistry()
+    return _agent_registry
+
+
+def _routing_classification(route: Dict) -> str:
+    """Returns the collaborator chosen by a routingClassifierTrace model output."""
+    _content = json.loads(route["modelInvocationOutput"]["rawResponse"]["content"])
+    if "content" in _content.keys():
+        _classification = _content["content"][0]["text"]
+    else:
+        _classification = _content["output"]["message"]["content"][0]["text"]
+    return _classification.replace("<a>", "").replace("</a>", "")
+
+
+# Events yielded by AgentsForAmazonBedrock.invoke_stream, in the order they arrive.
+@dataclass
+class InvokeStarted:
+    agent_id: str
+    agent_alias_id: str
+    session_id: str
+    request_id: str
+    # the invoke_agent response, including its ResponseMetadata
+    response: Dict
+
+
+@dataclass
+class TextDelta:
+    text: str
+    # number of the chunk in the answer, starting at 0
+    index: int
+    # seconds since the stream started
+    elapsed: float
+    # keys of the chunk event, "attribution" when it carries citations
+    chunk_keys: List[str] = None
+
+
+@dataclass
+class Citations:
+    citations: List[Dict]
+
+
+@dataclass
+class TraceStep:
+    # the raw trace event, with its callerChain and trace keys
+    trace: Dict
+    # alias id ("<agent id>/<alias id>") of the sub-agent that produced the trace, if any
+    sub_agent_alias_id: str = None
+
+
+@dataclass
+class SubAgentRouting:
+    collaborator_name: str
+    # "routing_classifier" or "orchestration"
+    source: str
+    collaborator_alias_arn: str = None
+    input_text: str = None
+
+
+@dataclass
+class Usage:
+    input_tokens: int
+    output_tokens: int
+    # "routing", "pre_processing", "orchestration" or "post_processing"
+    source: str
+
+
+@dataclass
+class AgentFiles:
+    files: List[Dict]
+
+
+@dataclass
+class InvokeCompleted:
+    # the full answer, with citations expanded when the agent returned any
+    answer: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    llm_calls: int = 0
+    duration: float = 0.0
+    time_to_first_token: float = None
+    # set when invoke_agent did not return HTTP 200; answer then holds the message
+    error: str = None
+    # the answer as streamed, before citations were expanded
+    raw_answer: str = None
+    citations: List[Dict] = None
+
+
+_USAGE_TRACES = {
+    "routingClassifierTrace": "routing",
+    "preProcessingTrace": "pre_processing",
+    "orchestrationTrace": "orchestration",
+    "postProcessingTrace": "post_processing",
+}
+
+
+class TracePrinter:
+    """Prints the events of AgentsForAmazonBedrock.invoke_stream the way invoke traces an agent.
+
+    Args:
+        trace_level (str, optional): "core", "outline" or "all". Defaults to "core".
+        multi_agent_names (dict, optional): Agent names by alias id ("<agent id>/<alias id>"), used to name sub-agents.
+        stream_final_response (bool, optional): Whether the final response is streamed, to report time to first token.
+    """
+
+    def __init__(
+        self,
+        trace_level: str = "core",
+        multi_agent_names: dict = None,
+        stream_final_response: bool = False,
+    ):
+        self.trace_level = trace_level
+        self.multi_agent_names = multi_agent_names or {}
+        self.stream_final_response = stream_final_response
+        self._orch_step = 0
+        self._sub_step = 0
+        self._sub_agent_name = "<collab-name-not-yet-provided>"
+        self._time_before_orchestration = datetime.datetime.now()
+        self._time_before_routing = None
+
+    def handle(self, event) -> None:
+        if isinstance(event, InvokeStarted):
+            self.on_started(event)
+        elif isinstance(event, TextDelta):
+            self.on_text(event)
+        elif isinstance(event, Citations):
+            if self.trace_level == "all":
+                print(colored(f"Citations: {event.citations}", "blue"))
+        elif isinstance(event, TraceStep):
+            self.on_trace(event)
+        elif isinstance(event, AgentFiles):
+            self.on_files(event)
+        elif isinstance(event, InvokeCompleted):
+            self.on_completed(event)
+
+    def on_started(self, event: InvokeStarted) -> None:
+        if self.trace_level == "all":
+            print(f"invokeAgent API response object: {event.response}")
+        else:
+            print(f"invokeAgent API request ID: {event.request_id}")
+            print(f"invokeAgent API session ID: {event.session_id}")
+            print(
+                f"  agent id: {event.agent_id}, agent alias id: {event.agent_alias_id}"
+            )
+        self._time_before_orchestration = datetime.datetime.now()
+
+    def on_text(self, event: TextDelta) -> None:
+        if self.trace_level == "all":
+            print(
+                f"tmp answer: '{event.text}', streaming: {self.stream_final_response}, trace: True"
+            )
+        if event.index == 0 and self.stream_final_response:
+            print(
+                colored(
+                    f"Time to first token: {event.elapsed:,.1f}s\n",
+                    "yellow",
+                )
+            )
+        if self.stream_final_response and event.index < 2:
+            print(
+                colored(
+                    f"Answer chunk [{event.index + 1}]: {event.text}",
+                    "blue",
+                )
+            )
+
+        # print all keys in the chunk event if more than just 'bytes' provided
+        if self.trace_level == "all" and len(event.chunk_keys or []) > 1:
+            print(f"chunk keys beyond just 'bytes': {event.chunk_keys}")
+
+    def on_trace(self, event: TraceStep) -> None:
+        trace = event.trace
+        # set when the trace comes from a sub-agent, from the trace's callerChain
+        _sub_agent_alias_id = None
+        if self.trace_level == "all":
+            print("---")
+        elif event.sub_agent_alias_id is not None:
+            _sub_agent_alias_id = event.sub_agent_alias_id
+            self._sub_agent_name = self.multi_agent_names.get(
+                _sub_agent_alias_id, self._sub_agent_name
+            )
+
+        if "routingClassifierTrace" in trace["trace"]:
+            _route = trace["trace"]["routingClassifierTrace"]
+
+            if "modelInvocationInput" in _route:
+                self._orch_step += 1
+                print(colored(f"---- Step {self._orch_step} ----", "green"))
+                self._time_before_routing = datetime.datetime.now()
+                print(
+                    colored(
+                        "Classifying request to immediately route to one collaborator if possible.",
+                        "blue",
+                    )
+                )
+
+            if "modelInvocationOutput" in _route:
+                _llm_usage = _route["modelInvocationOutput"]["metadata"]["usage"]
+                _in_tokens = _llm_usage["inputTokens"]
+
+                _out_tokens = _llm_usage["outputTokens"]
+
+                _route_duration = datetime.datetime.now() - self._time_before_routing
+
+                # _raw_resp_str = _route["modelInvocationOutput"][
+                #     "rawResponse"
+                # ]["content"]
+                # _raw_resp = json.loads(_raw_resp_str)
+                # _classification = (
+                #     _raw_resp["content"][0]["text"]
+                #     .replace("<a>", "")
+                #     .replace("</a>", "")
+                # )
+
+                _classification = _routing_classification(_route)
+
+                if _classification == UNDECIDABLE_CLASSIFICATION:
+                    print(
+                        colored(
+                            f"Routing classifier did not find a matching collaborator. Reverting to 'SUPERVISOR' mode.",
+                            "magenta",
+                        )
+                    )
+                elif _classification == "keep_previous_agent":
+                    print(
+                        colored(
+                            f"Continuing conversation with previous collaborator.",
+                            "magenta",
+                        )
+                    )
+                    # # since we replaced the typical orchestration step with a simple routing
+                    # # classification, bump the step count.
+                    # self._orch_step += 1
+                else:
+                    self._sub_agent_name = _classification
+                    print(
+                        colored(
+                            f"Routing classifier chose collaborator: '{_classification}'",
+                            "magenta",
+                        )
+                    )
+                    # # since we replaced the typical orchestration step with a simple routing
+                    # # classification, bump the step count.
+                    # self._orch_step += 1
+                print(
+                    colored(
+                        f"Routing classifier took {_route_duration.total_seconds():,.1f}s, using {_in_tokens+_out_tokens} tokens (in: {_in_tokens}, out: {_out_tokens}).\n",
+                        "yellow",
+                    )
+                )
+
+        if "failureTrace" in trace["trace"]:
+            print(
+                colored(
+                    f"Agent error: {trace['trace']['failureTrace']['failureReason']}",
+                    "red",
+                )
+            )
+
+        if "orchestrationTrace" in trace["trace"]:
+            _orch = trace["trace"]["orchestrationTrace"]
+
+            if self.trace_level in ["core", "outline"]:
+                if "rationale" in _orch:
+                    _rationale = _orch["rationale"]
+                    print(colored(f"{_rationale['text']}", "blue"))
+
+                if "invocationInput" in _orch:
+                    # NOTE: when agent determines invocations should happen in parallel
+                    # the trace objects for invocation input still come back one at a time.
+                    _input = _orch["invocationInput"]
+
+                    if "actionGroupInvocationInput" in _input:
+                        if self.trace_level == "outline":
+                            print(
+                                colored(
+                                    f"Using tool: {_input['actionGroupInvocationInput']['function']}",
+                                    "magenta",
+                                )
+                            )
+                        else:
+                            if "function" not in _input["actionGroupInvocationInput"]:
+                                print(
+                                    colored(
+                                        f"EXPECTING to capture 'Using tool', but 'function' not found\n{_input['actionGroupInvocationInput']}",
+                                        "red",
+                                    )
+                                )
+                            else:
+                                print(
+                                    colored(
+                                        f"Using tool: {_input['actionGroupInvocationInput']['function']} with these inputs:",
+                                        "magenta",
+                                    )
+                                )
+                                if "parameters" in _input["actionGroupInvocationInput"]:
+                                    if (
+                                        len(
+                                            _input["actionGroupInvocationInput"][
+                                                "parameters"
+                                            ]
+                                        )
+                                        == 1
+                                    ) and (
+                                        _input["actionGroupInvocationInput"][
+                                            "parameters"
+                                        ][0]["name"]
+                                        == "input_text"
+                                    ):
+                                        print(
+                                            colored(
+                                                f"{_input['actionGroupInvocationInput']['parameters'][0]['value']}",
+                                                "magenta",
+                                            )
+                                        )
+                                    else:
+                                        print(
+                                            colored(
+                                                f"{_input['actionGroupInvocationInput']['parameters']}\n",
+                                                "magenta",
+                                            )
+                                        )
+                                else:
+                                    print(
+                                        colored(
+                                            f"    no input parameters being sent\n",
+                                            "magenta",
+                                        )
+                                    )
+
+                    elif "agentCollaboratorInvocationInput" in _input:
+                        _collab_name = _input["agentCollaboratorInvocationInput"][
+                            "agentCollaboratorName"
+                        ]
+                        self._sub_agent_name = _collab_name
+                        _collab_input_text = _input["agentCollaboratorInvocationInput"][
+                            "input"
+                        ]["text"]
+                        _collab_arn = _input["agentCollaboratorInvocationInput"][
+                            "agentCollaboratorAliasArn"
+                        ]
+                        _collab_ids = _collab_arn.split("/", 1)[1]
+
+                        if self.trace_level == "outline":
+                            print(
+                                colored(
+                                    f"Using sub-agent collaborator: '{_collab_name} [{_collab_ids}]'",
+                                    "magenta",
+                                )
+                            )
+                        else:
+                            print(
+                                colored(
+                                    f"Using sub-agent collaborator: '{_collab_name} [{_collab_ids}]' passing input text:",
+                                    "magenta",
+                                )
+                            )
+                            print(
+                                colored(
+                                    f"{_collab_input_text[0:TRACE_TRUNCATION_LENGTH]}\n",
+                                    "magenta",
+                                )
+                            )
+
+                    elif "codeInterpreterInvocationInput" in _input:
+                        if self.trace_level == "outline":
+                            print(colored(f"Using code interpreter", "magenta"))
+                        else:
+                            console = Console()
+                            _gen_code = _input["codeInterpreterInvocationInput"]["code"]
+                            _code = f"```python\n{_gen_code}\n```"
+
+                            console.print(Markdown(f"**Generated code**\n{_code}"))
+
+                    elif "knowledgeBaseLookupInput" in _input:
+                        if self.trace_level == "outline":
+                            print(colored(f"Using knowledge base", "magenta"))
+                        else:
+                            _kb_id = _input["knowledgeBaseLookupInput"][
+                                "knowledgeBaseId"
+                            ]
+                            _kb_query = _input["knowledgeBaseLookupInput"]["text"]
+                            print(
+                                colored(
+                                    f"Using knowledge base id: {_kb_id} to search for:",
+                                    "magenta",
+                                )
+                            )
+                            print(colored(f"  {_kb_query}\n", "magenta"))
+
+                if "observation" in _orch:
+                    if self.trace_level == "core":
+                        _output = _orch["observation"]
+                        if "actionGroupInvocationOutput" in _output:
+                            print(
+                                colored(
+                                    f"--tool outputs:\n{_output['actionGroupInvocationOutput']['text'][0:TRACE_TRUNCATION_LENGTH]}...\n",
+                                    "magenta",
+                                )
+                            )
+
+                        if "agentCollaboratorInvocationOutput" in _output:
+                            _collab_name = _output["agentCollaboratorInvocationOutput"][
+                                "agentCollaboratorName"
+                            ]
+                            _collab_output_text = _output[
+                                "agentCollaboratorInvocationOutput"
+                            ]["output"]["text"][0:TRACE_TRUNCATION_LENGTH]
+                            print(
+                                colored(
+                                    f"\n----sub-agent {_collab_name} output text:\n{_collab_output_text}...\n",
+                                    "magenta",
+                                )
+                            )
+
+                        if "knowledgeBaseLookupOutput" in _output:
+                            _refs = _output["knowledgeBaseLookupOutput"][
+                                "retrievedReferences"
+                            ]
+                            _ref_count = len(_refs)
+                            print(
+                                colored(
+                                    f"Knowledge base lookup output, {_ref_count} references:\n",
+                                    "magenta",
+                                )
+                            )
+                            _curr = 1
+                            for _ref in _refs:
+                                print(
+                                    colored(
+                                        f"  ({_curr}) {_ref['content']['text'][0:TRACE_TRUNCATION_LENGTH]}...\n",
+                                        "magenta",
+                                    )
+                                )
+                                _curr += 1
+
+                        if "finalResponse" in _output:
+                            print(
+                                colored(
+                                    f"Final response:\n{_output['finalResponse']['text'][0:TRACE_TRUNCATION_LENGTH]}...",
+                                    "cyan",
+                                )
+                            )
+
+            if "modelInvocationOutput" in _orch:
+                if _sub_agent_alias_id is not None:
+                    self._sub_step += 1
+                    print(
+                        colored(
+                            f"---- Step {self._orch_step}.{self._sub_step} [using sub-agent name:{self._sub_agent_name}, id:{_sub_agent_alias_id}] ----",
+                            "green",
+                        )
+                    )
+                else:
+                    self._orch_step += 1
+                    self._sub_step = 0
+                    print(colored(f"---- Step {self._orch_step} ----", "green"))
+
+                _orch_duration = (
+                    datetime.datetime.now() - self._time_before_orchestration
+                )
+
+                if "metadata" in _orch["modelInvocationOutput"]:
+                    _llm_usage = _orch["modelInvocationOutput"]["metadata"]["usage"]
+                    _in_tokens = _llm_usage["inputTokens"]
+
+                    _out_tokens = _llm_usage["outputTokens"]
+
+                    print(
+                        colored(
+                            f"Took {_orch_duration.total_seconds():,.1f}s, using {_in_tokens+_out_tokens} tokens (in: {_in_tokens}, out: {_out_tokens}) to complete prior action, observe, orchestrate.",
+                            "yellow",
+                        )
+                    )
+                else:
+                    print(
+                        colored(
+                            f"Took {_orch_duration.total_seconds():,.1f}s [token count metadata was not returned] to complete prior action, observe, orchestrate.",
+                            "yellow",
+                        )
+                    )
+
+                # restart the clock for next step/sub-step
+                self._time_before_orchestration = datetime.datetime.now()
+
+        elif "preProcessingTrace" in trace["trace"]:
+            _pre = trace["trace"]["preProcessingTrace"]
+            if "modelInvocationOutput" in _pre:
+                _llm_usage = _pre["modelInvocationOutput"]["metadata"]["usage"]
+                _in_tokens = _llm_usage["inputTokens"]
+
+                _out_tokens = _llm_usage["outputTokens"]
+
+                print(
+                    colored(
+                        "Pre-processing trace, agent came up with an initial plan.",
+                        "yellow",
+                    )
+                )
+                print(
+                    colored(
+                        f"Used LLM tokens, in: {_in_tokens}, out: {_out_tokens}",
+                        "yellow",
+                    )
+                )
+
+        elif "postProcessingTrace" in trace["trace"]:
+            _post = trace["trace"]["postProcessingTrace"]
+            if "modelInvocationOutput" in _post:
+                _llm_usage = _post["modelInvocationOutput"]["metadata"]["usage"]
+                _in_tokens = _llm_usage["inputTokens"]
+
+                _out_tokens = _llm_usage["outputTokens"]
+
+                print(colored("Agent post-processing complete.", "yellow"))
+                print(
+                    colored(
+                        f"Used LLM tokens, in: {_in_tokens}, out: {_out_tokens}",
+                        "yellow",
+                    )
+                )
+
+        if self.trace_level == "all":
+            print(json.dumps(trace, indent=2))
+
+    def on_files(self, event: AgentFiles) -> None:
+        console = Console()
+        console.print(Markdown("**Files**"))
+
+        for this_file in event.files:
+            print(f"{this_file['name']} ({this_file['type']})")
+            file_bytes = this_file["bytes"]
+
+            # save bytes to file, given the name of file and the bytes
+            file_name = os.path.join("output", this_file["name"])
+            with open(file_name, "wb") as f:
+                f.write(file_bytes)
+
+    def on_completed(self, event: InvokeCompleted) -> None:
+        if event.error is not None:
+            if self.trace_level == "all":
+                print(event.error)
+            return
+
+        if self.trace_level in ["core", "outline"]:
+            print(
+                colored(
+                    f"Agent made a total of {event.llm_calls} LLM calls, "
+                    + f"using {event.input_tokens+event.output_tokens} tokens "
+                    + f"(in: {event.input_tokens}, out: {event.output_tokens})"
+                    + f", and took {event.duration:,.1f} total seconds",
+                    "yellow",
+                )
+            )
+
+        if self.trace_level == "all":
+            print(f"Returning agent answer as: {event.raw_answer}")
+            if self.stream_final_response:
+                print(f"\nagent answer: ^^^{event.raw_answer}^^^\n")
+
+        if event.citations:
+            # Only for its trace output, the cited answer is event.answer
+            AgentsForAmazonBedrock._make_fully_cited_answer(
+                event.raw_answer,
+                {"chunk": {"attribution": {"citations": event.citations}}},
+                enable_trace=True,
+                trace_level=self.trace_level,
+            )
+
+
 # # setting logger
 # logging.basicConfig(format='[%(asctime)s] p%(process)s {%(filename)s:%(lineno)d} %(levelname)s - %(message)s', level=logging.INFO)
 # logger = logging.getLogger(__name__)
 
 
 class AgentsForAmazonBedrock:
-    """Provides an easy to use wrapper for Agents for Amazon Bedrock."""
+    """Provides an easy to use wrapper for Agents for Amazon Bedrock.
+
+    Constructing an instance makes no AWS calls: clients, the region and the
+    account id are resolved the first time a method needs them.
+    """
 
     def __init__(self):
         """Constructs an instance."""
-        self._boto_session = Session()
-        self._region = self._boto_session.region_name
-        self._account_id = boto3.client("sts").get_caller_identity()["Account"]
 
-        self._bedrock_agent_client = boto3.client("bedrock-agent")
+    @functools.cached_property
+    def _boto_session(self) -> Session:
+        return get_boto3_session()
 
-        long_invoke_time_config = Config(read_timeout=600)
-        self._bedrock_agent_runtime_client = boto3.client(
-            "bedrock-agent-runtime", config=long_invoke_time_config
-        )
+    @functools.cached_property
+    def _region(self) -> str:
+        return self._boto_session.region_name
+
+    @functools.cached_property
+    def _account_id(self) -> str:
+        return get_account_id()
+
+    @functools.cached_property
+    def _suffix(self) -> str:
+        return f"{self._region}-{self._account_id}"
+
+    @functools.cached_property
+    def _bedrock_agent_client(self):
+        return get_boto3_client("bedrock-agent")
+
+    @functools.cached_property
+    def _bedrock_agent_runtime_client(self):
+        return get_boto3_client("bedrock-agent-runtime", read_timeout=600)
+
+    @functools.cached_property
+    def _agent_registry(self) -> AgentRegistry:
+        return get_agent_registry()
+
+    @functools.cached_property
+    def _sts_client(self):
+        return get_boto3_client("sts")
+
+    @functools.cached_property
+    def _iam_client(self):
+        return get_boto3_client("iam")
 
-        self._sts_client = boto3.client("sts")
-        self._iam_client = boto3.client("iam")
-        self._lambda_client = boto3.client("lambda")
-        self._s3_client = boto3.client("s3", region_name=self._region)
-        self._dynamodb_client = boto3.client("dynamodb", region_name=self._region)
-        self._dynamodb_resource = boto3.resource("dynamodb", region_name=self._region)
+    @functools.cached_property
+    def _lambda_client(self):
+        return get_boto3_client("lambda")
 
-        self._suffix = f"{self._region}-{self._account_id}"
+    @functools.cached_property
+    def _s3_client(self):
+        return get_boto3_client("s3", region_name=self._region)
+
+    @functools.cached_property
+    def _dynamodb_client(self):
+        return get_boto3_client("dynamodb", region_name=self._region)
+
+    @functools.cached_property
+    def _dynamodb_resource(self):
+        return boto3.resource("dynamodb", region_name=self._region)
 
     def get_region(self) -> str:
         """Returns the region for this instance."""
@@ -197,8 +1109,7 @@ class AgentsForAmazonBedrock:
                 AssumeRolePolicyDocument=_assume_role_policy_document_json,
             )
 
-            # Pause to make sure role is created
-            time.sleep(10)
+            self._wait_role_exists(_lambda_function_role_name)
         except:
             _lambda_iam_role = self._iam_client.get_role(
                 RoleName=_lambda_function_role_name
@@ -295,27 +1206,27 @@ class AgentsForAmazonBedrock:
         Returns:
             str: Latest alias ID
         """
-        _agent_aliases = self._bedrock_agent_client.list_agent_aliases(
-            agentId=agent_id, maxResults=100
-        )
-
         _latest_alias_id = ""
         _latest_update = datetime.datetime(1970, 1, 1, 0, 0, 0, tzinfo=tzutc())
+        _alias_name = None
 
-        for _summary in _agent_aliases["agentAliasSummaries"]:
+        for _summary in self._agent_registry.aliases(agent_id):
             # print(_summary)
             _curr_update = _summary["updatedAt"]
             if _curr_update > _latest_update:
                 _latest_alias_id = _summary["agentAliasId"]
-                self.wait_agent_alias_status_update(
-                    agent_id, _latest_alias_id, verbose=False
-                )
                 _latest_update = _curr_update
                 _alias_name = _summary["agentAliasName"]
                 # skip routing config since issue w/ version being blank
                 # print(f"agent id: {agent_id}, routing config: {_summary['routingConfiguration']}")
                 # _alias_version = _summary['routingConfiguration'][0]['agentVersion']
 
+        # only the alias that is returned needs to be ready
+        if _latest_alias_id:
+            self.wait_agent_alias_status_update(
+                agent_id, _latest_alias_id, verbose=False
+            )
+
         if verbose:
             print(f"for id: {agent_id}, picked latest alias: {_latest_alias_id}")
             print(f"  updated at: {_latest_update}")
@@ -349,11 +1260,7 @@ class AgentsForAmazonBedrock:
         Returns:
             str: Agent ID, or None if not found
         """
-        _get_agents_resp = self._bedrock_agent_client.list_agents(maxResults=100)
-        _agents_json = _get_agents_resp["agentSummaries"]
-        _target_agent = next(
-            (agent for agent in _agents_json if agent["agentName"] == agent_name), None
-        )
+        _target_agent = self._agent_registry.find_agent(agent_name)
         if _target_agent is None:
             return None
         else:
@@ -495,14 +1402,20 @@ class AgentsForAmazonBedrock:
             lambda_role = self._create_lambda_iam_role(agent_name, sub_agent_arns)
 
         # Create Lambda Function
-        _lambda_function = self._lambda_client.create_function(
-            FunctionName=lambda_function_name,
-            Runtime=PYTHON_RUNTIME,
-            Timeout=PYTHON_TIMEOUT,
-            Role=lambda_role,
-            Code={"ZipFile": zip_content},
-            Handler=f"{_base_filename}.lambda_handler",
-            Environment=env_variables,
+        # Retried until Lambda accepts a newly created role
+        _lambda_function = wait_until(
+            lambda: self._lambda_client.create_function(
+                FunctionName=lambda_function_name,
+                Runtime=PYTHON_RUNTIME,
+                Timeout=PYTHON_TIMEOUT,
+                Role=lambda_role,
+                Code={"ZipFile": zip_content},
+                Handler=f"{_base_filename}.lambda_handler",
+                Environment=env_variables,
+            ),
+            description=f"Lambda function {lambda_function_name}",
+            timeout=ROLE_PROPAGATION_TIMEOUT,
+            is_retryable=is_role_propagation_error,
         )
 
         self._allow_agent_lambda(_agent_id, lambda_function_name)
@@ -553,11 +1466,7 @@ class AgentsForAmazonBedrock:
         Returns:
             str: ARN of the IAM role, or None if not found
         """
-        _get_agents_resp = self._bedrock_agent_client.list_agents(maxResults=100)
-        _agents_json = _get_agents_resp["agentSummaries"]
-        _target_agent = next(
-            (agent for agent in _agents_json if agent["agentName"] == agent_name), None
-        )
+        _target_agent = self._agent_registry.find_agent(agent_name)
         if _target_agent is not None:
             # pprint.pp(_target_agent)
             _agent_id = _target_agent["agentId"]
@@ -579,11 +1488,7 @@ class AgentsForAmazonBedrock:
         """
 
         # first find the agent ID from the agent Name
-        _get_agents_resp = self._bedrock_agent_client.list_agents(maxResults=100)
-        _agents_json = _get_agents_resp["agentSummaries"]
-        _target_agent = next(
-            (agent for agent in _agents_json if agent["agentName"] == agent_name), None
-        )
+        _target_agent = self._agent_registry.find_agent(agent_name)
 
         if _target_agent is None:
             print(f"Agent {agent_name} not found")
@@ -602,15 +1507,13 @@ class AgentsForAmazonBedrock:
                 print(f"Deleting aliases for agent {_agent_id}...")
 
             try:
-                _agent_aliases = self._bedrock_agent_client.list_agent_aliases(
-                    agentId=_agent_id, maxResults=100
-                )
-                for alias in _agent_aliases["agentAliasSummaries"]:
+                for alias in self._agent_registry.aliases(_agent_id):
                     alias_id = alias["agentAliasId"]
                     print(f"Deleting alias {alias_id} from agent {_agent_id}")
                     response = self._bedrock_agent_client.delete_agent_alias(
                         agentAliasId=alias_id, agentId=_agent_id
                     )
+                    self._agent_registry.remove_alias(_agent_id, alias_id)
             except Exception as e:
                 print(f"Error deleting aliases: {e}")
                 pass
@@ -621,9 +1524,10 @@ class AgentsForAmazonBedrock:
 
             if verbose:
                 print(f"Deleting agent: {_agent_id}...")
-            time.sleep(5)
+            self.wait_agent_status_update(_agent_id)
             self._bedrock_agent_client.delete_agent(agentId=_agent_id)
-            time.sleep(5)
+            self.wait_agent_status_update(_agent_id)
+            self._agent_registry.remove_agent(_agent_id)
 
         # TODO: add delete_lambda_flag parameter to optionall take care of
         # deleting the lambda function associated with the agent.
@@ -734,8 +1638,7 @@ class AgentsForAmazonBedrock:
                 AssumeRolePolicyDocument=_assume_role_policy_document_json,
             )
 
-            # Pause to make sure role is created
-            time.sleep(10)
+            self._wait_role_exists(_agent_role_name)
 
             _bedrock_agent_bedrock_allow_policy_statement = DEFAULT_AGENT_IAM_POLICY
             _bedrock_policy_json = json.dumps(
@@ -783,9 +1686,6 @@ class AgentsForAmazonBedrock:
                     RoleName=_agent_role_name,
                 )
 
-                # Pause to make sure role is updated
-                time.sleep(10)
-
             # TODO: scope down GR access to a single GR passed as param
             # # Support Guardrail access
             # _gr_policy_doc = {
@@ -810,44 +1710,78 @@ class AgentsForAmazonBedrock:
 
             return _agent_role["Role"]["Arn"]
 
-    def wait_agent_status_update(self, agent_id):
-        response = self._bedrock_agent_client.get_agent(agentId=agent_id)
-        agent_status = response["agent"]["agentStatus"]
-        _waited_at_least_once = False
-        while agent_status.endswith("ING"):
-            print(f"Waiting for agent status to change. Current status {agent_status}")
-            time.sleep(5)
-            _waited_at_least_once = True
-            try:
-                response = self._bedrock_agent_client.get_agent(agentId=agent_id)
-                agent_status = response["agent"]["agentStatus"]
-            except self._bedrock_agent_client.exceptions.ResourceNotFoundException:
-                agent_status = "DELETED"
-        if _waited_at_least_once:
-            print(f"Agent id {agent_id} current status: {agent_status}")
+    def _get_agent_status(self, agent_id: str) -> str:
+        """Returns the status of an agent, or DELETED when it no longer exists."""
+        try:
+            response = self._bedrock_agent_client.get_agent(agentId=agent_id)
+        except self._bedrock_agent_client.exceptions.ResourceNotFoundException:
+            return "DELETED"
+        return response["agent"]["agentStatus"]
 
-    def wait_agent_alias_status_update(self, agent_id, agent_alias_id, verbose=False):
-        response = self._bedrock_agent_client.get_agent_alias(
-            agentId=agent_id, agentAliasId=agent_alias_id
+    def _get_agent_alias_status(self, agent_id: str, agent_alias_id: str) -> str:
+        """Returns the status of an agent alias, or DELETED when it no longer exists."""
+        try:
+            response = self._bedrock_agent_client.get_agent_alias(
+                agentId=agent_id, agentAliasId=agent_alias_id
+            )
+        except self._bedrock_agent_client.exceptions.ResourceNotFoundException:
+            return "DELETED"
+        return response["agentAlias"]["agentAliasStatus"]
+
+    def wait_agent_status_update(self, agent_id, timeout: float = WAITER_TIMEOUT):
+        """Waits until the agent is out of any transitional (...ING) status, and returns it."""
+        _statuses = []
+
+        def _poll():
+            _statuses.append(self._get_agent_status(agent_id))
+            if len(_statuses) > 1:
+                print(
+                    f"Waiting for agent status to change. Current status {_statuses[-2]}"
+                )
+            return _statuses[-1]
+
+        agent_status = wait_until(
+            _poll,
+            lambda status: not status.endswith("ING"),
+            description=f"agent {agent_id}",
+            timeout=timeout,
         )
-        agent_alias_status = response["agentAlias"]["agentAliasStatus"]
-        while agent_alias_status.endswith("ING"):
-            if verbose:
+        if len(_statuses) > 1:
+            print(f"Agent id {agent_id} current status: {agent_status}")
+        return agent_status
+
+    def wait_agent_alias_status_update(
+        self, agent_id, agent_alias_id, verbose=False, timeout: float = WAITER_TIMEOUT
+    ):
+        """Waits until the agent alias is out of any transitional (...ING) status, and returns it."""
+
+        def _poll():
+            agent_alias_status = self._get_agent_alias_status(agent_id, agent_alias_id)
+            if verbose and agent_alias_status.endswith("ING"):
                 print(
                     f"Waiting for agent ALIAS status to change. Current status {agent_alias_status}"
                 )
-            time.sleep(5)
-            try:
-                response = self._bedrock_agent_client.get_agent_alias(
-                    agentId=agent_id, agentAliasId=agent_alias_id
-                )
-                agent_alias_status = response["agentAlias"]["agentAliasStatus"]
-            except self._bedrock_agent_client.exceptions.ResourceNotFoundException:
-                agent_status = "DELETED"
-        if verbose:
+            return agent_alias_status
+
+        agent_alias_status = wait_until(
+            _poll,
+            lambda status: not status.endswith("ING"),
+            description=f"alias {agent_alias_id} of agent {agent_id}",
+            timeout=timeout,
+        )
+        if verbose:
             print(
                 f"Agent id {agent_id}, Alias {agent_alias_id} current status: {agent_alias_status}"
             )
+        return agent_alias_status
+
+    def _wait_role_exists(self, role_name: str) -> None:
+        """Waits until a newly created IAM role can be read back."""
+        wait_until(
+            lambda: self._iam_client.get_role(RoleName=role_name),
+            description=f"IAM role {role_name}",
+            is_retryable=lambda e: is_error_code(e, "NoSuchEntity"),
+        )
 
     def associate_sub_agents(self, supervisor_agent_id, sub_agents_list):
         for sub_agent in sub_agents_list:
@@ -871,6 +1805,9 @@ class AgentsForAmazonBedrock:
         supervisor_agent_alias = self._bedrock_agent_client.create_agent_alias(
             agentAliasName="multi-agent", agentId=supervisor_agent_id
         )
+        self._agent_registry.put_alias(
+            supervisor_agent_id, supervisor_agent_alias["agentAlias"]
+        )
         supervisor_agent_alias_id = supervisor_agent_alias["agentAlias"]["agentAliasId"]
         supervisor_agent_alias_arn = supervisor_agent_alias["agentAlias"][
             "agentAliasArn"
@@ -941,11 +1878,6 @@ class AgentsForAmazonBedrock:
             print(f"Created agent IAM role: {_role_arn}...")
             print(f"Creating agent: {agent_name} with model: {_model_id}...")
 
-        _num_tries = 0
-        _agent_created = False
-        _create_agent_response = None
-        _agent_id = None
-
         _kwargs = {}
 
         if routing_classifier_model is not None:
@@ -966,45 +1898,28 @@ class AgentsForAmazonBedrock:
                 "guardrailVersion": "DRAFT",
             }
 
-        while not _agent_created and _num_tries <= 2:
-            try:
-                if verbose:
-                    print(f"kwargs: {_kwargs}")
-                _create_agent_response = self._bedrock_agent_client.create_agent(
-                    agentName=agent_name,
-                    agentResourceRoleArn=_role_arn,
-                    description=agent_description.replace(
-                        "\n", ""
-                    ),  # console doesn't like newlines for subsequent editing
-                    idleSessionTTLInSeconds=1800,
-                    foundationModel=_model_id,
-                    instruction=agent_instructions,
-                    agentCollaboration=agent_collaboration,
-                    **_kwargs,
-                )
-                _agent_id = _create_agent_response["agent"]["agentId"]
-                if verbose:
-                    print(f"Created agent, resulting id: {_agent_id}")
-                    _get_resp = self._bedrock_agent_client.get_agent(agentId=_agent_id)
-                    print(_get_resp)
-                _agent_created = True
-
-            except Exception as e:
-                if verbose:
-                    print(
-                        f"Error creating agent: {e}\n. Retrying in case it was just waiting to be deleted."
-                    )
-                _num_tries += 1
-                if _num_tries <= 2:
-                    time.sleep(4)
-                    pass
-                else:
-                    if verbose:
-                        print(f"Giving up on agent creation after 2 tries.")
-                    raise e
+        if verbose:
+            print(f"kwargs: {_kwargs}")
+        _create_agent_response = self._create_agent_when_ready(
+            agentName=agent_name,
+            agentResourceRoleArn=_role_arn,
+            description=agent_description.replace(
+                "\n", ""
+            ),  # console doesn't like newlines for subsequent editing
+            idleSessionTTLInSeconds=1800,
+            foundationModel=_model_id,
+            instruction=agent_instructions,
+            agentCollaboration=agent_collaboration,
+            verbose=verbose,
+            **_kwargs,
+        )
+        _agent_id = _create_agent_response["agent"]["agentId"]
+        if verbose:
+            print(f"Created agent, resulting id: {_agent_id}")
+            _get_resp = self._bedrock_agent_client.get_agent(agentId=_agent_id)
+            print(_get_resp)
 
         if code_interpretation:
-            # possible time.sleep(15) needed here
             self.add_code_interpreter(agent_name)
 
         _agent_alias_id = DEFAULT_ALIAS
@@ -1015,6 +1930,38 @@ class AgentsForAmazonBedrock:
 
         return _agent_id, _agent_alias_id, _agent_alias_arn
 
+    def _is_agent_deleting(self, agent_name: str) -> bool:
+        """Returns True when the agent with this name is being deleted, or just was."""
+        _agent = self._agent_registry.find_agent(agent_name)
+        if _agent is None:
+            return True
+        return self._get_agent_status(_agent["agentId"]) in ("DELETING", "DELETED")
+
+    def _create_agent_when_ready(self, verbose: bool = False, **kwargs) -> Dict:
+        """Calls create_agent, retrying while a new role propagates or an agent
+        with the same name is still being deleted, then waits for the agent to be created.
+        A name conflict with an agent that is not being deleted is raised right away.
+        """
+
+        def _is_retryable(e: Exception) -> bool:
+            _retry = is_role_propagation_error(e) or (
+                is_error_code(e, "ConflictException")
+                and self._is_agent_deleting(kwargs["agentName"])
+            )
+            if _retry and verbose:
+                print(f"Error creating agent: {e}\n. Retrying.")
+            return _retry
+
+        _response = wait_until(
+            lambda: self._bedrock_agent_client.create_agent(**kwargs),
+            description=f"creation of agent {kwargs['agentName']}",
+            timeout=ROLE_PROPAGATION_TIMEOUT,
+            is_retryable=_is_retryable,
+        )
+        self._agent_registry.put_agent(_response["agent"])
+        self.wait_agent_status_update(_response["agent"]["agentId"])
+        return _response
+
     def prepare(self, agent_name: str) -> None:
         """Prepares an agent for invocation."""
         _agent_id = self.get_agent_id_by_name(agent_name)
@@ -1022,7 +1969,8 @@ class AgentsForAmazonBedrock:
             return "Agent not found"
 
         _resp = self._bedrock_agent_client.prepare_agent(agentId=_agent_id)
-        time.sleep(5)  # make sure agent is ready to be invoked as soon as we return
+        # make sure agent is ready to be invoked as soon as we return
+        self.wait_agent_status_update(_agent_id)
         return
 
     def create_agent_alias(self, agent_id: str, alias_name: str) -> Tuple[str, str]:
@@ -1036,6 +1984,7 @@ class AgentsForAmazonBedrock:
         agent_alias = self._bedrock_agent_client.create_agent_alias(
             agentAliasName=alias_name, agentId=agent_id
         )
+        self._agent_registry.put_alias(agent_id, agent_alias["agentAlias"])
         agent_alias_id = agent_alias["agentAlias"]["agentAliasId"]
         agent_alias_arn = agent_alias["agentAlias"]["agentAliasArn"]
         return agent_alias_id, agent_alias_arn
@@ -1063,7 +2012,8 @@ class AgentsForAmazonBedrock:
         # check the response and if successful, prepare the agent
         if _agent_action_group_resp["ResponseMetadata"]["HTTPStatusCode"] == 200:
             _resp = self._bedrock_agent_client.prepare_agent(agentId=_agent_id)
-            time.sleep(5)  # make sure agent is ready to be invoked as soon as we return
+            # make sure agent is ready to be invoked as soon as we return
+            self.wait_agent_status_update(_agent_id)
         else:
             print(f"Error adding code interpreter to agent: {_agent_action_group_resp}")
         return
@@ -1155,7 +2105,8 @@ class AgentsForAmazonBedrock:
             description=agent_action_group_description,
         )
         _resp = self._bedrock_agent_client.prepare_agent(agentId=agent_id)
-        time.sleep(5)  # make sure agent is ready to be invoked as soon as we return
+        # make sure agent is ready to be invoked as soon as we return
+        self.wait_agent_status_update(agent_id)
         return
 
     def get_function_defs(self, agent_name: str) -> List[dict]:
@@ -1273,9 +2224,7 @@ class AgentsForAmazonBedrock:
                 supervisor_agent_name, model_ids
             )
 
-        time.sleep(20)
-
-        _response = self._bedrock_agent_client.create_agent(
+        _response = self._create_agent_when_ready(
             agentName=supervisor_agent_name,
             agentResourceRoleArn=_supervisor_role_arn,
             description=supervisor_description.replace(
@@ -1298,7 +2247,6 @@ class AgentsForAmazonBedrock:
         )
         _supervisor_agent_arn = _response["agent"]["agentArn"]
         _supervisor_agent_id = _response["agent"]["agentId"]
-        time.sleep(15)
 
         # Associate the KB with the supervisor agent
         if kb_arn is not None:
@@ -1318,8 +2266,9 @@ class AgentsForAmazonBedrock:
 
         return _function_defs, _supervisor_agent_arn
 
+    @staticmethod
     def _make_fully_cited_answer(
-        self, orig_agent_answer, event, enable_trace=False, trace_level="none"
+        orig_agent_answer, event, enable_trace=False, trace_level="none", quiet=False
     ):
         _citations = None
         if event:
@@ -1373,668 +2322,67 @@ class AgentsForAmazonBedrock:
                 )
             else:
                 _ref_url = ""
-                print(colored(f"  !!no retrieved references for citation!!", "red"))
+                if not quiet:
+                    print(colored(f"  !!no retrieved references for citation!!", "red"))
 
             _interim_answer = (
                 _answer_prefix + _cleaned_text[_start:_end] + " [" + _ref_url + "] "
             )
             if enable_trace and trace_level == "all":
-                print(colored(f"fully cited: '{_interim_answer}'", "red"))
-
-            _fully_cited_answer += _interim_answer
-            _citation_idx += 1
-
-            if enable_trace and trace_level == "all":
-                print(
-                    f"got {len(_citation['retrievedReferences'])} retrieved references for this citation\n"
-                )
-                print(f"citation span... start: {_start}, end: {_end}")
-                print(
-                    f"citation based on span:====\n{_cleaned_text[_start:_end]}\n===="
-                )
-                print(f"citation url: {_ref_url}\n============")
-
-        _last_end_span = _citations[len(_citations) - 1]["generatedResponsePart"][
-            "textResponsePart"
-        ]["span"]["end"]
-        _fully_cited_answer = _fully_cited_answer + _cleaned_text[_last_end_span:]
-
-        if enable_trace and trace_level == "all":
-            print(colored(f"FINAL updated fully cited: {_fully_cited_answer}", "red"))
-
-        return _fully_cited_answer
-
-    def invoke_inline_agent(
-        self,
-        request_params: Dict = {},
-        trace_level: str = "core",
-    ):
-        if "enableTrace" in request_params:
-            enable_trace = request_params["enableTrace"]
-        else:
-            request_params["enableTrace"] = enable_trace = False
-
-        if "sessionId" in request_params:
-            session_id = request_params["sessionId"]
-        else:
-            request_params["sessionId"] = session_id = str(uuid.uuid4())
-
-        _time_before_call = datetime.datetime.now()
-
-        _agent_resp = self._bedrock_agent_runtime_client.invoke_inline_agent(
-            **request_params
-        )
-
-        if _agent_resp["ResponseMetadata"]["RetryAttempts"] > 0:
-            print(
-                colored(
-                    f"  ** invokeAgent boto3 retries executed: {_agent_resp['ResponseMetadata']['RetryAttempts']}",
-                    "red",
-                )
-            )
-
-        if enable_trace:
-            if trace_level == "all":
-                print(f"invokeAgent API response object: {_agent_resp}")
-            else:
-                print(
-                    f"invokeAgent API request ID: {_agent_resp['ResponseMetadata']['RequestId']}"
-                )
-                print(f"invokeAgent API session ID: {session_id}")
-
-        # Return error message if invoke was unsuccessful
-        if _agent_resp["ResponseMetadata"]["HTTPStatusCode"] != 200:
-            _error_message = f"API Response was not 200: {_agent_resp}"
-            if enable_trace and trace_level == "all":
-                print(_error_message)
-            return _error_message
-
-        _total_in_tokens = 0
-        _total_out_tokens = 0
-        _total_llm_calls = 0
-        _orch_step = 0
-        _sub_step = 0
-        _num_response_chunks = 0
-        _time_before_orchestration = _overall_start_time = datetime.datetime.now()
-        _citations = []
-        _citations_event = None
-
-        _agent_answer = ""
-        _event_stream = _agent_resp["completion"]
-
-        try:
-            _sub_agent_name = "<collab-name-not-yet-provided>"
-            for _event in _event_stream:
-                _sub_agent_alias_id = None
-
-                if "chunk" in _event:
-                    _data = _event["chunk"]["bytes"]
-                    _tmp_agent_answer = _data.decode("utf8")
-                    if enable_trace and trace_level == "all":
-                        # print(f"tmp answer: '{_tmp_agent_answer}', streaming: {stream_final_response}, trace: {enable_trace}")
-                        print(
-                            f"tmp answer: '{_tmp_agent_answer}', trace: {enable_trace}"
-                        )
-
-                    # continue to build up the full answer
-                    _agent_answer += _tmp_agent_answer
-
-                    # stream the chunks
-
-                    # if _num_response_chunks == 0:
-                    #     _time_to_first_token = datetime.datetime.now() - _overall_start_time
-                    #     if enable_trace and stream_final_response:
-                    #         print(colored(f"Time to first token: {_time_to_first_token.total_seconds():,.1f}s\n", "yellow"))
-                    # _num_response_chunks += 1
-
-                    # if enable_trace and stream_final_response and _num_response_chunks < 3:
-                    #     print(colored(f"Answer chunk [{_num_response_chunks}]: {_tmp_agent_answer}", "blue"))
-
-                    # print all keys in _event["chunk"] dictionary if more than just 'bytes' provided
-                    if enable_trace and trace_level == "all":
-                        if len(_event["chunk"].keys()) > 1:
-                            print(
-                                f"chunk keys beyond just 'bytes': {list(_event['chunk'].keys())}"
-                            )
-
-                    # remember the citations, if any are provided
-                    if "attribution" in _event["chunk"]:
-                        if "citations" in _event["chunk"]["attribution"]:
-                            _citations_event = copy.deepcopy(_event)
-                            _citations = _event["chunk"]["attribution"]["citations"]
-                            if enable_trace and trace_level == "all":
-                                print(colored(f"Citations: {_citations}", "blue"))
-
-                elif "returnControl" in _event:
-                    _agent_answer = _event["returnControl"]
-
-                if "trace" in _event and enable_trace:
-                    if trace_level == "all":
-                        print("---")
-                    else:
-                        if "callerChain" in _event["trace"]:
-                            if len(_event["trace"]["callerChain"]) > 1:
-                                _sub_agent_alias_arn = _event["trace"]["callerChain"][
-                                    1
-                                ]["agentAliasArn"]
-                                # get sub agent id by grabbing all text following the first '/' character
-                                _sub_agent_alias_id = _sub_agent_alias_arn.split(
-                                    "/", 1
-                                )[1]
-                                _sub_agent_name = "<not yet supported with inline>"  # multi_agent_names[_sub_agent_alias_id]
-
-                    if "routingClassifierTrace" in _event["trace"]["trace"]:
-                        _route = _event["trace"]["trace"]["routingClassifierTrace"]
-
-                        if "modelInvocationInput" in _route:
-                            _orch_step += 1
-                            print(colored(f"---- Step {_orch_step} ----", "green"))
-                            _time_before_routing = datetime.datetime.now()
-                            print(
-                                colored(
-                                    "Classifying request to immediately route to one collaborator if possible.",
-                                    "blue",
-                                )
-                            )
-
-                        if "modelInvocationOutput" in _route:
-                            _llm_usage = _route["modelInvocationOutput"]["metadata"][
-                                "usage"
-                            ]
-                            _in_tokens = _llm_usage["inputTokens"]
-                            _total_in_tokens += _in_tokens
-
-                            _out_tokens = _llm_usage["outputTokens"]
-                            _total_out_tokens += _out_tokens
-
-                            _total_llm_calls += 1
-                            _route_duration = (
-                                datetime.datetime.now() - _time_before_routing
-                            )
-
-                            # _raw_resp_str = _route["modelInvocationOutput"][
-                            #     "rawResponse"
-                            # ]["content"]
-                            # _raw_resp = json.loads(_raw_resp_str)
-                            # _classification = (
-                            #     _raw_resp["content"][0]["text"]
-                            #     .replace("<a>", "")
-                            #     .replace("</a>", "")
-                            # )
-                            
-                            _content = json.loads(_route["modelInvocationOutput"]["rawResponse"]["content"])
-                            if 'content' in _content.keys():
-                                _classification = _content["content"][0]["text"]
-                            else:
-                                _classification = _content["output"]["message"]["content"][0]["text"]
-                            _classification = _classification.replace("<a>", "").replace("</a>", "")
-
-                            if _classification == UNDECIDABLE_CLASSIFICATION:
-                                print(
-                                    colored(
-                                        f"Routing classifier did not find a matching collaborator. Reverting to 'SUPERVISOR' mode.",
-                                        "magenta",
-                                    )
-                                )
-                            elif _classification == "keep_previous_agent":
-                                print(
-                                    colored(
-                                        f"Continuing conversation with previous collaborator.",
-                                        "magenta",
-                                    )
-                                )
-                            else:
-                                _sub_agent_name = _classification
-                                print(
-                                    colored(
-                                        f"Routing classifier chose collaborator: '{_classification}'",
-                                        "magenta",
-                                    )
-                                )
-                            print(
-                                colored(
-                                    f"Routing classifier took {_route_duration.total_seconds():,.1f}s, using {_in_tokens+_out_tokens} tokens (in: {_in_tokens}, out: {_out_tokens}).\n",
-                                    "yellow",
-                                )
-                            )
-
-                    if "failureTrace" in _event["trace"]["trace"]:
-                        print(
-                            colored(
-                                f"Agent error: {_event['trace']['trace']['failureTrace']['failureReason']}",
-                                "red",
-                            )
-                        )
-
-                    if "orchestrationTrace" in _event["trace"]["trace"]:
-                        _orch = _event["trace"]["trace"]["orchestrationTrace"]
-
-                        if trace_level in ["core", "outline"]:
-                            if "rationale" in _orch:
-                                _rationale = _orch["rationale"]
-                                print(colored(f"{_rationale['text']}", "blue"))
-
-                            if "invocationInput" in _orch:
-                                # NOTE: when agent determines invocations should happen in parallel
-                                # the trace objects for invocation input still come back one at a time.
-                                _input = _orch["invocationInput"]
-
-                                if "actionGroupInvocationInput" in _input:
-                                    if trace_level == "outline":
-                                        print(
-                                            colored(
-                                                f"Using tool: {_input['actionGroupInvocationInput']['function']}",
-                                                "magenta",
-                                            )
-                                        )
-                                    else:
-                                        if (
-                                            "function"
-                                            not in _input["actionGroupInvocationInput"]
-                                        ):
-                                            print(
-                                                colored(
-                                                    f"EXPECTING to capture 'Using tool', but 'function' not found\n{_input['actionGroupInvocationInput']}",
-                                                    "red",
-                                                )
-                                            )
-                                        else:
-                                            print(
-                                                colored(
-                                                    f"Using tool: {_input['actionGroupInvocationInput']['function']} with these inputs:",
-                                                    "magenta",
-                                                )
-                                            )
-                                            if (
-                                                "parameters"
-                                                in _input["actionGroupInvocationInput"]
-                                            ):
-                                                if (
-                                                    len(
-                                                        _input[
-                                                            "actionGroupInvocationInput"
-                                                        ]["parameters"]
-                                                    )
-                                                    == 1
-                                                ) and (
-                                                    _input[
-                                                        "actionGroupInvocationInput"
-                                                    ]["parameters"][0]["name"]
-                                                    == "input_text"
-                                                ):
-                                                    print(
-                                                        colored(
-                                                            f"{_input['actionGroupInvocationInput']['parameters'][0]['value']}",
-                                                            "magenta",
-                                                        )
-                                                    )
-                                                else:
-                                                    print(
-                                                        colored(
-                                                            f"{_input['actionGroupInvocationInput']['parameters']}\n",
-                                                            "magenta",
-                                                        )
-                                                    )
-                                            else:
-                                                print(
-                                                    colored(
-                                                        f"    no input parameters being sent\n",
-                                                        "magenta",
-                                                    )
-                                                )
-
-                                elif "agentCollaboratorInvocationInput" in _input:
-                                    _collab_name = _input[
-                                        "agentCollaboratorInvocationInput"
-                                    ]["agentCollaboratorName"]
-                                    _sub_agent_name = _collab_name
-                                    _collab_input_text = _input[
-                                        "agentCollaboratorInvocationInput"
-                                    ]["input"]["text"]
-                                    _collab_arn = _input[
-                                        "agentCollaboratorInvocationInput"
-                                    ]["agentCollaboratorAliasArn"]
-                                    _collab_ids = _collab_arn.split("/", 1)[1]
-
-                                    if trace_level == "outline":
-                                        print(
-                                            colored(
-                                                f"Using sub-agent collaborator: '{_collab_name} [{_collab_ids}]'",
-                                                "magenta",
-                                            )
-                                        )
-                                    else:
-                                        print(
-                                            colored(
-                                                f"Using sub-agent collaborator: '{_collab_name} [{_collab_ids}]' passing input text:",
-                                                "magenta",
-                                            )
-                                        )
-                                        print(
-                                            colored(
-                                                f"{_collab_input_text[0:TRACE_TRUNCATION_LENGTH]}\n",
-                                                "magenta",
-                                            )
-                                        )
-
-                                elif "codeInterpreterInvocationInput" in _input:
-                                    if trace_level == "outline":
-                                        print(
-                                            colored(
-                                                f"Using code interpreter", "magenta"
-                                            )
-                                        )
-                                    else:
-                                        console = Console()
-                                        _gen_code = _input[
-                                            "codeInterpreterInvocationInput"
-                                        ]["code"]
-                                        _code = f"```python\n{_gen_code}\n```"
-
-                                        console.print(
-                                            Markdown(f"**Generated code**\n{_code}")
-                                        )
-
-                                elif "knowledgeBaseLookupInput" in _input:
-                                    if trace_level == "outline":
-                                        print(
-                                            colored(f"Using knowledge base", "magenta")
-                                        )
-                                    else:
-                                        _kb_id = _input["knowledgeBaseLookupInput"][
-                                            "knowledgeBaseId"
-                                        ]
-                                        _kb_query = _input["knowledgeBaseLookupInput"][
-                                            "text"
-                                        ]
-                                        print(
-                                            colored(
-                                                f"Using knowledge base id: {_kb_id} to search for:",
-                                                "magenta",
-                                            )
-                                        )
-                                        print(colored(f"  {_kb_query}\n", "magenta"))
-
-                            if "observation" in _orch:
-                                if trace_level == "core":
-                                    _output = _orch["observation"]
-                                    if "actionGroupInvocationOutput" in _output:
-                                        print(
-                                            colored(
-                                                f"--tool outputs:\n{_output['actionGroupInvocationOutput']['text'][0:TRACE_TRUNCATION_LENGTH]}...\n",
-                                                "magenta",
-                                            )
-                                        )
-
-                                    if "agentCollaboratorInvocationOutput" in _output:
-                                        _collab_name = _output[
-                                            "agentCollaboratorInvocationOutput"
-                                        ]["agentCollaboratorName"]
-                                        _collab_output_text = _output[
-                                            "agentCollaboratorInvocationOutput"
-                                        ]["output"]["text"][0:TRACE_TRUNCATION_LENGTH]
-                                        print(
-                                            colored(
-                                                f"\n----sub-agent {_collab_name} output text:\n{_collab_output_text}...\n",
-                                                "magenta",
-                                            )
-                                        )
-
-                                    if "codeInterpreterInvocationOutput" in _output:
-                                        if (
-                                            "executionError"
-                                            in _output[
-                                                "codeInterpreterInvocationOutput"
-                                            ]
-                                        ):
-                                            _err = _output[
-                                                "codeInterpreterInvocationOutput"
-                                            ]["executionError"]
-                                            print(
-                                                colored(
-                                                    f"--- Code interpreter execution ERROR:\n{_err}\n---\n",
-                                                    "red",
-                                                )
-                                            )
-                                        elif (
-                                            "executionOutput"
-                                            in _output[
-                                                "codeInterpreterInvocationOutput"
-                                            ]
-                                        ):
-                                            _output = _output[
-                                                "codeInterpreterInvocationOutput"
-                                            ]["executionOutput"]
-                                            print(
-                                                colored(
-                                                    f"--- Code interpreter execution OUTPUT:\n{_output}\n---\n",
-                                                    "magenta",
-                                                )
-                                            )
-
-                                    if "knowledgeBaseLookupOutput" in _output:
-                                        _refs = _output["knowledgeBaseLookupOutput"][
-                                            "retrievedReferences"
-                                        ]
-                                        _ref_count = len(_refs)
-                                        print(
-                                            colored(
-                                                f"Knowledge base lookup output, {_ref_count} references:\n",
-                                                "magenta",
-                                            )
-                                        )
-                                        _curr = 1
-                                        for _ref in _refs:
-                                            print(
-                                                colored(
-                                                    f"  ({_curr}) {_ref['content']['text'][0:TRACE_TRUNCATION_LENGTH]}...\n",
-                                                    "magenta",
-                                                )
-                                            )
-                                            _curr += 1
-
-                                    if "finalResponse" in _output:
-                                        print(
-                                            colored(
-                                                f"Final response:\n{_output['finalResponse']['text'][0:TRACE_TRUNCATION_LENGTH]}...",
-                                                "cyan",
-                                            )
-                                        )
-
-                        if "modelInvocationOutput" in _orch:
-                            if _sub_agent_alias_id is not None:
-                                _sub_step += 1
-                                print(
-                                    colored(
-                                        f"---- Step {_orch_step}.{_sub_step} [using sub-agent name:{_sub_agent_name}, id:{_sub_agent_alias_id}] ----",
-                                        "green",
-                                    )
-                                )
-                            else:
-                                _orch_step += 1
-                                _sub_step = 0
-                                print(colored(f"---- Step {_orch_step} ----", "green"))
-
-                            _total_llm_calls += 1
-                            _orch_duration = (
-                                datetime.datetime.now() - _time_before_orchestration
-                            )
-
-                            if "metadata" in _orch["modelInvocationOutput"]:
-                                _llm_usage = _orch["modelInvocationOutput"]["metadata"][
-                                    "usage"
-                                ]
-                                _in_tokens = _llm_usage["inputTokens"]
-                                _total_in_tokens += _in_tokens
-
-                                _out_tokens = _llm_usage["outputTokens"]
-                                _total_out_tokens += _out_tokens
-
-                                print(
-                                    colored(
-                                        f"Took {_orch_duration.total_seconds():,.1f}s, using {_in_tokens+_out_tokens} tokens (in: {_in_tokens}, out: {_out_tokens}) to complete prior action, observe, orchestrate.",
-                                        "yellow",
-                                    )
-                                )
-                            else:
-                                print(
-                                    colored(
-                                        f"Took {_orch_duration.total_seconds():,.1f}s [token count metadata was not returned] to complete prior action, observe, orchestrate.",
-                                        "yellow",
-                                    )
-                                )
-
-                            # restart the clock for next step/sub-step
-                            _time_before_orchestration = datetime.datetime.now()
-
-                    elif "preProcessingTrace" in _event["trace"]["trace"]:
-                        _pre = _event["trace"]["trace"]["preProcessingTrace"]
-                        if "modelInvocationOutput" in _pre:
-                            _llm_usage = _pre["modelInvocationOutput"]["metadata"][
-                                "usage"
-                            ]
-                            _in_tokens = _llm_usage["inputTokens"]
-                            _total_in_tokens += _in_tokens
-
-                            _out_tokens = _llm_usage["outputTokens"]
-                            _total_out_tokens += _out_tokens
-
-                            _total_llm_calls += 1
-
-                            print(
-                                colored(
-                                    "Pre-processing trace, agent came up with an initial plan.",
-                                    "yellow",
-                                )
-                            )
-                            print(
-                                colored(
-                                    f"Used LLM tokens, in: {_in_tokens}, out: {_out_tokens}",
-                                    "yellow",
-                                )
-                            )
-
-                    elif "postProcessingTrace" in _event["trace"]["trace"]:
-                        _post = _event["trace"]["trace"]["postProcessingTrace"]
-                        if "modelInvocationOutput" in _post:
-                            _llm_usage = _post["modelInvocationOutput"]["metadata"][
-                                "usage"
-                            ]
-                            _in_tokens = _llm_usage["inputTokens"]
-                            _total_in_tokens += _in_tokens
-
-                            _out_tokens = _llm_usage["outputTokens"]
-                            _total_out_tokens += _out_tokens
-
-                            _total_llm_calls += 1
-                            print(colored("Agent post-processing complete.", "yellow"))
-                            print(
-                                colored(
-                                    f"Used LLM tokens, in: {_in_tokens}, out: {_out_tokens}",
-                                    "yellow",
-                                )
-                            )
-
-                    if trace_level == "all":
-                        print(json.dumps(_event["trace"], indent=2))
-
-                if "files" in _event.keys() and enable_trace:
-                    console = Console()
-                    files_event = _event["files"]
-                    console.print(Markdown("**Files**"))
-
-                    files_list = files_event["files"]
-                    for this_file in files_list:
-                        print(f"{this_file['name']} ({this_file['type']})")
-                        file_bytes = this_file["bytes"]
-
-                        # save bytes to file, given the name of file and the bytes
-                        file_name = os.path.join("output", this_file["name"])
-                        with open(file_name, "wb") as f:
-                            f.write(file_bytes)
-                        # if this_file['type'] == 'image/png' or this_file['type'] == 'image/jpeg':
-                        #     img = mpimg.imread(file_name)
-                        #     # plt.imshow(img)
-                        #     # plt.show()
-
-            if enable_trace:
-                duration = datetime.datetime.now() - _time_before_call
-
-                if trace_level in ["core", "outline"]:
-                    print(
-                        colored(
-                            f"Agent made a total of {_total_llm_calls} LLM calls, "
-                            + f"using {_total_in_tokens+_total_out_tokens} tokens "
-                            + f"(in: {_total_in_tokens}, out: {_total_out_tokens})"
-                            + f", and took {duration.total_seconds():,.1f} total seconds",
-                            "yellow",
-                        )
-                    )
+                print(colored(f"fully cited: '{_interim_answer}'", "red"))
 
-                if trace_level == "all":
-                    print(f"Returning agent answer as: {_agent_answer}")
+            _fully_cited_answer += _interim_answer
+            _citation_idx += 1
 
-            # if stream_final_response and enable_trace and trace_level == "all":
-            #     print(f"\nagent answer: ^^^{_agent_answer}^^^\n")
+            if enable_trace and trace_level == "all":
+                print(
+                    f"got {len(_citation['retrievedReferences'])} retrieved references for this citation\n"
+                )
+                print(f"citation span... start: {_start}, end: {_end}")
+                print(
+                    f"citation based on span:====\n{_cleaned_text[_start:_end]}\n===="
+                )
+                print(f"citation url: {_ref_url}\n============")
 
-            _agent_answer = self._make_fully_cited_answer(
-                _agent_answer, _citations_event, enable_trace, trace_level
-            )
+        _last_end_span = _citations[len(_citations) - 1]["generatedResponsePart"][
+            "textResponsePart"
+        ]["span"]["end"]
+        _fully_cited_answer = _fully_cited_answer + _cleaned_text[_last_end_span:]
 
-            return _agent_answer
+        if enable_trace and trace_level == "all":
+            print(colored(f"FINAL updated fully cited: {_fully_cited_answer}", "red"))
 
-        except Exception as e:
-            print(f"Caught exception while processing input to invokeAgent:\n")
-            print(f"  for input text:\n{request_params['inputText']}\n")
-            print(
-                f"  request ID: {_agent_resp['ResponseMetadata']['RequestId']}, retries: {_agent_resp['ResponseMetadata']['RetryAttempts']}\n"
-            )
-            print(f"Error: {e}")
-            raise Exception("Unexpected exception: ", e)
+        return _fully_cited_answer
 
-    def invoke(
+    def invoke_inline_agent(
         self,
-        input_text: str,
-        agent_id: str,
-        agent_alias_id: str = "TSTALIASID",
-        session_id: str = str(uuid.uuid1()),
-        session_state: dict = {},
-        enable_trace: bool = False,
-        end_session: bool = False,
+        request_params: Dict = {},
         trace_level: str = "core",
-        multi_agent_names: dict = {},
-        stream_final_response: bool = False,
     ):
-        """Invokes an agent with a given input text, while optional parameters
-        also let you leverage an agent session, or target a specific agent alias.
-
-        Args:
-            input_text (str): The text to be processed by the agent.
-            agent_id (str): The ID of the agent to invoke.
-            agent_alias_id (str, optional): The alias ID of the agent to invoke. Defaults to "TSTALIASID".
-            session_id (str, optional): The ID of the session. Defaults to a new UUID.
-            session_state (dict, optional): The state of the session. Defaults to an empty dict.
-            enable_trace (bool, optional): Whether to enable trace. Defaults to False.
-            end_session (bool, optional): Whether to end the session. Defaults to False.
-            trace_level (str, optional): The level of trace. Defaults to "none". Possible values are "none", "all", "core".
+        if "enableTrace" in request_params:
+            enable_trace = request_params["enableTrace"]
+        else:
+            request_params["enableTrace"] = enable_trace = False
 
-        Returns:
-            str: The answer from the agent.
-        """
+        if "sessionId" in request_params:
+            session_id = request_params["sessionId"]
+        else:
+            request_params["sessionId"] = session_id = str(uuid.uuid4())
 
         _time_before_call = datetime.datetime.now()
 
-        _agent_resp = self._bedrock_agent_runtime_client.invoke_agent(
-            inputText=input_text,
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId=session_id,
-            sessionState=session_state,
-            enableTrace=enable_trace,
-            endSession=end_session,
-            streamingConfigurations={"streamFinalResponse": stream_final_response},
+        _agent_resp = self._bedrock_agent_runtime_client.invoke_inline_agent(
+            **request_params
         )
 
+        if _agent_resp["ResponseMetadata"]["RetryAttempts"] > 0:
+            print(
+                colored(
+                    f"  ** invokeAgent boto3 retries executed: {_agent_resp['ResponseMetadata']['RetryAttempts']}",
+                    "red",
+                )
+            )
+
         if enable_trace:
             if trace_level == "all":
                 print(f"invokeAgent API response object: {_agent_resp}")
@@ -2043,7 +2391,6 @@ class AgentsForAmazonBedrock:
                     f"invokeAgent API request ID: {_agent_resp['ResponseMetadata']['RequestId']}"
                 )
                 print(f"invokeAgent API session ID: {session_id}")
-                print(f"  agent id: {agent_id}, agent alias id: {agent_alias_id}")
 
         # Return error message if invoke was unsuccessful
         if _agent_resp["ResponseMetadata"]["HTTPStatusCode"] != 200:
@@ -2074,37 +2421,24 @@ class AgentsForAmazonBedrock:
                     _data = _event["chunk"]["bytes"]
                     _tmp_agent_answer = _data.decode("utf8")
                     if enable_trace and trace_level == "all":
+                        # print(f"tmp answer: '{_tmp_agent_answer}', streaming: {stream_final_response}, trace: {enable_trace}")
                         print(
-                            f"tmp answer: '{_tmp_agent_answer}', streaming: {stream_final_response}, trace: {enable_trace}"
+                            f"tmp answer: '{_tmp_agent_answer}', trace: {enable_trace}"
                         )
 
                     # continue to build up the full answer
                     _agent_answer += _tmp_agent_answer
 
-                    if _num_response_chunks == 0:
-                        _time_to_first_token = (
-                            datetime.datetime.now() - _overall_start_time
-                        )
-                        if enable_trace and stream_final_response:
-                            print(
-                                colored(
-                                    f"Time to first token: {_time_to_first_token.total_seconds():,.1f}s\n",
-                                    "yellow",
-                                )
-                            )
-                    _num_response_chunks += 1
+                    # stream the chunks
 
-                    if (
-                        enable_trace
-                        and stream_final_response
-                        and _num_response_chunks < 3
-                    ):
-                        print(
-                            colored(
-                                f"Answer chunk [{_num_response_chunks}]: {_tmp_agent_answer}",
-                                "blue",
-                            )
-                        )
+                    # if _num_response_chunks == 0:
+                    #     _time_to_first_token = datetime.datetime.now() - _overall_start_time
+                    #     if enable_trace and stream_final_response:
+                    #         print(colored(f"Time to first token: {_time_to_first_token.total_seconds():,.1f}s\n", "yellow"))
+                    # _num_response_chunks += 1
+
+                    # if enable_trace and stream_final_response and _num_response_chunks < 3:
+                    #     print(colored(f"Answer chunk [{_num_response_chunks}]: {_tmp_agent_answer}", "blue"))
 
                     # print all keys in _event["chunk"] dictionary if more than just 'bytes' provided
                     if enable_trace and trace_level == "all":
@@ -2121,6 +2455,9 @@ class AgentsForAmazonBedrock:
                             if enable_trace and trace_level == "all":
                                 print(colored(f"Citations: {_citations}", "blue"))
 
+                elif "returnControl" in _event:
+                    _agent_answer = _event["returnControl"]
+
                 if "trace" in _event and enable_trace:
                     if trace_level == "all":
                         print("---")
@@ -2134,13 +2471,7 @@ class AgentsForAmazonBedrock:
                                 _sub_agent_alias_id = _sub_agent_alias_arn.split(
                                     "/", 1
                                 )[1]
-                                _sub_agent_name = multi_agent_names[_sub_agent_alias_id]
-                                # _sub_agent_name = "<not-yet-provided>"
-
-                        # if 'collaboratorName' in _event['trace']:
-                        #     _sub_agent_name = _event['trace']['collaboratorName']
-                        # else:
-                        #     _sub_agent_name = "<collab-name-not-yet-provided>"
+                                _sub_agent_name = "<not yet supported with inline>"  # multi_agent_names[_sub_agent_alias_id]
 
                     if "routingClassifierTrace" in _event["trace"]["trace"]:
                         _route = _event["trace"]["trace"]["routingClassifierTrace"]
@@ -2188,7 +2519,6 @@ class AgentsForAmazonBedrock:
                                 _classification = _content["output"]["message"]["content"][0]["text"]
                             _classification = _classification.replace("<a>", "").replace("</a>", "")
 
-
                             if _classification == UNDECIDABLE_CLASSIFICATION:
                                 print(
                                     colored(
@@ -2203,9 +2533,6 @@ class AgentsForAmazonBedrock:
                                         "magenta",
                                     )
                                 )
-                                # # since we replaced the typical orchestration step with a simple routing
-                                # # classification, bump the step count.
-                                # _orch_step += 1
                             else:
                                 _sub_agent_name = _classification
                                 print(
@@ -2214,9 +2541,6 @@ class AgentsForAmazonBedrock:
                                         "magenta",
                                     )
                                 )
-                                # # since we replaced the typical orchestration step with a simple routing
-                                # # classification, bump the step count.
-                                # _orch_step += 1
                             print(
                                 colored(
                                     f"Routing classifier took {_route_duration.total_seconds():,.1f}s, using {_in_tokens+_out_tokens} tokens (in: {_in_tokens}, out: {_out_tokens}).\n",
@@ -2406,6 +2730,38 @@ class AgentsForAmazonBedrock:
                                             )
                                         )
 
+                                    if "codeInterpreterInvocationOutput" in _output:
+                                        if (
+                                            "executionError"
+                                            in _output[
+                                                "codeInterpreterInvocationOutput"
+                                            ]
+                                        ):
+                                            _err = _output[
+                                                "codeInterpreterInvocationOutput"
+                                            ]["executionError"]
+                                            print(
+                                                colored(
+                                                    f"--- Code interpreter execution ERROR:\n{_err}\n---\n",
+                                                    "red",
+                                                )
+                                            )
+                                        elif (
+                                            "executionOutput"
+                                            in _output[
+                                                "codeInterpreterInvocationOutput"
+                                            ]
+                                        ):
+                                            _output = _output[
+                                                "codeInterpreterInvocationOutput"
+                                            ]["executionOutput"]
+                                            print(
+                                                colored(
+                                                    f"--- Code interpreter execution OUTPUT:\n{_output}\n---\n",
+                                                    "magenta",
+                                                )
+                                            )
+
                                     if "knowledgeBaseLookupOutput" in _output:
                                         _refs = _output["knowledgeBaseLookupOutput"][
                                             "retrievedReferences"
@@ -2568,8 +2924,8 @@ class AgentsForAmazonBedrock:
                 if trace_level == "all":
                     print(f"Returning agent answer as: {_agent_answer}")
 
-            if stream_final_response and enable_trace and trace_level == "all":
-                print(f"\nagent answer: ^^^{_agent_answer}^^^\n")
+            # if stream_final_response and enable_trace and trace_level == "all":
+            #     print(f"\nagent answer: ^^^{_agent_answer}^^^\n")
 
             _agent_answer = self._make_fully_cited_answer(
                 _agent_answer, _citations_event, enable_trace, trace_level
@@ -2579,14 +2935,247 @@ class AgentsForAmazonBedrock:
 
         except Exception as e:
             print(f"Caught exception while processing input to invokeAgent:\n")
+            print(f"  for input text:\n{request_params['inputText']}\n")
+            print(
+                f"  request ID: {_agent_resp['ResponseMetadata']['RequestId']}, retries: {_agent_resp['ResponseMetadata']['RetryAttempts']}\n"
+            )
+            print(f"Error: {e}")
+            raise Exception("Unexpected exception: ", e)
+
+    def invoke(
+        self,
+        input_text: str,
+        agent_id: str,
+        agent_alias_id: str = "TSTALIASID",
+        session_id: str = str(uuid.uuid1()),
+        session_state: dict = {},
+        enable_trace: bool = False,
+        end_session: bool = False,
+        trace_level: str = "core",
+        multi_agent_names: dict = {},
+        stream_final_response: bool = False,
+    ):
+        """Invokes an agent with a given input text, while optional parameters
+        also let you leverage an agent session, or target a specific agent alias.
+
+        Args:
+            input_text (str): The text to be processed by the agent.
+            agent_id (str): The ID of the agent to invoke.
+            agent_alias_id (str, optional): The alias ID of the agent to invoke. Defaults to "TSTALIASID".
+            session_id (str, optional): The ID of the session. Defaults to a new UUID.
+            session_state (dict, optional): The state of the session. Defaults to an empty dict.
+            enable_trace (bool, optional): Whether to enable trace. Defaults to False.
+            end_session (bool, optional): Whether to end the session. Defaults to False.
+            trace_level (str, optional): The level of trace. Defaults to "none". Possible values are "none", "all", "core".
+
+        Returns:
+            str: The answer from the agent.
+        """
+
+        _printer = (
+            TracePrinter(trace_level, multi_agent_names, stream_final_response)
+            if enable_trace
+            else None
+        )
+        _started = None
+        _completed = None
+        try:
+            for _event in self.invoke_stream(
+                input_text,
+                agent_id,
+                agent_alias_id=agent_alias_id,
+                session_id=session_id,
+                session_state=session_state,
+                enable_trace=enable_trace,
+                end_session=end_session,
+                stream_final_response=stream_final_response,
+            ):
+                if _printer is not None:
+                    _printer.handle(_event)
+                if isinstance(_event, InvokeStarted):
+                    _started = _event
+                elif isinstance(_event, InvokeCompleted):
+                    _completed = _event
+
+            if _printer is None and _completed.citations:
+                # Only for its warnings about citations without references,
+                # which TracePrinter prints when tracing
+                self._make_fully_cited_answer(
+                    _completed.raw_answer,
+                    {"chunk": {"attribution": {"citations": _completed.citations}}},
+                )
+            return _completed.answer
+
+        except Exception as e:
+            if _started is None:
+                raise
+            print(f"Caught exception while processing input to invokeAgent:\n")
             print(f"  for input text:\n{input_text}\n")
             print(f"  on agent: {agent_id}, alias: {agent_alias_id}")
             print(
-                f"  request ID: {_agent_resp['ResponseMetadata']['RequestId']}, retries: {_agent_resp['ResponseMetadata']['RetryAttempts']}\n"
+                f"  request ID: {_started.request_id}, retries: {_started.response['ResponseMetadata']['RetryAttempts']}\n"
             )
             print(f"Error: {e}")
             raise Exception("Unexpected exception: ", e)
 
+    def invoke_stream(
+        self,
+        input_text: str,
+        agent_id: str,
+        agent_alias_id: str = DEFAULT_ALIAS,
+        session_id: str = None,
+        session_state: dict = None,
+        enable_trace: bool = False,
+        end_session: bool = False,
+        stream_final_response: bool = False,
+    ):
+        """Invokes an agent and yields its events as they arrive, without printing anything.
+
+        Yields InvokeStarted first, then TextDelta, Citations, TraceStep (with enable_trace),
+        SubAgentRouting, Usage and AgentFiles events in stream order, and InvokeCompleted last,
+        carrying the full answer and the token totals. Pass the events to a TracePrinter
+        to print them the way invoke does.
+
+        Args:
+            input_text (str): The text to be processed by the agent.
+            agent_id (str): The ID of the agent to invoke.
+            agent_alias_id (str, optional): The alias ID of the agent to invoke. Defaults to "TSTALIASID".
+            session_id (str, optional): The ID of the session. Defaults to a new UUID.
+            session_state (dict, optional): The state of the session. Defaults to an empty dict.
+            enable_trace (bool, optional): Whether the agent returns trace events. Defaults to False.
+            end_session (bool, optional): Whether to end the session. Defaults to False.
+            stream_final_response (bool, optional): Whether the final response arrives in several chunks,
+                as TextDelta events, instead of in one chunk once it is complete. Defaults to False, as for invoke.
+        """
+        if session_id is None:
+            session_id = str(uuid.uuid1())
+        _overall_start_time = time.monotonic()
+
+        _agent_resp = self._bedrock_agent_runtime_client.invoke_agent(
+            inputText=input_text,
+            agentId=agent_id,
+            agentAliasId=agent_alias_id,
+            sessionId=session_id,
+            sessionState=session_state or {},
+            enableTrace=enable_trace,
+            endSession=end_session,
+            streamingConfigurations={"streamFinalResponse": stream_final_response},
+        )
+        yield InvokeStarted(
+            agent_id,
+            agent_alias_id,
+            session_id,
+            _agent_resp["ResponseMetadata"]["RequestId"],
+            _agent_resp,
+        )
+
+        # Return error message if invoke was unsuccessful
+        if _agent_resp["ResponseMetadata"]["HTTPStatusCode"] != 200:
+            _error_message = f"API Response was not 200: {_agent_resp}"
+            yield InvokeCompleted(_error_message, error=_error_message)
+            return
+
+        _total_in_tokens = 0
+        _total_out_tokens = 0
+        _total_llm_calls = 0
+        _num_response_chunks = 0
+        _time_to_first_token = None
+        _citations = None
+        _agent_answer = ""
+
+        try:
+            for _event in _agent_resp["completion"]:
+                if "chunk" in _event:
+                    _tmp_agent_answer = _event["chunk"]["bytes"].decode("utf8")
+                    # continue to build up the full answer
+                    _agent_answer += _tmp_agent_answer
+                    _elapsed = time.monotonic() - _overall_start_time
+                    if _num_response_chunks == 0:
+                        _time_to_first_token = _elapsed
+                    yield TextDelta(
+                        _tmp_agent_answer,
+                        _num_response_chunks,
+                        _elapsed,
+                        list(_event["chunk"].keys()),
+                    )
+                    _num_response_chunks += 1
+
+                    # remember the citations, if any are provided
+                    if "citations" in _event["chunk"].get("attribution", {}):
+                        _citations = _event["chunk"]["attribution"]["citations"]
+                        yield Citations(_citations)
+
+                if "trace" in _event:
+                    _trace = _event["trace"]
+                    _sub_agent_alias_id = None
+                    if len(_trace.get("callerChain", [])) > 1:
+                        # get sub agent id by grabbing all text following the first '/' character
+                        _sub_agent_alias_id = _trace["callerChain"][1][
+                            "agentAliasArn"
+                        ].split("/", 1)[1]
+                    yield TraceStep(_trace, _sub_agent_alias_id)
+
+                    for _trace_type, _source in _USAGE_TRACES.items():
+                        _step = _trace["trace"].get(_trace_type, {})
+                        if "modelInvocationOutput" not in _step:
+                            continue
+                        _total_llm_calls += 1
+                        _metadata = _step["modelInvocationOutput"].get("metadata", {})
+                        if "usage" in _metadata:
+                            _in_tokens = _metadata["usage"]["inputTokens"]
+                            _out_tokens = _metadata["usage"]["outputTokens"]
+                            _total_in_tokens += _in_tokens
+                            _total_out_tokens += _out_tokens
+                            yield Usage(_in_tokens, _out_tokens, _source)
+
+                    _route = _trace["trace"].get("routingClassifierTrace", {})
+                    if "modelInvocationOutput" in _route:
+                        _classification = _routing_classification(_route)
+                        if _classification not in (
+                            UNDECIDABLE_CLASSIFICATION,
+                            "keep_previous_agent",
+                        ):
+                            yield SubAgentRouting(_classification, "routing_classifier")
+
+                    _input = (
+                        _trace["trace"]
+                        .get("orchestrationTrace", {})
+                        .get("invocationInput", {})
+                        .get("agentCollaboratorInvocationInput")
+                    )
+                    if _input is not None:
+                        yield SubAgentRouting(
+                            _input["agentCollaboratorName"],
+                            "orchestration",
+                            collaborator_alias_arn=_input["agentCollaboratorAliasArn"],
+                            input_text=_input["input"]["text"],
+                        )
+
+                if "files" in _event:
+                    yield AgentFiles(_event["files"]["files"])
+        finally:
+            # Also when the caller stops iterating early, so the connection is released
+            _agent_resp["completion"].close()
+
+        _cited_answer = _agent_answer
+        if _citations:
+            _cited_answer = self._make_fully_cited_answer(
+                _agent_answer,
+                {"chunk": {"attribution": {"citations": _citations}}},
+                quiet=True,
+            )
+
+        yield InvokeCompleted(
+            _cited_answer,
+            raw_answer=_agent_answer,
+            citations=_citations,
+            input_tokens=_total_in_tokens,
+            output_tokens=_total_out_tokens,
+            llm_calls=_total_llm_calls,
+            duration=time.monotonic() - _overall_start_time,
+            time_to_first_token=_time_to_first_token,
+        )
+
     def invoke_roc(
         self,
         input_text: str,
@@ -2748,7 +3337,7 @@ class AgentsForAmazonBedrock:
             **_agent_details
         )
 
-        time.sleep(3)
+        self.wait_agent_status_update(_agent_id)
 
         # Prepare Agent
         self._bedrock_agent_client.prepare_agent(agentId=_agent_id)
@@ -0,0 +1,74 @@
+"""
+Benchmark of importing src.utils.bedrock_agent.
+
+Each run imports the module in a fresh interpreter, so nothing is cached
+between runs, and checks that the import created no boto3 client and no
+AgentsForAmazonBedrock. The script fails when the median import time is over
+the budget, so it can guard against eager AWS calls creeping back in.
+
+    python src/utils/benchmarks/import_time.py --runs 10 --budget 0.5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import src.utils.bedrock_agent as bedrock_agent
+elapsed = time.perf_counter() - start
+from src.utils import bedrock_agent_helper
+assert not bedrock_agent_helper._clients, list(bedrock_agent_helper._clients)
+assert not bedrock_agent_helper._account_ids
+assert bedrock_agent.get_agents_helper.cache_info().currsize == 0
+print(elapsed)
+"""
+
+
+def import_once() -> float:
+    # No region or credentials, so any eager AWS call fails the import
+    env = {
+        key: value for key, value in os.environ.items() if not key.startswith("AWS_")
+    }
+    env["AWS_CONFIG_FILE"] = env["AWS_SHARED_CREDENTIALS_FILE"] = os.devnull
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--budget", type=float, default=0.5, help="Median import time in seconds"
+    )
+    args = parser.parse_args()
+
+    timings = [import_once() for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(
+        f"import src.utils.bedrock_agent: median {median * 1000:.0f}ms, "
+        f"min {min(timings) * 1000:.0f}ms, max {max(timings) * 1000:.0f}ms "
+        f"over {args.runs} runs (budget {args.budget * 1000:.0f}ms)"
+    )
+    if median > args.budget:
+        print("Over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# Copyright 2024 Amazon.com and its affiliates; all rights reserved.
+# This file is AWS Content and may not be duplicated or distributed without permission
+
+"""
+This module contains a planner for provisioning multi-agent teams with Agents for Amazon Bedrock.
+
+Creating an agent is a chain of steps (IAM role, agent, action group Lambdas, prepare, alias) that
+mostly waits on the service, and collaborators do not depend on each other until they are associated
+with their supervisor. The ProvisioningPlan class holds the steps of a deployment as a dependency graph
+and runs every step whose dependencies are done on a bounded thread pool, so a team deploys in about
+the time of its longest branch instead of the sum of all of them.
+
+Completed steps are recorded in an optional JSON state file. Running the same plan again after a
+failure skips them (attaching to the agents they created) and continues with the rest.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.bedrock_agent import Agent, SupervisorAgent
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class ProvisioningError(RuntimeError):
+    """Raised when a step of a plan fails; completed steps are kept in the state file."""
+
+    def __init__(self, step: str, completed: List[str]):
+        self.step = step
+        self.completed = completed
+        super().__init__(
+            f"Provisioning step {step} failed, completed steps: {completed}"
+        )
+
+
+@dataclass
+class ProvisioningStep:
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    depends_on: List[str] = field(default_factory=list)
+    # Called instead of run when the state file shows the step already completed
+    resume: Optional[Callable[[Dict[str, Any]], Any]] = None
+
+
+class ProvisioningPlan:
+    """A dependency graph of provisioning steps, run with bounded parallelism."""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        state_file: str = None,
+        progress: Callable[[str], None] = print,
+    ):
+        """Constructs a plan.
+
+        Args:
+            max_workers (int, Optional): Maximum number of steps running at once. Defaults to 4
+            state_file (str, Optional): JSON file recording completed steps, so that a failed run can be resumed
+            progress (Callable, Optional): Called with a line of text as steps start and finish. Defaults to print
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.state_file = state_file
+        self.progress = progress
+        self.steps: Dict[str, ProvisioningStep] = {}
+        self._state_lock = Lock()
+
+    def add_step(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Any],
+        depends_on: List[str] = None,
+        resume: Callable[[Dict[str, Any]], Any] = None,
+    ) -> str:
+        """Adds a step. run (and resume) receive a dict with the results of the steps it depends on."""
+        if name in self.steps:
+            raise ValueError(f"Step {name} is already part of the plan")
+        self.steps[name] = ProvisioningStep(name, run, list(depends_on or []), resume)
+        return name
+
+    def add_agent(
+        self,
+        name: str,
+        yaml_content: Dict,
+        force_recreate: bool = None,
+        depends_on: List[str] = None,
+        **agent_kwargs,
+    ) -> str:
+        """Adds a step creating an Agent (role, agent, tools, alias), see Agent for the arguments."""
+        return self.add_step(
+            name,
+            lambda results: Agent(
+                name, yaml_content, force_recreate=force_recreate, **agent_kwargs
+            ),
+            depends_on=depends_on,
+            resume=lambda results: Agent(
+                name, yaml_content, force_recreate=False, **agent_kwargs
+            ),
+        )
+
+    def add_supervisor_agent(
+        self,
+        name: str,
+        yaml_content: Dict,
+        collaborators: List[str],
+        force_recreate: bool = None,
+        **supervisor_kwargs,
+    ) -> str:
+        """Adds a step creating a SupervisorAgent once all its collaborator steps are done.
+
+        Args:
+            name (str): Name of the supervisor agent
+            yaml_content (Dict): Agent definitions, as for SupervisorAgent
+            collaborators (List[str]): Names of the steps creating its collaborator agents
+            force_recreate (bool, Optional): Overrides Agent.default_force_recreate
+            supervisor_kwargs: Other keyword arguments of SupervisorAgent
+        """
+
+        def _create(results: Dict[str, Any], recreate: Optional[bool]):
+            return SupervisorAgent(
+                name,
+                yaml_content,
+                [results[_collaborator] for _collaborator in collaborators],
+                force_recreate=recreate,
+                **supervisor_kwargs,
+            )
+
+        return self.add_step(
+            name,
+            lambda results: _create(results, force_recreate),
+            depends_on=collaborators,
+            resume=lambda results: _create(results, False),
+        )
+
+    def order(self) -> List[List[str]]:
+        """Returns the steps in waves: each wave only depends on earlier ones.
+
+        Raises:
+            ValueError: if a step depends on an unknown step or the steps form a cycle
+        """
+        for _step in self.steps.values():
+            for _dependency in _step.depends_on:
+                if _dependency not in self.steps:
+                    raise ValueError(
+                        f"Step {_step.name} depends on unknown step {_dependency}"
+                    )
+
+        _waves = []
+        _placed = set()
+        while len(_placed) < len(self.steps):
+            _wave = [
+                _step.name
+                for _step in self.steps.values()
+                if _step.name not in _placed
+                and all(_dependency in _placed for _dependency in _step.depends_on)
+            ]
+            if not _wave:
+                _remaining = sorted(set(self.steps) - _placed)
+                raise ValueError(f"Provisioning steps form a cycle: {_remaining}")
+            _waves.append(_wave)
+            _placed.update(_wave)
+        return _waves
+
+    def _load_completed(self) -> List[str]:
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return []
+        with open(self.state_file, "r") as f:
+            return [_name for _name in json.load(f)["completed"] if _name in self.steps]
+
+    def _save_completed(self, completed: List[str]) -> None:
+        if self.state_file is None:
+            return
+        with self._state_lock:
+            _tmp_file = f"{self.state_file}.tmp"
+            with open(_tmp_file, "w") as f:
+                json.dump({"completed": completed}, f, indent=2)
+            os.replace(_tmp_file, self.state_file)
+
+    def run(self) -> Dict[str, Any]:
+        """Runs every step once its dependencies are done, and returns the results by step name.
+
+        Steps recorded as completed in the state file are resumed instead of run again. When a
+        step fails no new steps are started, running ones are allowed to finish, and a
+        ProvisioningError is raised from the failure.
+        """
+        self.order()
+        _results = {}
+        _completed = self._load_completed()
+        _resumed = set(_completed)
+        _pending = dict(self.steps)
+        _running = {}
+        _failure = None
+        _started_at = time.monotonic()
+
+        def _run_step(step: ProvisioningStep):
+            _inputs = {
+                _dependency: _results[_dependency] for _dependency in step.depends_on
+            }
+            if step.name in _resumed:
+                return step.resume(_inputs) if step.resume is not None else None
+            return step.run(_inputs)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as _executor:
+            while _pending or _running:
+                if _failure is None:
+                    _ready = [
+                        _step
+                        for _step in _pending.values()
+                        if all(
+                            _dependency in _results for _dependency in _step.depends_on
+                        )
+                    ]
+                    for _step in _ready:
+                        del _pending[_step.name]
+                        _action = "Resuming" if _step.name in _resumed else "Starting"
+                        self.progress(f"{_action} {_step.name}...")
+                        _future = _executor.submit(_run_step, _step)
+                        _running[_future] = (_step.name, time.monotonic())
+                if not _running:
+                    break
+
+                _done, _ = wait(_running, return_when=FIRST_COMPLETED)
+                for _future in _done:
+                    _name, _step_started_at = _running.pop(_future)
+                    _error = _future.exception()
+                    if _error is not None:
+                        self.progress(f"FAILED {_name}: {_error}")
+                        if _failure is None:
+                            _failure = (_name, _error)
+                        continue
+                    _results[_name] = _future.result()
+                    if _name not in _resumed:
+                        _completed.append(_name)
+                        self._save_completed(_completed)
+                    self.progress(
+                        f"[{len(_results)}/{len(self.steps)}] {_name} done "
+                        f"in {time.monotonic() - _step_started_at:.1f}s"
+                    )
+
+        if _failure is not None:
+            raise ProvisioningError(_failure[0], list(_completed)) from _failure[1]
+        self.progress(
+            f"Provisioned {len(self.steps)} steps in {time.monotonic() - _started_at:.1f}s"
+        )
+        return _results
@@ -0,0 +1,153 @@
+import unittest
+
+from src.utils.bedrock_agent_helper import AgentRegistry
+from src.utils.tests.test_waiters import (
+    NOW,
+    FakeClock,
+    agent_summary,
+    stubbed_client,
+)
+
+
+def alias_summary(agent_alias_id: str, name: str) -> dict:
+    return {
+        "agentAliasId": agent_alias_id,
+        "agentAliasName": name,
+        "agentAliasStatus": "PREPARED",
+        "createdAt": NOW,
+        "updatedAt": NOW,
+    }
+
+
+class TestAgentRegistry(unittest.TestCase):
+    def setUp(self):
+        self.client, self.stubber = stubbed_client("bedrock-agent")
+        self.clock = FakeClock()
+        self.registry = AgentRegistry(
+            client=self.client, ttl=60, clock=self.clock, miss_refresh_interval=5
+        )
+
+    def expect_agents(self, *agents):
+        self.stubber.add_response("list_agents", {"agentSummaries": list(agents)})
+
+    def test_every_page_is_indexed_by_name_and_id(self):
+        self.stubber.add_response(
+            "list_agents",
+            {
+                "agentSummaries": [agent_summary("AGENTID001", "PREPARED", "analyst")],
+                "nextToken": "page-2",
+            },
+            {},
+        )
+        self.stubber.add_response(
+            "list_agents",
+            {"agentSummaries": [agent_summary("AGENTID002", "PREPARED", "writer")]},
+            {"nextToken": "page-2"},
+        )
+
+        self.assertEqual(self.registry.find_agent("writer")["agentId"], "AGENTID002")
+        self.assertEqual(self.registry.get_agent("AGENTID001")["agentName"], "analyst")
+        self.stubber.assert_no_pending_responses()
+
+    def test_index_is_listed_again_after_the_ttl(self):
+        self.expect_agents(agent_summary("AGENTID001", "PREPARED", "analyst"))
+        self.assertEqual(self.registry.find_agent("analyst")["agentId"], "AGENTID001")
+
+        # Served from the index until it is older than the ttl
+        self.clock.now += 60
+        self.assertEqual(self.registry.get_agent("AGENTID001")["agentName"], "analyst")
+
+        self.clock.now += 1
+        self.expect_agents(agent_summary("AGENTID002", "PREPARED", "analyst"))
+        self.assertEqual(self.registry.find_agent("analyst")["agentId"], "AGENTID002")
+        self.assertIsNone(self.registry.get_agent("AGENTID001"))
+        self.stubber.assert_no_pending_responses()
+
+    def test_missing_name_refreshes_at_most_once_per_interval(self):
+        self.expect_agents()
+        self.assertIsNone(self.registry.find_agent("writer"))
+
+        # Polling for a name that does not exist yet does not list again
+        self.clock.now += 5
+        self.assertIsNone(self.registry.find_agent("writer"))
+        self.stubber.assert_no_pending_responses()
+
+        self.clock.now += 1
+        self.expect_agents(agent_summary("AGENTID002", "CREATING", "writer"))
+        self.assertEqual(self.registry.find_agent("writer")["agentId"], "AGENTID002")
+        self.stubber.assert_no_pending_responses()
+
+    def test_put_and_remove_agent_update_the_index(self):
+        self.expect_agents(agent_summary("AGENTID001", "PREPARED", "analyst"))
+        self.registry.find_agent("analyst")
+
+        self.registry.put_agent(agent_summary("AGENTID001", "PREPARED", "researcher"))
+        self.registry.put_agent(agent_summary("AGENTID002", "CREATING", "writer"))
+        self.registry.remove_agent("AGENTID002")
+
+        self.assertEqual(
+            self.registry.find_agent("researcher")["agentId"], "AGENTID001"
+        )
+        self.assertIsNone(self.registry.get_agent("AGENTID002"))
+        self.stubber.assert_no_pending_responses()
+
+    def test_aliases_are_cached_and_updated_in_place(self):
+        self.stubber.add_response(
+            "list_agent_aliases",
+            {
+                "agentAliasSummaries": [alias_summary("TSTALIASID", "AgentTestAlias")],
+                "nextToken": "page-2",
+            },
+            {"agentId": "AGENTID001"},
+        )
+        self.stubber.add_response(
+            "list_agent_aliases",
+            {"agentAliasSummaries": [alias_summary("ALIASID001", "v1")]},
+            {"agentId": "AGENTID001", "nextToken": "page-2"},
+        )
+        self.assertEqual(
+            {alias["agentAliasId"] for alias in self.registry.aliases("AGENTID001")},
+            {"TSTALIASID", "ALIASID001"},
+        )
+
+        self.registry.put_alias("AGENTID001", alias_summary("ALIASID002", "v2"))
+        self.registry.remove_alias("AGENTID001", "ALIASID001")
+
+        self.assertEqual(
+            {alias["agentAliasId"] for alias in self.registry.aliases("AGENTID001")},
+            {"TSTALIASID", "ALIASID002"},
+        )
+        self.stubber.assert_no_pending_responses()
+
+    def test_aliases_are_listed_again_after_the_ttl(self):
+        self.stubber.add_response(
+            "list_agent_aliases",
+            {"agentAliasSummaries": [alias_summary("ALIASID001", "v1")]},
+        )
+        self.registry.aliases("AGENTID001")
+
+        self.clock.now += 61
+        self.stubber.add_response(
+            "list_agent_aliases",
+            {"agentAliasSummaries": [alias_summary("ALIASID002", "v2")]},
+        )
+
+        self.assertEqual(
+            [alias["agentAliasId"] for alias in self.registry.aliases("AGENTID001")],
+            ["ALIASID002"],
+        )
+        self.stubber.assert_no_pending_responses()
+
+    def test_invalidate_lists_agents_again(self):
+        self.expect_agents(agent_summary("AGENTID001", "PREPARED", "analyst"))
+        self.registry.find_agent("analyst")
+
+        self.registry.invalidate()
+        self.expect_agents()
+
+        self.assertIsNone(self.registry.find_agent("analyst"))
+        self.stubber.assert_no_pending_responses()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+import contextlib
+import io
+import json
+import unittest
+from unittest import mock
+
+from src.utils.bedrock_agent_helper import (
+    AgentsForAmazonBedrock,
+    Citations,
+    InvokeCompleted,
+    InvokeStarted,
+    SubAgentRouting,
+    TextDelta,
+    TraceStep,
+    Usage,
+)
+
+ALIAS_ARN = "arn:aws:bedrock:us-east-1:123456789012:agent-alias/AGENTID001/ALIASID001"
+SUB_AGENT_ALIAS_ARN = (
+    "arn:aws:bedrock:us-east-1:123456789012:agent-alias/AGENTID002/ALIASID002"
+)
+
+CITATIONS = [
+    {
+        "generatedResponsePart": {
+            "textResponsePart": {"span": {"start": 0, "end": 11}}
+        },
+        "retrievedReferences": [
+            {"location": {"s3Location": {"uri": "s3://docs/bedrock.pdf"}}}
+        ],
+    }
+]
+
+
+def usage(input_tokens: int, output_tokens: int) -> dict:
+    return {
+        "metadata": {
+            "usage": {"inputTokens": input_tokens, "outputTokens": output_tokens}
+        }
+    }
+
+
+def trace(step: dict, sub_agent: bool = False) -> dict:
+    caller_chain = [{"agentAliasArn": ALIAS_ARN}]
+    if sub_agent:
+        caller_chain.append({"agentAliasArn": SUB_AGENT_ALIAS_ARN})
+    return {"trace": {"callerChain": caller_chain, "trace": step}}
+
+
+def completion():
+    yield trace({"routingClassifierTrace": {"modelInvocationInput": {}}})
+    yield trace(
+        {
+            "routingClassifierTrace": {
+                "modelInvocationOutput": {
+                    "rawResponse": {
+                        "content": json.dumps({"content": [{"text": "<a>writer</a>"}]})
+                    },
+                    **usage(20, 2),
+                }
+            }
+        }
+    )
+    yield trace(
+        {"orchestrationTrace": {"modelInvocationOutput": usage(50, 10)}},
+        sub_agent=True,
+    )
+    yield {"chunk": {"bytes": b"Bedrock is "}}
+    yield {
+        "chunk": {
+            "bytes": b"a service.",
+            "attribution": {"citations": CITATIONS},
+        }
+    }
+
+
+def invoke_agent_response(status_code: int = 200) -> dict:
+    return {
+        "ResponseMetadata": {
+            "RequestId": "REQUEST-ID",
+            "HTTPStatusCode": status_code,
+            "RetryAttempts": 0,
+        },
+        "completion": completion(),
+    }
+
+
+class TestInvokeStream(unittest.TestCase):
+    def setUp(self):
+        self.helper = AgentsForAmazonBedrock()
+        self.runtime_client = mock.Mock()
+        self.runtime_client.invoke_agent.side_effect = (
+            lambda **kwargs: invoke_agent_response()
+        )
+        self.helper._bedrock_agent_runtime_client = self.runtime_client
+
+    def test_events_are_yielded_in_stream_order(self):
+        with mock.patch("builtins.print") as print_:
+            events = list(
+                self.helper.invoke_stream(
+                    "What is Amazon Bedrock?",
+                    "AGENTID001",
+                    "ALIASID001",
+                    session_id="SESSION",
+                    enable_trace=True,
+                )
+            )
+
+        print_.assert_not_called()
+        self.assertEqual(
+            [type(event) for event in events],
+            [
+                InvokeStarted,
+                TraceStep,
+                TraceStep,
+                Usage,
+                SubAgentRouting,
+                TraceStep,
+                Usage,
+                TextDelta,
+                TextDelta,
+                Citations,
+                InvokeCompleted,
+            ],
+        )
+        self.assertEqual(events[0].request_id, "REQUEST-ID")
+        self.assertEqual(events[3], Usage(20, 2, "routing"))
+        self.assertEqual(events[4], SubAgentRouting("writer", "routing_classifier"))
+        self.assertEqual(events[5].sub_agent_alias_id, "AGENTID002/ALIASID002")
+        self.assertEqual(
+            [events[7].text, events[8].text], ["Bedrock is ", "a service."]
+        )
+        self.assertEqual([events[7].index, events[8].index], [0, 1])
+        self.assertEqual(events[9].citations, CITATIONS)
+
+        completed = events[-1]
+        self.assertEqual(completed.raw_answer, "Bedrock is a service.")
+        self.assertEqual(
+            completed.answer, "Bedrock is  [s3://docs/bedrock.pdf] a service."
+        )
+        self.assertEqual(
+            (completed.input_tokens, completed.output_tokens, completed.llm_calls),
+            (70, 12, 2),
+        )
+        self.assertIsNone(completed.error)
+
+    def test_final_response_is_not_streamed_by_default(self):
+        list(self.helper.invoke_stream("Hi", "AGENTID001"))
+
+        self.assertEqual(
+            self.runtime_client.invoke_agent.call_args.kwargs[
+                "streamingConfigurations"
+            ],
+            {"streamFinalResponse": False},
+        )
+
+    def test_unsuccessful_response_completes_with_the_error(self):
+        self.runtime_client.invoke_agent.side_effect = (
+            lambda **kwargs: invoke_agent_response(status_code=500)
+        )
+
+        events = list(self.helper.invoke_stream("Hi", "AGENTID001"))
+
+        self.assertEqual(
+            [type(event) for event in events], [InvokeStarted, InvokeCompleted]
+        )
+        self.assertIn("API Response was not 200", events[-1].error)
+
+    def test_event_stream_is_closed_when_the_caller_stops_early(self):
+        response = invoke_agent_response()
+        self.runtime_client.invoke_agent.side_effect = lambda **kwargs: response
+
+        stream = self.helper.invoke_stream("Hi", "AGENTID001")
+        for event in stream:
+            if isinstance(event, TextDelta):
+                break
+        stream.close()
+
+        # A closed generator has no frame left
+        self.assertIsNone(response["completion"].gi_frame)
+
+    def test_invoke_returns_the_cited_answer(self):
+        with mock.patch("builtins.print") as print_:
+            answer = self.helper.invoke("Hi", "AGENTID001", "ALIASID001")
+
+        self.assertEqual(answer, "Bedrock is  [s3://docs/bedrock.pdf] a service.")
+        print_.assert_not_called()
+
+    def test_invoke_traces_steps_and_citations(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            answer = self.helper.invoke(
+                "Hi",
+                "AGENTID001",
+                "ALIASID001",
+                enable_trace=True,
+                multi_agent_names={"AGENTID002/ALIASID002": "writer"},
+            )
+
+        self.assertEqual(answer, "Bedrock is  [s3://docs/bedrock.pdf] a service.")
+        lines = output.getvalue()
+        self.assertIn("invokeAgent API request ID: REQUEST-ID", lines)
+        self.assertIn("Routing classifier chose collaborator: 'writer'", lines)
+        self.assertIn("using sub-agent name:writer, id:AGENTID002/ALIASID002", lines)
+        self.assertIn("Agent made a total of 2 LLM calls, using 82 tokens", lines)
+        self.assertIn("got 1 citations", lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
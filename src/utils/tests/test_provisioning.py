@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src.utils.provisioning import ProvisioningError, ProvisioningPlan
+
+
+def quiet_plan(**kwargs) -> ProvisioningPlan:
+    return ProvisioningPlan(progress=mock.Mock(), **kwargs)
+
+
+class TestOrder(unittest.TestCase):
+    def test_steps_are_ordered_in_waves(self):
+        plan = quiet_plan()
+        plan.add_step("analyst", mock.Mock())
+        plan.add_step("writer", mock.Mock())
+        plan.add_step("editor", mock.Mock(), depends_on=["writer"])
+        plan.add_step("supervisor", mock.Mock(), depends_on=["analyst", "editor"])
+
+        self.assertEqual(
+            plan.order(), [["analyst", "writer"], ["editor"], ["supervisor"]]
+        )
+
+    def test_unknown_dependency_is_rejected(self):
+        plan = quiet_plan()
+        plan.add_step("supervisor", mock.Mock(), depends_on=["missing"])
+
+        with self.assertRaisesRegex(ValueError, "unknown step missing"):
+            plan.order()
+
+    def test_cycle_is_rejected(self):
+        plan = quiet_plan()
+        plan.add_step("root", mock.Mock())
+        plan.add_step("a", mock.Mock(), depends_on=["root", "b"])
+        plan.add_step("b", mock.Mock(), depends_on=["a"])
+
+        with self.assertRaisesRegex(ValueError, r"cycle: \['a', 'b'\]"):
+            plan.order()
+
+    def test_duplicate_step_is_rejected(self):
+        plan = quiet_plan()
+        plan.add_step("analyst", mock.Mock())
+
+        with self.assertRaises(ValueError):
+            plan.add_step("analyst", mock.Mock())
+
+    def test_max_workers_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            ProvisioningPlan(max_workers=0)
+
+
+class TestRun(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.state_dir.cleanup)
+        self.state_file = os.path.join(self.state_dir.name, "state.json")
+
+    def completed(self) -> list:
+        with open(self.state_file) as f:
+            return json.load(f)["completed"]
+
+    def test_independent_steps_run_in_parallel(self):
+        both_started = threading.Barrier(2, timeout=5)
+
+        def step(results):
+            # Waits for the other step to start, which fails if they run in turn
+            both_started.wait()
+            return "created"
+
+        plan = quiet_plan(max_workers=2)
+        plan.add_step("analyst", step)
+        plan.add_step("writer", step)
+
+        self.assertEqual(plan.run(), {"analyst": "created", "writer": "created"})
+
+    def test_steps_receive_the_results_of_their_dependencies(self):
+        calls = []
+
+        def step(name):
+            def run(results):
+                calls.append((name, results))
+                return name.upper()
+
+            return run
+
+        plan = quiet_plan()
+        plan.add_step("analyst", step("analyst"))
+        plan.add_step("writer", step("writer"))
+        plan.add_step(
+            "supervisor", step("supervisor"), depends_on=["analyst", "writer"]
+        )
+
+        results = plan.run()
+
+        self.assertEqual(results["supervisor"], "SUPERVISOR")
+        self.assertEqual(
+            calls[-1], ("supervisor", {"analyst": "ANALYST", "writer": "WRITER"})
+        )
+
+    def test_failure_stops_dependents_and_records_completed_steps(self):
+        supervisor = mock.Mock()
+        plan = quiet_plan(max_workers=1, state_file=self.state_file)
+        plan.add_step("analyst", lambda results: "analyst")
+        plan.add_step(
+            "writer",
+            mock.Mock(side_effect=RuntimeError("boom")),
+            depends_on=["analyst"],
+        )
+        plan.add_step("supervisor", supervisor, depends_on=["writer"])
+
+        with self.assertRaises(ProvisioningError) as context:
+            plan.run()
+
+        self.assertEqual(context.exception.step, "writer")
+        self.assertEqual(context.exception.completed, ["analyst"])
+        self.assertIsInstance(context.exception.__cause__, RuntimeError)
+        supervisor.assert_not_called()
+        self.assertEqual(self.completed(), ["analyst"])
+
+    def test_running_steps_finish_after_a_failure(self):
+        failed = threading.Event()
+
+        def slow(results):
+            failed.wait(5)
+            return "slow"
+
+        def failing(results):
+            failed.set()
+            raise RuntimeError("boom")
+
+        plan = quiet_plan(max_workers=2, state_file=self.state_file)
+        plan.add_step("slow", slow)
+        plan.add_step("failing", failing)
+
+        with self.assertRaises(ProvisioningError):
+            plan.run()
+
+        self.assertEqual(self.completed(), ["slow"])
+
+    def test_resume_skips_completed_steps(self):
+        analyst_run = mock.Mock(return_value="new analyst")
+        analyst_resume = mock.Mock(return_value="existing analyst")
+        writer_run = mock.Mock(side_effect=[RuntimeError("boom"), "writer"])
+
+        def make_plan():
+            plan = quiet_plan(state_file=self.state_file)
+            plan.add_step("analyst", analyst_run, resume=analyst_resume)
+            plan.add_step("writer", writer_run, depends_on=["analyst"])
+            return plan
+
+        with self.assertRaises(ProvisioningError):
+            make_plan().run()
+        analyst_run.assert_called_once()
+        analyst_resume.assert_not_called()
+
+        results = make_plan().run()
+
+        analyst_run.assert_called_once()
+        analyst_resume.assert_called_once_with({})
+        writer_run.assert_called_with({"analyst": "existing analyst"})
+        self.assertEqual(results, {"analyst": "existing analyst", "writer": "writer"})
+        self.assertEqual(self.completed(), ["analyst", "writer"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,321 @@
+import datetime
+import unittest
+from unittest import mock
+
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from src.utils.bedrock_agent_helper import (
+    AgentRegistry,
+    AgentsForAmazonBedrock,
+    WaiterTimeoutError,
+    is_role_propagation_error,
+    wait_until,
+)
+
+NOW = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+ROLE_ARN = "arn:aws:iam::123456789012:role/AmazonBedrockExecutionRoleForAgents_mock"
+
+
+def stubbed_client(service_name: str):
+    client = boto3.client(
+        service_name,
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    stubber = Stubber(client)
+    stubber.activate()
+    return client, stubber
+
+
+def stubbed_helper():
+    """An AgentsForAmazonBedrock whose bedrock-agent calls are served by a Stubber."""
+    client, stubber = stubbed_client("bedrock-agent")
+    helper = AgentsForAmazonBedrock()
+    helper._bedrock_agent_client = client
+    helper._agent_registry = AgentRegistry(client=client)
+    return helper, stubber
+
+
+def agent(agent_id: str, status: str, name: str = "mock-agent") -> dict:
+    return {
+        "agentId": agent_id,
+        "agentName": name,
+        "agentArn": f"arn:aws:bedrock:us-east-1:123456789012:agent/{agent_id}",
+        "agentVersion": "DRAFT",
+        "agentStatus": status,
+        "agentResourceRoleArn": ROLE_ARN,
+        "idleSessionTTLInSeconds": 1800,
+        "createdAt": NOW,
+        "updatedAt": NOW,
+    }
+
+
+def agent_summary(agent_id: str, status: str, name: str = "mock-agent") -> dict:
+    return {
+        "agentId": agent_id,
+        "agentName": name,
+        "agentStatus": status,
+        "updatedAt": NOW,
+    }
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestWaitUntil(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def wait(self, poll, **kwargs):
+        return wait_until(poll, sleep=self.clock.sleep, clock=self.clock, **kwargs)
+
+    def test_first_result_returned_without_sleeping(self):
+        self.assertEqual(self.wait(lambda: "ready"), "ready")
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_delay_doubles_up_to_max_delay(self):
+        results = iter([None] * 5 + ["ready"])
+
+        with mock.patch("random.uniform", side_effect=lambda low, high: high):
+            result = self.wait(lambda: next(results), initial_delay=1, max_delay=4)
+
+        self.assertEqual(result, "ready")
+        self.assertEqual(self.clock.sleeps, [1, 2, 4, 4, 4])
+
+    def test_jitter_stays_within_half_and_all_of_the_delay(self):
+        results = iter([None] * 20 + ["ready"])
+
+        self.wait(lambda: next(results), initial_delay=1, max_delay=4, timeout=1000)
+
+        for sleep, delay in zip(self.clock.sleeps, [1, 2] + [4] * 18):
+            self.assertGreaterEqual(sleep, delay / 2)
+            self.assertLessEqual(sleep, delay)
+
+    def test_deadline_raises_waiter_timeout(self):
+        with self.assertRaisesRegex(WaiterTimeoutError, "waiting for mock resource"):
+            self.wait(
+                lambda: None,
+                description="mock resource",
+                timeout=10,
+                initial_delay=1,
+            )
+
+        self.assertEqual(self.clock.now, 10)
+
+    def test_non_retryable_error_is_raised_immediately(self):
+        poll = mock.Mock(side_effect=ValueError("boom"))
+
+        with self.assertRaisesRegex(ValueError, "boom"):
+            self.wait(poll, is_retryable=lambda e: isinstance(e, KeyError))
+
+        poll.assert_called_once()
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_retryable_error_is_retried_and_chained_on_timeout(self):
+        poll = mock.Mock(side_effect=[KeyError("not yet"), "ready"])
+        self.assertEqual(
+            self.wait(poll, is_retryable=lambda e: isinstance(e, KeyError)), "ready"
+        )
+
+        with self.assertRaises(WaiterTimeoutError) as context:
+            self.wait(
+                mock.Mock(side_effect=KeyError("never")),
+                is_retryable=lambda e: isinstance(e, KeyError),
+                timeout=5,
+            )
+        self.assertIsInstance(context.exception.__cause__, KeyError)
+
+
+class TestStatusWaiters(unittest.TestCase):
+    def setUp(self):
+        self.helper, self.stubber = stubbed_helper()
+        # No jitter, so the waiters poll without sleeping
+        patcher = mock.patch("random.uniform", return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_agent_status_waits_out_transitional_statuses(self):
+        for status in ["CREATING", "PREPARING", "PREPARED"]:
+            self.stubber.add_response(
+                "get_agent",
+                {"agent": agent("AGENTID001", status)},
+                {"agentId": "AGENTID001"},
+            )
+
+        with mock.patch("builtins.print"):
+            self.assertEqual(
+                self.helper.wait_agent_status_update("AGENTID001"), "PREPARED"
+            )
+        self.stubber.assert_no_pending_responses()
+
+    def test_deleted_agent_ends_the_wait(self):
+        self.stubber.add_response(
+            "get_agent",
+            {"agent": agent("AGENTID001", "DELETING")},
+            {"agentId": "AGENTID001"},
+        )
+        self.stubber.add_client_error(
+            "get_agent", "ResourceNotFoundException", http_status_code=404
+        )
+
+        with mock.patch("builtins.print"):
+            self.assertEqual(
+                self.helper.wait_agent_status_update("AGENTID001"), "DELETED"
+            )
+
+    def test_alias_status_waits_out_transitional_statuses(self):
+        for status in ["CREATING", "UPDATING", "PREPARED"]:
+            self.stubber.add_response(
+                "get_agent_alias",
+                {
+                    "agentAlias": {
+                        "agentId": "AGENTID001",
+                        "agentAliasId": "ALIASID001",
+                        "agentAliasName": "mock-alias",
+                        "agentAliasArn": "arn:aws:bedrock:us-east-1:123456789012:agent-alias/AGENTID001/ALIASID001",
+                        "agentAliasStatus": status,
+                        "routingConfiguration": [],
+                        "createdAt": NOW,
+                        "updatedAt": NOW,
+                    }
+                },
+                {"agentId": "AGENTID001", "agentAliasId": "ALIASID001"},
+            )
+
+        self.assertEqual(
+            self.helper.wait_agent_alias_status_update("AGENTID001", "ALIASID001"),
+            "PREPARED",
+        )
+        self.stubber.assert_no_pending_responses()
+
+    def test_role_waiter_retries_until_the_role_exists(self):
+        iam, iam_stubber = stubbed_client("iam")
+        self.helper._iam_client = iam
+        iam_stubber.add_client_error("get_role", "NoSuchEntity", http_status_code=404)
+        iam_stubber.add_response(
+            "get_role",
+            {
+                "Role": {
+                    "Path": "/",
+                    "RoleName": "mock-role",
+                    "RoleId": "AROAMOCKROLEID000000",
+                    "Arn": ROLE_ARN,
+                    "CreateDate": NOW,
+                }
+            },
+            {"RoleName": "mock-role"},
+        )
+
+        self.helper._wait_role_exists("mock-role")
+        iam_stubber.assert_no_pending_responses()
+
+
+class TestCreateAgentWhenReady(unittest.TestCase):
+    create_params = {
+        "agentName": "mock-agent",
+        "agentResourceRoleArn": ROLE_ARN,
+        "foundationModel": "mock-model",
+        "instruction": "You are a mock agent used in unit tests.",
+    }
+
+    def setUp(self):
+        self.helper, self.stubber = stubbed_helper()
+        patcher = mock.patch("random.uniform", return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expect_created(self):
+        self.stubber.add_response(
+            "create_agent",
+            {"agent": agent("AGENTID002", "CREATING")},
+            self.create_params,
+        )
+        self.stubber.add_response(
+            "get_agent",
+            {"agent": agent("AGENTID002", "NOT_PREPARED")},
+            {"agentId": "AGENTID002"},
+        )
+
+    def test_role_propagation_error_is_retried(self):
+        error_message = f"The role {ROLE_ARN} could not be assumed"
+        self.assertTrue(
+            is_role_propagation_error(
+                ClientError(
+                    {
+                        "Error": {
+                            "Code": "ValidationException",
+                            "Message": error_message,
+                        }
+                    },
+                    "CreateAgent",
+                )
+            )
+        )
+        self.stubber.add_client_error(
+            "create_agent", "ValidationException", error_message
+        )
+        self.expect_created()
+
+        with mock.patch("builtins.print"):
+            response = self.helper._create_agent_when_ready(**self.create_params)
+
+        self.assertEqual(response["agent"]["agentId"], "AGENTID002")
+        # The new agent is indexed without listing agents again
+        self.assertEqual(
+            self.helper._agent_registry._agent_ids_by_name["mock-agent"], "AGENTID002"
+        )
+        self.stubber.assert_no_pending_responses()
+
+    def test_conflict_with_deleting_agent_is_retried(self):
+        self.stubber.add_client_error("create_agent", "ConflictException")
+        self.stubber.add_response(
+            "list_agents", {"agentSummaries": [agent_summary("AGENTID001", "DELETING")]}
+        )
+        self.stubber.add_response(
+            "get_agent",
+            {"agent": agent("AGENTID001", "DELETING")},
+            {"agentId": "AGENTID001"},
+        )
+        self.expect_created()
+
+        with mock.patch("builtins.print"):
+            response = self.helper._create_agent_when_ready(**self.create_params)
+
+        self.assertEqual(response["agent"]["agentId"], "AGENTID002")
+        self.stubber.assert_no_pending_responses()
+
+    def test_conflict_with_existing_agent_fails_fast(self):
+        self.stubber.add_client_error("create_agent", "ConflictException")
+        self.stubber.add_response(
+            "list_agents", {"agentSummaries": [agent_summary("AGENTID001", "PREPARED")]}
+        )
+        self.stubber.add_response(
+            "get_agent",
+            {"agent": agent("AGENTID001", "PREPARED")},
+            {"agentId": "AGENTID001"},
+        )
+
+        with self.assertRaises(ClientError) as context:
+            self.helper._create_agent_when_ready(**self.create_params)
+
+        self.assertEqual(
+            context.exception.response["Error"]["Code"], "ConflictException"
+        )
+        self.stubber.assert_no_pending_responses()
+
+
+if __name__ == "__main__":
+    unittest.main()